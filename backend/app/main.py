@@ -1,6 +1,11 @@
+import asyncio
+
 from fastapi import FastAPI
 
-from app.routes import health, index_rules, pipeline
+from app.routes import health, index_rules, metrics, pipeline
+from app.services.block_executor import shutdown_block_pools
+from app.services.db_pool import close_pools
+from app.services.pipeline_config import PipelineConfigRepository, get_pipeline_config_service
 from app.utils.config import Config
 from app.utils.logging import logger
 
@@ -10,6 +15,28 @@ app = FastAPI(title=Config.APP_NAME)
 @app.on_event("startup")
 async def startup_event():
     logger.info(f"{Config.APP_NAME} starting in {Config.APP_ENV} mode...")
+    # Open the shared DB pool and create the config table once, without delaying startup.
+    app.state.db_init = asyncio.create_task(_init_database())
+
+
+async def _init_database():
+    try:
+        await PipelineConfigRepository().init()
+        app.state.config_listener = await get_pipeline_config_service().start_listener()
+    except Exception as exc:  # pragma: no cover - db connectivity
+        logger.warning("Database not ready at startup; config falls back to files until it is: %s", exc)
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    db_init = getattr(app.state, "db_init", None)
+    if db_init is not None and not db_init.done():
+        db_init.cancel()
+    listener = getattr(app.state, "config_listener", None)
+    if listener is not None:
+        await listener.close()
+    await close_pools()
+    shutdown_block_pools()
 
 
 @app.get("/")
@@ -19,6 +46,7 @@ async def read_root():
 
 
 app.include_router(health.router)
+app.include_router(metrics.router)
 app.include_router(index_rules.router)
 app.include_router(pipeline.router)
 
@@ -0,0 +1,12 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.utils.metrics import PROCESS_METRICS
+
+router = APIRouter()
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Process-wide pipeline stage timings and counters in Prometheus text format."""
+    return PlainTextResponse(PROCESS_METRICS.prometheus(), media_type="text/plain; version=0.0.4; charset=utf-8")
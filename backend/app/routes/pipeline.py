@@ -1,14 +1,47 @@
 from __future__ import annotations
 
+import asyncio
+import codecs
+import contextlib
+import json
 import shutil
+import time
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
+from fastapi import APIRouter, Depends, File, HTTPException, Request, UploadFile, status
+from fastapi.responses import FileResponse
 from pydantic import BaseModel
 
-from app.services.email_parser import parse_directory, parse_email_file
-from app.services.pipeline import Pipeline
+from app.services.aggregator import Aggregator
+from app.services.chunked_upload import (
+    UploadError,
+    UploadNotFoundError,
+    UploadSession,
+    get_upload_manager,
+)
+from app.services.ingest import INGEST_MODES, schedule_ingestion, wait_for_ingestion
+from app.services.email_parser import (
+    EmailContent,
+    body_limit_stats,
+    parse_directory,
+    parse_email_bytes,
+    parse_email_file,
+)
+from app.services.pipeline import Pipeline, PipelineResult, get_pipeline
+from app.services.pipeline_settings import settings_for
+from app.services.db_pool import pool_stats
+from app.services.preprocess.verdict_cache import line_verdict_cache_stats
+from app.services.results_store import (
+    get_prepared_store,
+    get_result_store,
+    hash_file,
+    restore_prepared,
+    serialize_pipeline_result,
+    stored_blocks,
+)
+from app.services.semantic import get_embedding_batcher
+from app.services.staged_pipeline import StagedPipeline
 from app.services.pipeline_config import (
     PipelineConfigData,
     PipelineConfigService,
@@ -16,6 +49,8 @@ from app.services.pipeline_config import (
 )
 from app.utils.config import Config, PROJECT_ROOT
 from app.utils.logging import logger
+from app.utils.metrics import collect_run
+from app.utils.profiling import ProfilerBusyError, RunProfiler, profile_path, profiling_mode
 from app.utils.openai_client import get_openai_client
 
 
@@ -50,6 +85,14 @@ class PipelineConfigResponse(BaseModel):
 class PipelineRunResponse(BaseModel):
     results: list
     summary: dict
+    stages: Optional[dict] = None
+    timings: Optional[dict] = None
+    profile: Optional[dict] = None
+
+
+class PipelineAnalyzeResponse(BaseModel):
+    result: dict
+    elapsed_ms: float
 
 
 class FileUploadResponse(BaseModel):
@@ -57,6 +100,44 @@ class FileUploadResponse(BaseModel):
     size: int
 
 
+class ChunkedUploadInitPayload(BaseModel):
+    filename: str
+    size: int
+    sha256: str = ""
+
+
+class ChunkedUploadStatus(BaseModel):
+    upload_id: str
+    filename: str
+    size: int
+    received: List[List[int]]
+    received_bytes: int
+    next_offset: int
+    chunk_size: int
+    complete: bool
+    deduplicated: bool = False
+
+    @classmethod
+    def from_session(cls, session: UploadSession, chunk_size: int) -> "ChunkedUploadStatus":
+        return cls(
+            upload_id=session.upload_id,
+            filename=session.filename,
+            size=session.size,
+            received=session.received,
+            received_bytes=session.received_bytes,
+            next_offset=session.next_offset(),
+            chunk_size=chunk_size,
+            complete=session.complete,
+        )
+
+
+class ChunkedUploadCompleteResponse(BaseModel):
+    filename: str
+    size: int
+    sha256: str
+    deduplicated: bool
+
+
 class FileListItem(BaseModel):
     filename: str
     size: int
@@ -72,6 +153,80 @@ def _ensure_data_dir() -> Path:
     return DATA_DIR
 
 
+def _resolve_ingest_mode(ingest: str | None) -> str:
+    """Eager ingestion only persists artefacts, so it needs a result store.
+
+    With ``RESULT_STORE=off`` an explicit ``ingest`` is rejected and the
+    ``UPLOAD_EAGER_INGEST`` default falls back to ``off`` with a warning.
+    """
+    mode = (ingest or Config.UPLOAD_EAGER_INGEST or "off").lower()
+    if mode not in INGEST_MODES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"ingest must be one of {', '.join(INGEST_MODES)}",
+        )
+    if mode != "off" and get_result_store() is None:
+        if ingest:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"ingest={mode} requires RESULT_STORE to be enabled",
+            )
+        logger.warning("UPLOAD_EAGER_INGEST=%s ignored: RESULT_STORE is off", mode)
+        return "off"
+    return mode
+
+
+def _upload_http_error(exc: UploadError) -> HTTPException:
+    code = status.HTTP_404_NOT_FOUND if isinstance(exc, UploadNotFoundError) else status.HTTP_400_BAD_REQUEST
+    return HTTPException(status_code=code, detail=str(exc))
+
+
+def _serialize_result(res: PipelineResult) -> dict:
+    return {
+        "source_path": res.source_path,
+        "subject": res.subject,
+        "semantic": res.semantic,
+        "aggregation": res.aggregation,
+    }
+
+
+def _message_from_payload(payload: bytes, content_type: str, filename: str | None) -> EmailContent:
+    """Build an EmailContent from a raw request body (EML/MSG bytes, plain text or JSON)."""
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    if media_type == "application/json":
+        try:
+            data = json.loads(payload)
+        except ValueError as exc:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="invalid JSON body") from exc
+        if not isinstance(data, dict) or not isinstance(data.get("body"), str):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="JSON body requires a 'body' string")
+        return EmailContent(
+            source_path=filename or "<memory>",
+            subject=str(data.get("subject", "")),
+            body=data["body"],
+            parser="plain",
+        )
+    if media_type.startswith("text/"):
+        charset = "utf-8"
+        if "charset=" in content_type:
+            charset = content_type.split("charset=", 1)[1].split(";", 1)[0].strip().strip('"') or charset
+        try:
+            codecs.lookup(charset)
+        except LookupError as exc:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail=f"unsupported charset: {charset}"
+            ) from exc
+        return EmailContent(
+            source_path=filename or "<memory>",
+            body=payload.decode(charset, errors="replace"),
+            parser="plain",
+        )
+    try:
+        return parse_email_bytes(payload, filename=filename or "")
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+
+
 class PipelineConfigPayload(BaseModel):
     steps: List[str]
     line_filter: dict
@@ -91,17 +246,110 @@ async def get_pipeline_config(service: PipelineConfigService = Depends(get_pipel
 
 
 @router.post("/upload", response_model=List[FileUploadResponse])
-async def upload_files(files: List[UploadFile] = File(description="files[] upload; use field name 'files' or 'files[]'")):
+async def upload_files(
+    files: List[UploadFile] = File(description="files[] upload; use field name 'files' or 'files[]'"),
+    ingest: str | None = None,
+    service: PipelineConfigService = Depends(get_pipeline_config_service),
+):
+    mode = _resolve_ingest_mode(ingest)
+    settings = None
+    if mode != "off":
+        config_data, source = await service.load_config()
+        settings = settings_for(config_data, source)
+
     data_dir = _ensure_data_dir()
+    manager = get_upload_manager(data_dir)
     responses: List[FileUploadResponse] = []
     for file in files:
         target = data_dir / Path(file.filename).name
         with target.open("wb") as fp:
             shutil.copyfileobj(file.file, fp)
+        # Indexed so a later chunked upload of the same content is deduplicated against it.
+        await asyncio.to_thread(manager.record_file, target)
         responses.append(FileUploadResponse(filename=target.name, size=target.stat().st_size))
+        if mode != "off" and target.suffix.lower() in {".eml", ".msg", ".pst"}:
+            schedule_ingestion(target, mode, settings)
     return responses
 
 
+@router.post("/uploads", response_model=ChunkedUploadStatus)
+def init_chunked_upload(payload: ChunkedUploadInitPayload):
+    """Start a resumable upload; if the sha256 is already known the upload is skipped."""
+    manager = get_upload_manager(_ensure_data_dir())
+    duplicate = manager.find_duplicate(payload.sha256.lower(), payload.size) if payload.sha256 else None
+    if duplicate:
+        return ChunkedUploadStatus(
+            upload_id="",
+            filename=duplicate,
+            size=payload.size,
+            received=[[0, payload.size]],
+            received_bytes=payload.size,
+            next_offset=payload.size,
+            chunk_size=manager.chunk_size,
+            complete=True,
+            deduplicated=True,
+        )
+    try:
+        session = manager.init_upload(payload.filename, payload.size, payload.sha256)
+    except UploadError as exc:
+        raise _upload_http_error(exc) from exc
+    return ChunkedUploadStatus.from_session(session, manager.chunk_size)
+
+
+@router.get("/uploads/{upload_id}", response_model=ChunkedUploadStatus)
+def get_chunked_upload(upload_id: str):
+    """Report received byte ranges so a client can resume after a dropped connection."""
+    manager = get_upload_manager(_ensure_data_dir())
+    try:
+        session = manager.get_session(upload_id)
+    except UploadError as exc:
+        raise _upload_http_error(exc) from exc
+    return ChunkedUploadStatus.from_session(session, manager.chunk_size)
+
+
+@router.put("/uploads/{upload_id}", response_model=ChunkedUploadStatus)
+async def put_upload_chunk(upload_id: str, offset: int, request: Request):
+    """Write the raw request body at ``offset``; the body is streamed, not buffered."""
+    manager = get_upload_manager(_ensure_data_dir())
+    try:
+        session = await manager.write_chunk(upload_id, offset, request.stream())
+    except UploadError as exc:
+        raise _upload_http_error(exc) from exc
+    return ChunkedUploadStatus.from_session(session, manager.chunk_size)
+
+
+@router.post("/uploads/{upload_id}/complete", response_model=ChunkedUploadCompleteResponse)
+async def complete_chunked_upload(
+    upload_id: str,
+    ingest: str | None = None,
+    service: PipelineConfigService = Depends(get_pipeline_config_service),
+):
+    mode = _resolve_ingest_mode(ingest)
+    manager = get_upload_manager(_ensure_data_dir())
+    try:
+        filename, sha256, deduplicated = await asyncio.to_thread(manager.complete_upload, upload_id)
+    except UploadError as exc:
+        raise _upload_http_error(exc) from exc
+
+    target = manager.data_dir / filename
+    if mode != "off" and not deduplicated and target.suffix.lower() in {".eml", ".msg", ".pst"}:
+        config_data, source = await service.load_config()
+        schedule_ingestion(target, mode, settings_for(config_data, source))
+    return ChunkedUploadCompleteResponse(
+        filename=filename, size=target.stat().st_size, sha256=sha256, deduplicated=deduplicated
+    )
+
+
+@router.delete("/uploads/{upload_id}")
+def abort_chunked_upload(upload_id: str):
+    manager = get_upload_manager(_ensure_data_dir())
+    try:
+        manager.abort_upload(upload_id)
+    except UploadError as exc:
+        raise _upload_http_error(exc) from exc
+    return {"aborted": upload_id}
+
+
 @router.delete("/files", response_model=FileDeleteResponse)
 def delete_files(filenames: List[str]):
     data_dir = _ensure_data_dir()
@@ -132,46 +380,199 @@ async def update_pipeline_config(
 
 
 @router.post("/run", response_model=PipelineRunResponse)
-async def run_pipeline(service: PipelineConfigService = Depends(get_pipeline_config_service)):
-    await service.load_config()
+async def run_pipeline(
+    force: bool = False,
+    profile: bool = False,
+    profile_top: Optional[int] = None,
+    service: PipelineConfigService = Depends(get_pipeline_config_service),
+):
+    """Run the pipeline over data/.
+
+    ``profile=true`` runs it under cProfile when ``PIPELINE_PROFILING=request``
+    (409 if another run is being profiled); ``always`` profiles every run that
+    does not overlap a profiled one. The response then carries the artefact id
+    and the ``profile_top`` hottest functions.
+    """
+    mode = profiling_mode()
+    if profile and mode == "off":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="profiling is disabled (PIPELINE_PROFILING)")
+    profiler = RunProfiler(top_n=profile_top, required=profile) if profile or mode == "always" else None
+    try:
+        with collect_run() as run_metrics, profiler or contextlib.nullcontext():
+            response = await _run_pipeline(force, service)
+    except ProfilerBusyError as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc)) from exc
+    if run_metrics is not None:
+        response.timings = run_metrics.snapshot()
+    if profiler is not None:
+        response.profile = profiler.report()
+    return response
+
+
+def _parse_and_prepare(pipeline: Pipeline, path: Path) -> List[dict]:
+    return pipeline.prepare_messages(parse_email_file(path))
+
+
+async def _run_pipeline(force: bool, service: PipelineConfigService) -> PipelineRunResponse:
+    config_data, source = await service.load_config()
     data_dir = _ensure_data_dir()
     if not data_dir.exists():
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="data directory missing")
 
-    # Parse all files under data_dir (eml/msg/pst)
-    contents = []
+    # Let upload-time ingestion finish so its artefacts can be reused below.
+    await wait_for_ingestion()
+
+    # Reuse stored per-file results when neither the file nor the config changed;
+    # only new or modified files are parsed and embedded. Files ingested at upload
+    # time resume from their stored line-filtered bodies.
+    store = get_result_store()
+    prepared_store = get_prepared_store()
+    settings = settings_for(config_data, source)
+    pipeline = await get_pipeline(settings)
+    # Covers env-level settings and DB index rules, not only the stored config payload.
+    config_hash = pipeline.result_key
+    file_entries: List[dict] = []
+    prepared: List[dict] = []
+    # With PIPELINE_STAGED, files that need parsing run through the staged pipeline instead.
+    staged_entries: List[dict] = []
     for path in data_dir.iterdir():
-        if path.is_file():
-            contents.extend(parse_email_file(path))
-    if not contents:
+        if not path.is_file():
+            continue
+        file_hash = await asyncio.to_thread(hash_file, path) if store or prepared_store else ""
+        stored = await store.load(file_hash, config_hash) if store and not force else None
+        if stored is not None:
+            file_entries.append({"path": path, "hash": file_hash, "items": stored})
+            continue
+        stored_prepared = (
+            await prepared_store.load(file_hash, config_hash) if prepared_store and not force else None
+        )
+        if stored_prepared is not None:
+            file_prepared = restore_prepared(stored_prepared)
+        elif settings.PIPELINE_STAGED:
+            staged_entries.append({"path": path, "hash": file_hash})
+            file_entries.append(staged_entries[-1])
+            continue
+        else:
+            file_prepared = await asyncio.to_thread(_parse_and_prepare, pipeline, path)
+        file_entries.append({"path": path, "hash": file_hash, "start": len(prepared), "count": len(file_prepared)})
+        prepared.extend(file_prepared)
+
+    reused = sum(1 for entry in file_entries if "items" in entry)
+    logger.info(
+        "Pipeline run: files=%d, reused=%d, new_messages=%d, staged_files=%d",
+        len(file_entries),
+        reused,
+        len(prepared),
+        len(staged_entries),
+    )
+
+    results = await pipeline.process_prepared_async(prepared) if prepared else []
+    # Summaries to merge: stored per-message aggregations plus the batch summary of new messages.
+    partial_summaries = [item["aggregation"] for entry in file_entries if "items" in entry for item in entry["items"]]
+    if results and results.summary is not None:
+        partial_summaries.append(results.summary)
+
+    stage_metrics = None
+    if staged_entries:
+        runner = StagedPipeline(pipeline, parse=parse_email_file)
+        staged = await asyncio.to_thread(runner.run, [entry["path"] for entry in staged_entries])
+        for entry, file_results in zip(staged_entries, staged.results):
+            entry["results"] = file_results
+            partial_summaries.extend(res.aggregation for res in file_results)
+        stage_metrics = staged.metrics()
+
+    items: List[dict] = []
+    for entry in file_entries:
+        if "items" not in entry:
+            if "results" in entry:
+                file_results = entry["results"]
+            else:
+                file_results = results[entry["start"] : entry["start"] + entry["count"]]
+            entry["items"] = [serialize_pipeline_result(res) for res in file_results]
+            if store:
+                await store.save(entry["hash"], config_hash, entry["path"].name, entry["items"])
+        items.extend(entry["items"])
+
+    if not items:
         return PipelineRunResponse(
             results=[],
             summary={"message_count": 0, "block_count": 0, "keyword_summary": {}, "class_summary": {}},
         )
 
-    pipeline = Pipeline(Config)
-    results = pipeline.process_messages(contents)
-
-    serialized: list = []
-    all_blocks = []
-    for res in results:
-        serialized.append(
-            {
-                "source_path": res.source_path,
-                "subject": res.subject,
-                "semantic": res.semantic,
-                "aggregation": res.aggregation,
-            }
-        )
-        all_blocks.extend(res.blocks)
-
     # Overall summary across all messages
-    overall = pipeline.aggregator.aggregate_blocks(all_blocks) if pipeline.aggregator else {}
-    overall["message_count"] = len(results)
+    if "aggregator" in pipeline.steps:
+        overall = Aggregator.merge_aggregations(partial_summaries)
+    else:
+        all_blocks = [block for item in items for block in stored_blocks(item)]
+        overall = pipeline.aggregator.aggregate_blocks(all_blocks) if pipeline.aggregator else {}
+    overall["message_count"] = len(items)
 
     logger.info("Pipeline summary: %s", overall)
 
-    return PipelineRunResponse(results=serialized, summary=overall)
+    serialized = [{key: value for key, value in item.items() if key != "blocks"} for item in items]
+    return PipelineRunResponse(results=serialized, summary=overall, stages=stage_metrics)
+
+
+@router.post("/analyze", response_model=PipelineAnalyzeResponse)
+async def analyze_message(
+    request: Request,
+    filename: str | None = None,
+    service: PipelineConfigService = Depends(get_pipeline_config_service),
+):
+    """Analyze one message held entirely in memory using a warm, cached Pipeline.
+
+    Accepts raw EML (``message/rfc822``) or MSG bytes, ``text/plain`` bodies, or
+    JSON ``{"body": ..., "subject": ...}``. Nothing is written to ``data/``.
+    """
+    start = time.perf_counter()
+    payload = await request.body()
+    if not payload:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="empty request body")
+
+    config_data, source = await service.load_config()
+    message = _message_from_payload(payload, request.headers.get("content-type", ""), filename)
+    if message.error:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=message.error)
+
+    pipeline = await get_pipeline(settings_for(config_data, source))
+    results = await pipeline.process_messages_async([message])
+    elapsed_ms = (time.perf_counter() - start) * 1000.0
+    return PipelineAnalyzeResponse(result=_serialize_result(results[0]), elapsed_ms=elapsed_ms)
+
+
+@router.get("/semantic/batcher")
+def semantic_batcher_stats():
+    """Queue depth and batch-size histograms of the shared embedding batcher."""
+    if not Config.SEMANTIC_COALESCE_ENABLED or get_embedding_batcher.cache_info().currsize == 0:
+        return {"enabled": Config.SEMANTIC_COALESCE_ENABLED, "stats": None}
+    return {"enabled": True, "stats": get_embedding_batcher().stats()}
+
+
+@router.get("/parser/limits")
+def parser_limit_stats():
+    """How many parsed messages hit the body size budgets (BODY_MAX_PART_BYTES / BODY_MAX_CHARS)."""
+    return body_limit_stats()
+
+
+@router.get("/db/pool")
+def db_pool_stats():
+    """Live size of the shared asyncpg pools and acquire wait counters."""
+    return pool_stats()
+
+
+@router.get("/profiles/{profile_id}")
+def download_profile(profile_id: str):
+    """Raw cProfile stats of a profiled run (open with pstats or snakeviz)."""
+    path = profile_path(profile_id)
+    if path is None or not path.is_file():
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="profile not found")
+    return FileResponse(path, media_type="application/octet-stream", filename=path.name)
+
+
+@router.get("/line-filter/cache")
+def line_filter_cache_stats():
+    """Hit rate of the shared line-verdict cache (LINE_FILTER_CACHE_SIZE)."""
+    return line_verdict_cache_stats()
 
 
 @router.get("/files", response_model=List[FileListItem])
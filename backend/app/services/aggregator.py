@@ -1,11 +1,13 @@
 from __future__ import annotations
 
 from dataclasses import dataclass, asdict
+from collections import Counter
 from typing import Dict, List, Optional, Sequence
 
 from app.services.classifier import Classifier
 from app.services.extractor import KeywordExtractor, KeywordMatch
 from app.services.splitter import SplitBlock
+from app.utils.metrics import timed
 
 
 @dataclass
@@ -30,10 +32,51 @@ class Aggregator:
 
     def aggregate_blocks(self, blocks: Sequence[SplitBlock]) -> Dict[str, object]:
         texts = [b.text for b in blocks]
-        keyword_summary = self.keyword_extractor.summarize(texts) if self.keyword_extractor else {}
-        class_summary = self.classifier.summarize(texts) if self.classifier else {}
+        keyword_summary: Dict[str, object] = {}
+        class_summary: Dict[str, object] = {}
+        if self.keyword_extractor:
+            with timed("extract"):
+                keyword_summary = self.keyword_extractor.summarize(texts)
+        if self.classifier:
+            with timed("classify"):
+                class_summary = self.classifier.summarize(texts)
         return {
             "block_count": len(blocks),
             "keyword_summary": keyword_summary,
             "class_summary": class_summary,
         }
+
+    @staticmethod
+    def merge_aggregations(aggregations: Sequence[Dict[str, object]]) -> Dict[str, object]:
+        """Combine per-message aggregations without re-running extractor/classifier.
+
+        Keywords and classes are counted once per block, so summing counts across
+        messages equals aggregating all blocks together; ratios are recomputed.
+        """
+        total_blocks = 0
+        keyword_counts: Dict[str, Counter] = {}
+        class_counts: Counter = Counter()
+        for aggregation in aggregations:
+            total_blocks += int(aggregation.get("block_count", 0) or 0)
+            for category, items in (aggregation.get("keyword_summary") or {}).items():
+                counter = keyword_counts.setdefault(category, Counter())
+                for item in items:
+                    counter[item["keyword"]] += item["count"]
+            for cls, item in (aggregation.get("class_summary") or {}).items():
+                class_counts[cls] += item["count"]
+
+        keyword_summary: Dict[str, List[Dict[str, float]]] = {}
+        class_summary: Dict[str, Dict[str, float]] = {}
+        if total_blocks:
+            for category, counter in keyword_counts.items():
+                keyword_summary[category] = [
+                    {"keyword": keyword, "count": count, "ratio": count / total_blocks}
+                    for keyword, count in counter.most_common()
+                ]
+            for cls, count in class_counts.items():
+                class_summary[cls] = {"count": count, "ratio": count / total_blocks}
+        return {
+            "block_count": total_blocks,
+            "keyword_summary": keyword_summary,
+            "class_summary": class_summary,
+        }
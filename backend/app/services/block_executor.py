@@ -0,0 +1,227 @@
+"""Split/extract/classify stages after semantic, optionally spread across workers.
+
+Messages are independent once semantic extraction is done, so a batch is
+partitioned into contiguous slices (balanced by line count) and each slice runs
+``BlockStages`` in a worker. Every worker also merges its messages' aggregations
+into one partial summary; the partials are merged again by the caller, which is
+exact because ``Aggregator.merge_aggregations`` only sums per-block counts.
+
+``PIPELINE_CPU_EXECUTOR`` picks the worker type: ``thread`` only helps where the
+regex work runs without the GIL (free-threaded builds), ``process`` pays for
+pickling bodies and results but scales on the regular build, ``auto`` chooses
+between the two from the running interpreter.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import multiprocessing
+import os
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from app.services.aggregator import Aggregator
+from app.services.classifier import Classifier
+from app.services.extractor import KeywordExtractor
+from app.services.pipeline_settings import ConfigLike
+from app.services.preprocess import BodyLines
+from app.services.splitter import SplitBlock, Splitter
+from app.utils.config import Config
+from app.utils.logging import logger
+from app.utils.metrics import collect_run, count, merge_metrics, timed
+
+EXECUTOR_KINDS = ("serial", "thread", "process")
+# Slices per worker: small enough to even out uneven messages, large enough to amortize dispatch.
+_SLICES_PER_WORKER = 2
+
+BlockOutput = Tuple[List[SplitBlock], Dict[str, object]]
+
+
+class BlockStages:
+    """Splitter, keyword extractor, classifier and aggregator for one set of steps."""
+
+    def __init__(
+        self,
+        config: ConfigLike = Config,
+        steps: Sequence[str] = (),
+        marker_patterns: Optional[Sequence[str]] = None,
+    ):
+        self.steps = tuple(steps)
+        self.splitter = Splitter(config, marker_patterns) if "splitter" in self.steps else None
+        self.keyword_extractor = KeywordExtractor(config) if "extractor" in self.steps else None
+        self.classifier = (
+            Classifier(config.CLASSIFIER_FOREIGNER_PATH, config) if "classifier" in self.steps else None
+        )
+        self.aggregator = Aggregator(keyword_extractor=self.keyword_extractor, classifier=self.classifier)
+
+    @property
+    def aggregates(self) -> bool:
+        return "aggregator" in self.steps
+
+    def split(self, body: BodyLines) -> List[SplitBlock]:
+        if not self.splitter:
+            cleaned = body.text.strip()
+            return [SplitBlock(text=cleaned, start_line=0, end_line=len(cleaned.splitlines()) - 1)] if cleaned else []
+        with timed("split"):
+            blocks = self.splitter.split(body)
+        count("blocks", len(blocks))
+        return blocks
+
+    def run(self, body: BodyLines) -> BlockOutput:
+        blocks = self.split(body)
+        if not self.aggregates:
+            return blocks, {"blocks": [], "summary": {}}
+        # Includes the nested "extract" and "classify" timings.
+        with timed("aggregate"):
+            aggregation = self.aggregator.aggregate_blocks(blocks)
+        return blocks, aggregation
+
+    def run_slice(self, bodies: Sequence[BodyLines]) -> Tuple[List[BlockOutput], Optional[Dict[str, object]]]:
+        """Outputs for ``bodies`` plus their merged summary (``None`` without the aggregator step)."""
+        outputs = [self.run(body) for body in bodies]
+        summary = Aggregator.merge_aggregations([agg for _, agg in outputs]) if self.aggregates else None
+        return outputs, summary
+
+
+@dataclass
+class BlockBatch:
+    outputs: List[BlockOutput]
+    summary: Optional[Dict[str, object]]
+
+
+def resolve_executor_kind(kind: str) -> str:
+    """Map a configured executor name to ``serial``/``thread``/``process``."""
+    kind = (kind or "serial").strip().lower()
+    if kind == "auto":
+        gil_enabled = getattr(sys, "_is_gil_enabled", lambda: True)()
+        return "process" if gil_enabled else "thread"
+    if kind not in EXECUTOR_KINDS:
+        logger.warning("Unknown PIPELINE_CPU_EXECUTOR=%r; running block stages serially", kind)
+        return "serial"
+    return kind
+
+
+def partition(weights: Sequence[int], parts: int) -> List[range]:
+    """Split ``range(len(weights))`` into at most ``parts`` contiguous slices of similar total weight."""
+    size = len(weights)
+    parts = max(1, min(parts, size))
+    total = sum(weights)
+    slices: List[range] = []
+    start = acc = 0
+    for index, weight in enumerate(weights):
+        acc += weight
+        if len(slices) < parts - 1 and acc * parts >= total * (len(slices) + 1):
+            slices.append(range(start, index + 1))
+            start = index + 1
+    if start < size:
+        slices.append(range(start, size))
+    return slices
+
+
+# --- worker pools -----------------------------------------------------------
+_POOLS: Dict[Tuple[str, int], Executor] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def _get_pool(kind: str, workers: int) -> Executor:
+    with _POOLS_LOCK:
+        pool = _POOLS.get((kind, workers))
+        if pool is None:
+            if kind == "thread":
+                pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="block-stages")
+            else:
+                # The server process runs threads (event loop, executors), so never fork it.
+                pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _POOLS[(kind, workers)] = pool
+        return pool
+
+
+def shutdown_block_pools() -> None:
+    with _POOLS_LOCK:
+        pools = list(_POOLS.values())
+        _POOLS.clear()
+    for pool in pools:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+# Per worker process: stages built once per (config, steps, markers), least recently
+# used evicted like _PIPELINE_CACHE. Workers run one task at a time, so no lock.
+_WORKER_STAGES: "OrderedDict[tuple, BlockStages]" = OrderedDict()
+_WORKER_STAGES_SIZE = 4
+
+
+def _run_slice_in_worker(
+    config: ConfigLike, steps: Tuple[str, ...], markers: Optional[Tuple[str, ...]], bodies: List[BodyLines]
+):
+    """Process-pool entry point; markers come from the parent so workers never query index rules."""
+    key = (config, steps, markers)
+    stages = _WORKER_STAGES.get(key)
+    if stages is None:
+        stages = _WORKER_STAGES[key] = BlockStages(config, steps, markers)
+        while len(_WORKER_STAGES) > _WORKER_STAGES_SIZE:
+            _WORKER_STAGES.popitem(last=False)
+    else:
+        _WORKER_STAGES.move_to_end(key)
+    # Stage timings recorded here would stay in this process; they go back with the outputs.
+    with collect_run() as metrics:
+        outputs, summary = stages.run_slice(bodies)
+    return outputs, summary, metrics.export() if metrics is not None else None
+
+
+class BlockExecutor:
+    """Runs ``BlockStages`` over a batch serially or partitioned across a thread/process pool."""
+
+    def __init__(self, config: ConfigLike = Config):
+        self.config = config
+        self.kind = resolve_executor_kind(config.PIPELINE_CPU_EXECUTOR)
+        self.workers = config.PIPELINE_CPU_WORKERS or os.cpu_count() or 1
+        self.min_messages = config.PIPELINE_CPU_MIN_MESSAGES
+
+    def _is_serial(self, bodies: Sequence[BodyLines]) -> bool:
+        return self.kind == "serial" or self.workers <= 1 or len(bodies) < max(2, self.min_messages)
+
+    def _submit(self, stages: BlockStages, bodies: List[BodyLines]) -> List[Future]:
+        slices = partition([len(body) + 1 for body in bodies], self.workers * _SLICES_PER_WORKER)
+        pool = _get_pool(self.kind, self.workers)
+        if self.kind == "thread":
+            # Each task runs in a copy of the caller's context so per-run metrics follow it.
+            return [
+                pool.submit(contextvars.copy_context().run, stages.run_slice, bodies[s.start : s.stop]) for s in slices
+            ]
+        markers = stages.splitter.marker_sources if stages.splitter else None
+        return [
+            pool.submit(_run_slice_in_worker, self.config, stages.steps, markers, bodies[s.start : s.stop])
+            for s in slices
+        ]
+
+    @staticmethod
+    def _merge(stages: BlockStages, slice_results) -> BlockBatch:
+        outputs: List[BlockOutput] = []
+        partials: List[Dict[str, object]] = []
+        for slice_outputs, summary, *worker_metrics in slice_results:
+            if worker_metrics:
+                merge_metrics(worker_metrics[0])
+            outputs.extend(slice_outputs)
+            if summary is not None:
+                partials.append(summary)
+        summary = Aggregator.merge_aggregations(partials) if stages.aggregates else None
+        return BlockBatch(outputs, summary)
+
+    def run(self, stages: BlockStages, bodies: Sequence[BodyLines]) -> BlockBatch:
+        bodies = list(bodies)
+        if self._is_serial(bodies):
+            return BlockBatch(*stages.run_slice(bodies))
+        return self._merge(stages, [future.result() for future in self._submit(stages, bodies)])
+
+    async def run_async(self, stages: BlockStages, bodies: Sequence[BodyLines]) -> BlockBatch:
+        """``run`` for the event loop: serial batches go to a worker thread, pool futures are awaited."""
+        bodies = list(bodies)
+        if self._is_serial(bodies):
+            return BlockBatch(*await asyncio.to_thread(stages.run_slice, bodies))
+        futures = self._submit(stages, bodies)
+        return self._merge(stages, await asyncio.gather(*(asyncio.wrap_future(f) for f in futures)))
@@ -0,0 +1,381 @@
+from __future__ import annotations
+
+import asyncio
+import errno
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import AsyncIterator, BinaryIO, Dict, List, Optional, Tuple
+
+from app.services.results_store import hash_file
+from app.utils.config import Config
+from app.utils.logging import logger
+
+_UPLOAD_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+_INDEX_NAME = "hash_index.json"
+# Request-body pieces are gathered into blocks of this size before each threaded write.
+_WRITE_BLOCK = 1024 * 1024
+
+
+class UploadError(ValueError):
+    """Invalid chunked-upload request (bad offset, incomplete file, hash mismatch...)."""
+
+
+class UploadNotFoundError(UploadError):
+    """The upload id is malformed or no session exists for it."""
+
+
+@dataclass
+class UploadSession:
+    upload_id: str
+    filename: str
+    size: int
+    received: List[List[int]] = field(default_factory=list)
+    expected_sha256: str = ""
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "upload_id": self.upload_id,
+            "filename": self.filename,
+            "size": self.size,
+            "received": self.received,
+            "expected_sha256": self.expected_sha256,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, object]) -> "UploadSession":
+        return cls(
+            upload_id=str(data["upload_id"]),
+            filename=str(data["filename"]),
+            size=int(data["size"]),
+            received=[[int(a), int(b)] for a, b in data.get("received", [])],
+            expected_sha256=str(data.get("expected_sha256", "")),
+        )
+
+    @property
+    def received_bytes(self) -> int:
+        return sum(end - start for start, end in self.received)
+
+    @property
+    def complete(self) -> bool:
+        return self.received == [[0, self.size]] or (self.size == 0 and not self.received)
+
+    def next_offset(self) -> int:
+        """First byte not yet received; clients resume from here."""
+        if self.received and self.received[0][0] == 0:
+            return self.received[0][1]
+        return 0
+
+    def add_range(self, start: int, end: int) -> None:
+        ranges = sorted(self.received + [[start, end]])
+        merged: List[List[int]] = []
+        for current in ranges:
+            if merged and current[0] <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], current[1])
+            else:
+                merged.append(list(current))
+        self.received = merged
+
+
+@dataclass
+class _StreamingHash:
+    """sha256 over the contiguous received prefix, advanced as in-order chunks arrive."""
+
+    digest: "hashlib._Hash" = field(default_factory=hashlib.sha256)
+    offset: int = 0
+
+
+class ChunkedUploadManager:
+    """Resumable chunked uploads written straight to their offsets in a staging file.
+
+    Session state lives in a JSON manifest beside the ``.part`` file so uploads can
+    resume after a restart. The sha256 is computed while in-order chunks stream in;
+    anything the running hash could not cover is read back once at completion.
+    Completed files are deduplicated by content hash against earlier uploads and
+    files already in ``data/`` (hashed lazily, only those of the same size).
+    Sessions idle for ``UPLOAD_SESSION_TTL`` are swept when a new one starts.
+    A chunk claims the running hash for the duration of its stream, so a second
+    request at the same offset writes without hashing instead of feeding the
+    same digest twice; file I/O runs in worker threads.
+    """
+
+    def __init__(self, data_dir: Path, staging_dir: Optional[Path] = None, config: type[Config] = Config):
+        self.data_dir = Path(data_dir)
+        self.staging_dir = Path(staging_dir or config.UPLOAD_STAGING_DIR)
+        self.chunk_size = config.UPLOAD_CHUNK_SIZE
+        self.max_size = config.UPLOAD_MAX_SIZE
+        self.session_ttl = config.UPLOAD_SESSION_TTL
+        self._hashes: Dict[str, _StreamingHash] = {}
+        self._lock = threading.Lock()
+
+    # --- paths -------------------------------------------------------------
+    def _part_path(self, upload_id: str) -> Path:
+        return self.staging_dir / f"{upload_id}.part"
+
+    def _manifest_path(self, upload_id: str) -> Path:
+        return self.staging_dir / f"{upload_id}.json"
+
+    def _index_path(self) -> Path:
+        return self.staging_dir / _INDEX_NAME
+
+    # --- persistence -------------------------------------------------------
+    def _save_session(self, session: UploadSession) -> None:
+        tmp = self._manifest_path(session.upload_id).with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(session.to_dict()))
+        os.replace(tmp, self._manifest_path(session.upload_id))
+
+    def get_session(self, upload_id: str) -> UploadSession:
+        if not _UPLOAD_ID_RE.match(upload_id):
+            raise UploadNotFoundError("invalid upload id")
+        manifest = self._manifest_path(upload_id)
+        if not manifest.exists():
+            raise UploadNotFoundError(f"unknown upload id: {upload_id}")
+        return UploadSession.from_dict(json.loads(manifest.read_text()))
+
+    def _load_index(self) -> Dict[str, List]:
+        path = self._index_path()
+        if not path.exists():
+            return {}
+        try:
+            return json.loads(path.read_text())
+        except Exception:  # pragma: no cover - defensive
+            return {}
+
+    def _save_index(self, index: Dict[str, List]) -> None:
+        self.staging_dir.mkdir(parents=True, exist_ok=True)
+        tmp = self._index_path().with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(index))
+        os.replace(tmp, self._index_path())
+
+    def find_duplicate(self, sha256: str, size: Optional[int] = None) -> Optional[str]:
+        """Return the data/ filename already holding this content, if any.
+
+        Index entries record size and mtime so a file replaced since it was
+        indexed is not mistaken for a match. With ``size``, data/ files of that
+        size not indexed yet (e.g. copied in by hand) are hashed and indexed first.
+        """
+        name = self._indexed_match(self._load_index().get(sha256))
+        if name is None and size is not None and self._index_unknown_files(size):
+            name = self._indexed_match(self._load_index().get(sha256))
+        return name
+
+    def _indexed_match(self, entry: Optional[List]) -> Optional[str]:
+        if not entry:
+            return None
+        name, size, mtime_ns = entry
+        path = self.data_dir / name
+        if not path.is_file():
+            return None
+        stat = path.stat()
+        if stat.st_size != size or stat.st_mtime_ns != mtime_ns:
+            return None
+        return name
+
+    def _index_unknown_files(self, size: int) -> bool:
+        """Hash and index data/ files of ``size`` bytes that the index does not cover."""
+        if not self.data_dir.is_dir():
+            return False
+        known = {tuple(entry) for entry in self._load_index().values()}
+        found: Dict[str, List] = {}
+        for path in self.data_dir.iterdir():
+            if not path.is_file():
+                continue
+            stat = path.stat()
+            if stat.st_size == size and (path.name, stat.st_size, stat.st_mtime_ns) not in known:
+                found[hash_file(path)] = [path.name, stat.st_size, stat.st_mtime_ns]
+        if found:
+            with self._lock:
+                index = self._load_index()
+                index.update(found)
+                self._save_index(index)
+        return bool(found)
+
+    def record_file(self, path: Path, sha256: Optional[str] = None) -> str:
+        """Index a file written to data/ outside the chunked protocol (plain uploads)."""
+        sha256 = sha256 or hash_file(path)
+        stat = path.stat()
+        with self._lock:
+            index = self._load_index()
+            index[sha256] = [path.name, stat.st_size, stat.st_mtime_ns]
+            self._save_index(index)
+        return sha256
+
+    def sweep_stale(self) -> int:
+        """Remove sessions (manifest and ``.part``) idle for longer than ``UPLOAD_SESSION_TTL``."""
+        if self.session_ttl <= 0 or not self.staging_dir.is_dir():
+            return 0
+        cutoff = time.time() - self.session_ttl
+        removed = 0
+        for path in self.staging_dir.iterdir():
+            upload_id, _, suffix = path.name.partition(".")
+            if suffix not in ("json", "part") or not _UPLOAD_ID_RE.match(upload_id):
+                continue
+            manifest = self._manifest_path(upload_id)
+            try:
+                # Each chunk rewrites the manifest, so its mtime is the last activity.
+                last_active = (manifest if manifest.exists() else path).stat().st_mtime
+            except FileNotFoundError:
+                continue
+            if last_active >= cutoff:
+                continue
+            path.unlink(missing_ok=True)
+            if suffix == "json":
+                removed += 1
+                with self._lock:
+                    self._hashes.pop(upload_id, None)
+        if removed:
+            logger.info("Removed %d stale chunked uploads from %s", removed, self.staging_dir)
+        return removed
+
+    # --- protocol ----------------------------------------------------------
+    def init_upload(self, filename: str, size: int, expected_sha256: str = "") -> UploadSession:
+        if size < 0:
+            raise UploadError("size must be non-negative")
+        if self.max_size > 0 and size > self.max_size:
+            raise UploadError(f"size exceeds the {self.max_size} byte upload limit")
+        name = Path(filename).name
+        if name in ("", ".", ".."):
+            raise UploadError("invalid filename")
+        self.staging_dir.mkdir(parents=True, exist_ok=True)
+        self.sweep_stale()
+        session = UploadSession(
+            upload_id=uuid.uuid4().hex,
+            filename=name,
+            size=size,
+            expected_sha256=expected_sha256.lower(),
+        )
+        # Not preallocated: chunks extend the file as they land at their offsets.
+        self._part_path(session.upload_id).touch()
+        self._save_session(session)
+        with self._lock:
+            self._hashes[session.upload_id] = _StreamingHash()
+        return session
+
+    async def write_chunk(self, upload_id: str, offset: int, stream: AsyncIterator[bytes]) -> UploadSession:
+        session = await asyncio.to_thread(self.get_session, upload_id)
+        if offset < 0 or offset > session.size:
+            raise UploadError("offset out of range")
+
+        with self._lock:
+            hasher = self._hashes.get(upload_id)
+            hash_inline = hasher is not None and hasher.offset == offset
+            if hash_inline:
+                # Taken out while streaming: concurrent chunks cannot feed the same digest.
+                del self._hashes[upload_id]
+        position = offset
+        fp = await asyncio.to_thread(self._part_path(upload_id).open, "r+b")
+        try:
+            fp.seek(offset)
+            block: List[bytes] = []
+            pending = 0
+            async for data in stream:
+                if not data:
+                    continue
+                if position + pending + len(data) > session.size:
+                    raise UploadError("chunk exceeds declared file size")
+                block.append(data)
+                pending += len(data)
+                if pending >= _WRITE_BLOCK:
+                    await asyncio.to_thread(self._write_block, fp, block, hasher if hash_inline else None)
+                    position += pending
+                    block, pending = [], 0
+            if block:
+                await asyncio.to_thread(self._write_block, fp, block, hasher if hash_inline else None)
+                position += pending
+        finally:
+            # A failed chunk leaves the claimed hash ahead of the recorded ranges; it is
+            # not put back, so completion re-hashes from disk.
+            await asyncio.to_thread(fp.close)
+        if hash_inline:
+            hasher.offset = position
+            with self._lock:
+                self._hashes.setdefault(upload_id, hasher)
+
+        return await asyncio.to_thread(self._record_range, upload_id, offset, position)
+
+    @staticmethod
+    def _write_block(fp: BinaryIO, block: List[bytes], hasher: Optional[_StreamingHash]) -> None:
+        data = b"".join(block)
+        fp.write(data)
+        if hasher is not None:
+            hasher.digest.update(data)
+
+    def _record_range(self, upload_id: str, start: int, end: int) -> UploadSession:
+        with self._lock:
+            session = self.get_session(upload_id)
+            if end > start:
+                session.add_range(start, end)
+            self._save_session(session)
+        return session
+
+    def _finish_hash(self, session: UploadSession) -> str:
+        with self._lock:
+            hasher = self._hashes.pop(session.upload_id, None)
+        part = self._part_path(session.upload_id)
+        if hasher is None or hasher.offset == 0:
+            return hash_file(part)
+        if hasher.offset < session.size:
+            # Chunks arrived out of order (or after a restart); hash the remainder from disk.
+            with part.open("rb") as fp:
+                fp.seek(hasher.offset)
+                for chunk in iter(lambda: fp.read(1024 * 1024), b""):
+                    hasher.digest.update(chunk)
+        return hasher.digest.hexdigest()
+
+    def complete_upload(self, upload_id: str) -> Tuple[str, str, bool]:
+        """Finalize an upload; returns (filename in data/, sha256, deduplicated)."""
+        session = self.get_session(upload_id)
+        if not session.complete:
+            raise UploadError(f"upload incomplete: next missing offset {session.next_offset()}")
+
+        sha256 = self._finish_hash(session)
+        if session.expected_sha256 and session.expected_sha256 != sha256:
+            raise UploadError("sha256 mismatch; re-upload the file")
+
+        part = self._part_path(upload_id)
+        duplicate = self.find_duplicate(sha256, session.size)
+        if duplicate:
+            part.unlink(missing_ok=True)
+            filename = duplicate
+        else:
+            self.data_dir.mkdir(parents=True, exist_ok=True)
+            target = self.data_dir / session.filename
+            try:
+                os.replace(part, target)
+            except OSError as exc:
+                if exc.errno != errno.EXDEV:
+                    raise
+                # UPLOAD_STAGING_DIR on another filesystem than data/.
+                shutil.move(str(part), str(target))
+            filename = target.name
+            self.record_file(target, sha256)
+        self._manifest_path(upload_id).unlink(missing_ok=True)
+        logger.info("Chunked upload %s completed as %s (dedup=%s)", upload_id, filename, bool(duplicate))
+        return filename, sha256, bool(duplicate)
+
+    def abort_upload(self, upload_id: str) -> None:
+        self.get_session(upload_id)
+        with self._lock:
+            self._hashes.pop(upload_id, None)
+        self._part_path(upload_id).unlink(missing_ok=True)
+        self._manifest_path(upload_id).unlink(missing_ok=True)
+
+
+_MANAGERS: Dict[Tuple[Path, Path], ChunkedUploadManager] = {}
+
+
+def get_upload_manager(data_dir: Path, config: type[Config] = Config) -> ChunkedUploadManager:
+    """Process-wide manager per data dir, so running hashes survive across requests."""
+    key = (Path(data_dir), Path(config.UPLOAD_STAGING_DIR))
+    manager = _MANAGERS.get(key)
+    if manager is None:
+        manager = ChunkedUploadManager(data_dir, config=config)
+        _MANAGERS[key] = manager
+    return manager
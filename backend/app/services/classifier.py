@@ -7,6 +7,7 @@ from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, Dict, Iterable, List, Sequence
 
+from app.services.pipeline_settings import ConfigLike
 from app.utils.config import Config
 
 
@@ -33,7 +34,7 @@ class ClassifierConfig:
 class Classifier:
     """Generic regex-based classifier for job blocks."""
 
-    def __init__(self, config_path: str, config: type[Config] = Config):
+    def __init__(self, config_path: str, config: ConfigLike = Config):
         self.config_path = config_path
         self.config = config
         raw_config = getattr(config, "CLASSIFIER_FOREIGNER_CONFIG", None)
@@ -2,8 +2,9 @@ from __future__ import annotations
 
 import html
 import re
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Iterator, List
 
+from app.utils.config import Config
 from app.utils.logging import logger
 
 if TYPE_CHECKING:  # pragma: no cover - import guard for type hints
@@ -15,31 +16,144 @@ _BR_RE = re.compile(r"(?is)<br\s*/?>")
 _BLOCK_END_RE = re.compile(r"(?is)</(p|div|section|article|li|tr|td|th|h[1-6])>")
 _TAG_RE = re.compile(r"<[^>]+>")
 _INLINE_SPACE_RE = re.compile(r"[ \t\f\v]+")
+# Line boundaries recognised by str.splitlines besides \n, \r, \v and \f.
+_UNICODE_BREAK_RE = re.compile("[\x1c\x1d\x1e\x85\u2028\u2029]")
+
+# Streaming scanner: the same patterns, anchored at each "<" instead of run over the whole text.
+_SCRIPT_STYLE_OPEN_RE = re.compile(r"(?is)<(script|style).*?>")
+_SCRIPT_STYLE_CLOSE_RE = {
+    "script": re.compile(r"(?i)</script>"),
+    "style": re.compile(r"(?i)</style>"),
+}
 
 
 def strip_html(text: str) -> str:
     """Remove HTML/script/style tags and normalize whitespace."""
-    without_script = _SCRIPT_STYLE_RE.sub(" ", text)
-    with_breaks = _BR_RE.sub("\n", without_script)
-    with_blocks = _BLOCK_END_RE.sub("\n", with_breaks)
-    without_tags = _TAG_RE.sub(" ", with_blocks)
-    unescaped = html.unescape(without_tags)
-    return _normalize_whitespace(unescaped)
+    return "\n".join(html_to_lines(text))
+
+
+def html_to_lines(text: str) -> List[str]:
+    """``strip_html`` without the final join: the non-empty normalized lines."""
+    if Config.CLEANER_STREAMING:
+        return list(iter_html_lines(text))
+    return _normalized_lines(_replace_tags(text), unescape=False)
+
+
+def _replace_tags(text: str) -> str:
+    """Tag passes + unescape; passes whose pattern cannot occur are skipped."""
+    if "<" in text:
+        text = _SCRIPT_STYLE_RE.sub(" ", text)
+        text = _BR_RE.sub("\n", text)
+        text = _BLOCK_END_RE.sub("\n", text)
+        text = _TAG_RE.sub(" ", text)
+    if "&" in text:
+        text = html.unescape(text)
+    return text
+
+
+def iter_html_lines(text: str) -> Iterator[str]:
+    """Yield the lines ``strip_html`` produces, in one left-to-right scan.
+
+    Each ``<`` is classified once (script/style block, ``<br>``, block end, other
+    tag, or literal text) and text is buffered only up to the next line break,
+    so memory stays bounded by the longest line rather than the whole body.
+    A tag whose span contains another ``<`` is where the multi-pass order can
+    change the result, so the remainder from there goes through the regex passes.
+    """
+    pieces: List[str] = []
+    find = text.find
+    pos = scan = 0
+    while True:
+        i = find("<", scan)
+        if i == -1:
+            break
+        nxt = text[i + 1 : i + 2]
+        end = -1
+        separator = " "
+        if nxt == "/":
+            matched = _BLOCK_END_RE.match(text, i)
+            if matched:
+                end, separator = matched.end(), "\n"
+        elif nxt in ("b", "B"):
+            matched = _BR_RE.match(text, i)
+            if matched:
+                end, separator = matched.end(), "\n"
+        elif nxt in ("s", "S"):
+            opened = _SCRIPT_STYLE_OPEN_RE.match(text, i)
+            if opened:
+                closed = _SCRIPT_STYLE_CLOSE_RE[opened.group(1).lower()].search(text, opened.end())
+                if closed:
+                    end = closed.end()
+        if end == -1:
+            close = find(">", i + 1)
+            if close == -1:
+                break  # no tag can start from here on; the rest is literal text
+            if close == i + 1:
+                scan = i + 1  # "<>" is literal text
+                continue
+            if find("<", i + 1, close) != -1:
+                pieces.append(text[pos:i])
+                pending = "".join(pieces)
+                if "&" in pending:
+                    pending = html.unescape(pending)
+                yield from _normalized_lines(pending + _replace_tags(text[i:]), unescape=False)
+                return
+            end = close + 1
+        pieces.append(text[pos:i])
+        if separator == "\n":
+            yield from _normalized_lines("".join(pieces))
+            pieces = []
+        else:
+            pieces.append(separator)
+        pos = scan = end
+    pieces.append(text[pos:])
+    yield from _normalized_lines("".join(pieces))
 
 
 def clean_body(source: str | "EmailContent") -> str:
     """Extract the text body and remove HTML. Accepts raw text or EmailContent."""
-    raw = source.body if hasattr(source, "body") else str(source or "")
-    cleaned = strip_html(raw)
+    raw, lines = _source_lines(source)
+    cleaned = "\n".join(lines)
     logger.info("Cleaned body: input_len=%d, output_len=%d", len(raw), len(cleaned))
     return cleaned
 
 
+def clean_lines(source: str | "EmailContent") -> List[str]:
+    """Like ``clean_body`` but returns lines, the start of the line-oriented pipeline.
+
+    Lines are further split on the rarer Unicode line boundaries so they match
+    what ``str.splitlines`` on the cleaned text would give.
+    """
+    raw, lines = _source_lines(source)
+    if any(_UNICODE_BREAK_RE.search(line) for line in lines):
+        lines = [part for line in lines for part in line.splitlines()]
+    logger.info("Cleaned body: input_len=%d, output_lines=%d", len(raw), len(lines))
+    return lines
+
+
+def _source_lines(source: str | "EmailContent") -> tuple[str, List[str]]:
+    """Raw body and its lines; a ``plain`` EmailContent body keeps its angle brackets.
+
+    Raw strings have no declared type and are treated as HTML.
+    """
+    if not hasattr(source, "body"):
+        raw = str(source or "")
+        return raw, html_to_lines(raw)
+    raw = source.body or ""
+    if getattr(source, "body_type", "html") == "plain":
+        return raw, _normalized_lines(raw, unescape=False)
+    return raw, html_to_lines(raw)
+
+
+def _normalized_lines(text: str, unescape: bool = True) -> List[str]:
+    if unescape and "&" in text:
+        text = html.unescape(text)
+    if "\r" in text:
+        # 空行会被删除，"\r\n" 按两次换行处理结果相同
+        text = text.replace("\r", "\n")
+    # 删除空行
+    return [line for line in map(str.strip, _INLINE_SPACE_RE.sub(" ", text).split("\n")) if line]
+
+
 def _normalize_whitespace(text: str) -> str:
-    normalized_newlines = text.replace("\r\n", "\n").replace("\r", "\n")
-    lines = []
-    for line in normalized_newlines.split("\n"):
-        cleaned = _INLINE_SPACE_RE.sub(" ", line).strip()
-        if cleaned:  # 删除空行
-            lines.append(cleaned)
-    return "\n".join(lines)
+    return "\n".join(_normalized_lines(text, unescape=False))
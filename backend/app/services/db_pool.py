@@ -0,0 +1,188 @@
+"""Process-wide asyncpg connection pools shared by the database-backed services.
+
+asyncpg pools belong to the event loop that created them, so pools are kept
+per (DSN, loop); entries whose loop has been closed are dropped on lookup.
+Code running on a short-lived private loop (``asyncio.run`` in a sync helper)
+wraps itself in ``direct_connections()`` so ``acquire`` opens and closes one
+connection instead of leaving a pool behind on that loop.
+asyncpg is imported lazily so file-only deployments do not need it.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Dict, Iterator, List, Tuple
+
+from app.utils.config import Config
+from app.utils.logging import logger
+
+_POOLS: Dict[Tuple[str, int], Tuple[asyncio.AbstractEventLoop, "asyncio.Task[Any]"]] = {}
+_LOCK = threading.Lock()
+_DIRECT: ContextVar[bool] = ContextVar("db_direct_connections", default=False)
+
+
+class PoolStats:
+    """Process-wide acquire counters, reported next to each pool's live size."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self.pool_creations = 0
+        self.acquires = 0
+        self.acquire_failures = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def record_pool_creation(self) -> None:
+        with self._lock:
+            self.pool_creations += 1
+
+    def record_acquire(self, waited: float, ok: bool) -> None:
+        with self._lock:
+            if ok:
+                self.acquires += 1
+                self.wait_seconds += waited
+                self.max_wait_seconds = max(self.max_wait_seconds, waited)
+            else:
+                self.acquire_failures += 1
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "pool_creations": self.pool_creations,
+                "acquires": self.acquires,
+                "acquire_failures": self.acquire_failures,
+                "avg_wait_ms": round(self.wait_seconds / self.acquires * 1000, 3) if self.acquires else 0.0,
+                "max_wait_ms": round(self.max_wait_seconds * 1000, 3),
+            }
+
+
+_STATS = PoolStats()
+
+
+def build_dsn(config: type[Config] = Config, database: str | None = None) -> str:
+    user = config.DB_USER
+    password = config.DB_PASS
+    host = config.DB_HOST
+    port = config.DB_PORT
+    db = database or config.DB_NAME
+    if password:
+        return f"postgresql://{user}:{password}@{host}:{port}/{db}"
+    return f"postgresql://{user}@{host}:{port}/{db}"
+
+
+def _asyncpg():
+    try:
+        import asyncpg
+    except ImportError as exc:  # pragma: no cover - optional dep
+        raise RuntimeError("Database access requires asyncpg. Install it before enabling DB mode.") from exc
+    return asyncpg
+
+
+async def _create_pool(dsn: str, config: type[Config]):
+    asyncpg = _asyncpg()
+    pool = await asyncpg.create_pool(dsn, min_size=config.DB_POOL_MIN_SIZE, max_size=config.DB_POOL_MAX_SIZE)
+    logger.info("Created asyncpg pool (min=%d, max=%d)", config.DB_POOL_MIN_SIZE, config.DB_POOL_MAX_SIZE)
+    return pool
+
+
+async def get_pool(dsn: str, config: type[Config] = Config):
+    """Shared pool for ``dsn`` on the running loop, created once by the first caller."""
+    loop = asyncio.get_running_loop()
+    key = (dsn, id(loop))
+    with _LOCK:
+        for stale, (pool_loop, _) in list(_POOLS.items()):
+            if pool_loop.is_closed():
+                _POOLS.pop(stale, None)
+        entry = _POOLS.get(key)
+        if entry is None:
+            entry = _POOLS[key] = (loop, loop.create_task(_create_pool(dsn, config)))
+            _STATS.record_pool_creation()
+    try:
+        return await asyncio.shield(entry[1])
+    except Exception:
+        # A failed creation is forgotten so the next call retries.
+        with _LOCK:
+            if _POOLS.get(key) is entry and entry[1].done():
+                _POOLS.pop(key, None)
+        raise
+
+
+@contextmanager
+def direct_connections() -> Iterator[None]:
+    """Within this block ``acquire`` uses one-off connections rather than the shared pools."""
+    token = _DIRECT.set(True)
+    try:
+        yield
+    finally:
+        _DIRECT.reset(token)
+
+
+@asynccontextmanager
+async def acquire(dsn: str, config: type[Config] = Config) -> AsyncIterator[Any]:
+    """Borrow a connection from the shared pool, recording the wait in the pool metrics."""
+    if _DIRECT.get():
+        conn = await _asyncpg().connect(dsn)
+        try:
+            yield conn
+        finally:
+            await conn.close()
+        return
+    pool = await get_pool(dsn, config)
+    start = time.perf_counter()
+    try:
+        conn = await pool.acquire()
+    except Exception:
+        _STATS.record_acquire(0.0, ok=False)
+        raise
+    _STATS.record_acquire(time.perf_counter() - start, ok=True)
+    try:
+        yield conn
+    finally:
+        await pool.release(conn)
+
+
+def _redact(dsn: str) -> str:
+    scheme, sep, rest = dsn.partition("://")
+    credentials, at, location = rest.rpartition("@")
+    if not at:
+        return dsn
+    return f"{scheme}{sep}{credentials.split(':', 1)[0]}@{location}"
+
+
+def pool_stats() -> Dict[str, object]:
+    """Size/idle counts of the live pools plus the acquire counters."""
+    with _LOCK:
+        entries = list(_POOLS.items())
+    pools: List[Dict[str, object]] = []
+    for (dsn, _), (loop, task) in entries:
+        if loop.is_closed() or not task.done() or task.cancelled() or task.exception() is not None:
+            continue
+        pool = task.result()
+        pools.append(
+            {
+                "dsn": _redact(dsn),
+                "size": pool.get_size(),
+                "idle": pool.get_idle_size(),
+                "min_size": pool.get_min_size(),
+                "max_size": pool.get_max_size(),
+            }
+        )
+    return {"pools": pools, **_STATS.snapshot()}
+
+
+async def close_pools() -> None:
+    """Close the pools created on the running loop (application shutdown)."""
+    loop = asyncio.get_running_loop()
+    with _LOCK:
+        owned = [key for key, (pool_loop, _) in _POOLS.items() if pool_loop is loop]
+        tasks = [_POOLS.pop(key)[1] for key in owned]
+    for task in tasks:
+        if task.done() and not task.cancelled() and task.exception() is None:
+            await task.result().close()
@@ -1,21 +1,37 @@
 from __future__ import annotations
 
 import argparse
-import html
 import mailbox
+import mmap
+import multiprocessing
 import re
 import shutil
 import subprocess
 import tempfile
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from dataclasses import dataclass, field
 from datetime import datetime
 from email import policy
 from email.message import EmailMessage
 from email.parser import BytesParser
 from pathlib import Path
-from typing import List, Optional
+from typing import Callable, Dict, List, Optional, Tuple
 
+from app.services.eml_scanner import UnsupportedLayout, decode_part, scan_eml
+from app.utils.config import Config
 from app.utils.logging import logger
+from app.utils.metrics import count, timed
+
+
+_READPST_NAME_RE = re.compile(r"^(\d+)\.eml$")
+_READPST_POLL_SECONDS = 0.05
+# Idle polls back off up to this interval so a slow extraction is not rescanned 20x a second.
+_READPST_MAX_POLL_SECONDS = 0.8
+
+# (messages done, total messages) callback for long PST extractions.
+ProgressCallback = Callable[[int, int], None]
 
 
 @dataclass
@@ -27,18 +43,99 @@ class EmailContent:
     received_at: Optional[str] = None
     created_at: Optional[str] = None
     body: str = ""
+    # "plain" or "html"; HTML is kept as-is and stripped once by the cleaner.
+    body_type: str = "plain"
     parser: str = ""
     error: Optional[str] = None
+    # Size budgets: body was cut to BODY_MAX_CHARS / text parts skipped for exceeding BODY_MAX_PART_BYTES.
+    body_truncated: bool = False
+    skipped_parts: int = 0
+
+
+def _part_over_budget(size: int, content: EmailContent) -> bool:
+    """True (and recorded) when a raw text part is too large to be worth decoding."""
+    limit = Config.BODY_MAX_PART_BYTES
+    if limit > 0 and size > limit:
+        content.skipped_parts += 1
+        return True
+    return False
+
+
+def _payload_size(part) -> int:
+    payload = part.get_payload()
+    return len(payload) if isinstance(payload, (str, bytes)) else 0
+
+
+def _budget_text(text: str, content: EmailContent, is_html: bool = False) -> str:
+    """Truncate a decoded body to BODY_MAX_CHARS and record its type.
+
+    HTML is returned unstripped (the cleaner does the only HTML pass); a tag
+    left open by the cut is dropped.
+    """
+    limit = Config.BODY_MAX_CHARS
+    if limit > 0 and len(text) > limit:
+        content.body_truncated = True
+        text = text[:limit]
+        if is_html:
+            open_tag = text.rfind("<")
+            if open_tag > text.rfind(">"):
+                text = text[:open_tag]
+    if is_html and text:
+        content.body_type = "html"
+    return text
+
+
+class BodyLimitStats:
+    """Process-wide counters of messages that hit the body size budgets."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self.messages = 0
+        self.truncated_messages = 0
+        self.skipped_part_messages = 0
+        self.skipped_parts = 0
+
+    def record(self, contents: List[EmailContent]) -> None:
+        with self._lock:
+            for content in contents:
+                self.messages += 1
+                if content.body_truncated:
+                    self.truncated_messages += 1
+                if content.skipped_parts:
+                    self.skipped_part_messages += 1
+                    self.skipped_parts += content.skipped_parts
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "max_part_bytes": Config.BODY_MAX_PART_BYTES,
+                "max_chars": Config.BODY_MAX_CHARS,
+                "messages": self.messages,
+                "truncated_messages": self.truncated_messages,
+                "skipped_part_messages": self.skipped_part_messages,
+                "skipped_parts": self.skipped_parts,
+            }
 
 
-def _strip_html(html_text: str) -> str:
-    cleaned = re.sub(r"(?is)<(script|style).*?>.*?</\1>", "", html_text)
-    text = re.sub(r"<[^>]+>", "", cleaned)
-    return html.unescape(text)
+_BODY_LIMITS = BodyLimitStats()
+
+
+def body_limit_stats() -> Dict[str, int]:
+    """Counters of parsed messages that were truncated or had parts skipped."""
+    return _BODY_LIMITS.snapshot()
 
 
 def _parse_msg(path: Path) -> EmailContent:
-    content = EmailContent(source_path=str(path))
+    return _parse_msg_source(str(path), source_path=str(path))
+
+
+def _parse_msg_source(source, source_path: str) -> EmailContent:
+    """Parse a .msg from a filesystem path or raw OLE bytes."""
+    content = EmailContent(source_path=source_path)
+    msg = None
     try:
         import extract_msg
     except Exception:  # pragma: no cover - optional dependency
@@ -46,7 +143,7 @@ def _parse_msg(path: Path) -> EmailContent:
         return content
 
     try:
-        msg = extract_msg.Message(str(path))
+        msg = extract_msg.Message(source)
         content.subject = msg.subject or ""
         content.sender = msg.sender or getattr(msg, "senderEmail", "") or ""
 
@@ -66,31 +163,36 @@ def _parse_msg(path: Path) -> EmailContent:
         elif raw_date:
             content.received_at = str(raw_date)
 
-        html_body = getattr(msg, "htmlBody", None)
-        rtf_body = getattr(msg, "rtfBody", None)
-        body = msg.body or ""
-        if not body and html_body:
-            body = _strip_html(html_body)
-        if not body and rtf_body:
-            try:
-                import compressed_rtf
+        body = _budget_text(msg.body or "", content)
+        if not body:
+            html_body = getattr(msg, "htmlBody", None)
+            if html_body and not _part_over_budget(len(html_body), content):
+                if isinstance(html_body, bytes):
+                    html_body = html_body.decode("utf-8", errors="replace")
+                body = _budget_text(html_body, content, is_html=True)
+        if not body:
+            rtf_body = getattr(msg, "rtfBody", None)
+            if rtf_body and not _part_over_budget(len(rtf_body), content):
+                try:
+                    import compressed_rtf
 
-                body = compressed_rtf.rtf_to_text(rtf_body)
-            except Exception:
-                body = ""
+                    body = _budget_text(compressed_rtf.rtf_to_text(rtf_body), content)
+                except Exception:
+                    body = ""
         content.body = body
         content.parser = "extract-msg"
     except Exception as exc:  # pragma: no cover - defensive
         content.error = f"failed to parse msg: {exc}"
     finally:
         try:
-            msg.close()
+            if msg is not None:
+                msg.close()
         except Exception:
             pass
     return content
 
 
-def _parse_pst(path: Path) -> List[EmailContent]:
+def _parse_pst(path: Path, progress: Optional[ProgressCallback] = None) -> List[EmailContent]:
     try:
         import pypff  # type: ignore
     except Exception:
@@ -110,7 +212,15 @@ def _parse_pst(path: Path) -> List[EmailContent]:
         pst = pypff.file()
         pst.open(str(path))
         root = pst.get_root_folder()
-        _collect_pst_folder(root, messages)
+        if Config.PST_PARALLEL_WORKERS > 1:
+            try:
+                messages = _collect_pst_parallel(path, root, Config.PST_PARALLEL_WORKERS, progress)
+            except Exception as exc:
+                logger.warning("Parallel PST extraction failed, retrying in one process: %s", exc)
+                messages = []
+                _collect_pst_folder(root, messages)
+        else:
+            _collect_pst_folder(root, messages)
     except Exception as exc:  # pragma: no cover - defensive
         messages.append(
             EmailContent(
@@ -127,8 +237,12 @@ def _parse_pst(path: Path) -> List[EmailContent]:
     return messages
 
 
-def _extract_eml_body(message: EmailMessage) -> str:
-    """Return a plaintext body, stripping HTML if needed."""
+def _extract_eml_body(message: EmailMessage, content: Optional[EmailContent] = None) -> str:
+    """Return the text/plain body, else the raw text/html body (typed on ``content``).
+
+    Budget hits and the body type are recorded on ``content`` when given.
+    """
+    content = content if content is not None else EmailContent(source_path="")
     if message.is_multipart():
         plain: Optional[str] = None
         html_body: Optional[str] = None
@@ -136,57 +250,132 @@ def _extract_eml_body(message: EmailMessage) -> str:
             if part.get_content_maintype() == "multipart":
                 continue
             if part.get_content_type() == "text/plain" and plain is None:
+                if _part_over_budget(_payload_size(part), content):
+                    continue
                 try:
                     plain = part.get_content()
                 except Exception:
                     plain = None
             elif part.get_content_type() == "text/html" and html_body is None:
+                if _part_over_budget(_payload_size(part), content):
+                    continue
                 try:
                     html_body = part.get_content()
                 except Exception:
                     html_body = None
         if plain:
-            return plain
+            return _budget_text(plain, content)
         if html_body:
-            return _strip_html(html_body)
+            return _budget_text(html_body, content, is_html=True)
+        return ""
+    if _part_over_budget(_payload_size(message), content):
         return ""
     try:
-        if message.get_content_type() == "text/html":
-            return _strip_html(message.get_content())
-        return message.get_content()
+        return _budget_text(message.get_content(), content, is_html=message.get_content_type() == "text/html")
     except Exception:
         return ""
 
 
 def _parse_eml(path: Path) -> EmailContent:
+    if Config.EML_FAST_PARSE:
+        try:
+            return _parse_eml_mmap(path)
+        except UnsupportedLayout as exc:
+            logger.debug("EML fast path skipped for %s: %s", path, exc)
+        except Exception as exc:  # pragma: no cover - defensive
+            logger.warning("EML fast path failed for %s, using full parser: %s", path, exc)
+    return _parse_eml_full(path)
+
+
+def _parse_eml_full(path: Path) -> EmailContent:
     content = EmailContent(source_path=str(path), parser="eml")
     try:
-        msg = BytesParser(policy=policy.default).parse(path.open("rb"))
-        content.subject = msg.get("subject", "") or ""
-        content.sender = msg.get("from", "") or ""
-
-        recips: List[str] = []
-        for key in ("to", "cc", "bcc"):
-            values = msg.get_all(key)
-            if values:
-                recips.extend(values)
-        content.recipients = recips
+        with path.open("rb") as fp:
+            msg = BytesParser(policy=policy.default).parse(fp)
+        _fill_eml_content(content, msg)
+    except Exception as exc:  # pragma: no cover - defensive
+        content.error = f"failed to parse eml: {exc}"
+    return content
 
-        date_value = msg.get("date")
-        if date_value:
-            content.received_at = str(date_value)
 
-        content.body = _extract_eml_body(msg)
+def _parse_eml_bytes(data: bytes, source_path: str) -> EmailContent:
+    content = EmailContent(source_path=source_path, parser="eml")
+    try:
+        msg = BytesParser(policy=policy.default).parsebytes(data)
+        _fill_eml_content(content, msg)
     except Exception as exc:  # pragma: no cover - defensive
         content.error = f"failed to parse eml: {exc}"
     return content
 
 
+def _parse_eml_mmap(path: Path) -> EmailContent:
+    """Fast path: mmap the file, scan headers/boundaries and decode only the chosen text part.
+
+    Raises ``UnsupportedLayout`` for structures the scanner does not handle.
+    """
+    content = EmailContent(source_path=str(path), parser="eml")
+    with path.open("rb") as fp:
+        if fp.seek(0, 2) == 0:
+            raise UnsupportedLayout("empty file")
+        with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            scan = scan_eml(buf)
+            _fill_eml_headers(content, scan.headers)
+            if not scan.is_multipart:
+                content.body = _extract_eml_body(decode_part(buf, scan.plain), content)
+                return content
+
+            plain: Optional[str] = None
+            html_body: Optional[str] = None
+            # Span sizes are known from the scan, so oversized parts are never decoded.
+            if scan.plain is not None and not _part_over_budget(scan.plain[1] - scan.plain[0], content):
+                try:
+                    plain = decode_part(buf, scan.plain).get_content()
+                except Exception:
+                    plain = None
+            if not plain and scan.html is not None and not _part_over_budget(scan.html[1] - scan.html[0], content):
+                try:
+                    html_body = decode_part(buf, scan.html).get_content()
+                except Exception:
+                    html_body = None
+    if plain:
+        content.body = _budget_text(plain, content)
+    elif html_body:
+        content.body = _budget_text(html_body, content, is_html=True)
+    return content
+
+
+def _fill_eml_content(content: EmailContent, msg: EmailMessage) -> None:
+    _fill_eml_headers(content, msg)
+    content.body = _extract_eml_body(msg, content)
+
+
+def _fill_eml_headers(content: EmailContent, msg: EmailMessage) -> None:
+    content.subject = msg.get("subject", "") or ""
+    content.sender = msg.get("from", "") or ""
+
+    recips: List[str] = []
+    for key in ("to", "cc", "bcc"):
+        values = msg.get_all(key)
+        if values:
+            recips.extend(values)
+    content.recipients = recips
+
+    date_value = msg.get("date")
+    if date_value:
+        content.received_at = str(date_value)
+
+
 def _parse_pst_via_readpst(path: Path) -> List[EmailContent]:
-    """Fallback using readpst (libpst) CLI to convert PST -> mbox, then parse."""
+    """Fallback using readpst (libpst) CLI when pypff is unavailable."""
     if shutil.which("readpst") is None:
         return []
+    if Config.READPST_STREAMING:
+        return _stream_pst_via_readpst(path)
+    return _parse_pst_via_readpst_mbox(path)
+
 
+def _parse_pst_via_readpst_mbox(path: Path) -> List[EmailContent]:
+    """Convert the whole PST to mbox files in a temp dir, then parse them."""
     parsed: List[EmailContent] = []
     with tempfile.TemporaryDirectory() as tmpdir:
         out_dir = Path(tmpdir) / "out"
@@ -224,6 +413,107 @@ def _parse_pst_via_readpst(path: Path) -> List[EmailContent]:
     return parsed
 
 
+def _ready_readpst_files(out_dir: Path, finished: bool, sequential: bool) -> List[Tuple[Tuple[str, int], Path]]:
+    """Per-message files that readpst has finished writing.
+
+    readpst numbers messages per folder (``1.eml``, ``2.eml`` ...). In sequential
+    mode a file is complete once a higher-numbered sibling exists; with parallel
+    jobs only the process exit guarantees completeness.
+    """
+    if not finished and not sequential:
+        return []
+    by_folder: Dict[Path, List[Tuple[int, Path]]] = {}
+    for candidate in out_dir.rglob("*.eml"):
+        match = _READPST_NAME_RE.match(candidate.name)
+        if match:
+            by_folder.setdefault(candidate.parent, []).append((int(match.group(1)), candidate))
+
+    ready: List[Tuple[Tuple[str, int], Path]] = []
+    for folder, files in by_folder.items():
+        files.sort()
+        if not finished:
+            files = files[:-1]
+        folder_key = str(folder.relative_to(out_dir))
+        ready.extend(((folder_key, number), file) for number, file in files)
+    return ready
+
+
+def _parse_readpst_message(file: Path, source: str) -> EmailContent:
+    try:
+        with file.open("rb") as fp:
+            message = BytesParser(policy=policy.default).parse(fp)
+        return _email_message_to_content(message, source)
+    except Exception as exc:  # pragma: no cover - defensive
+        return EmailContent(source_path=source, parser="readpst", error=f"failed to parse {file.name}: {exc}")
+    finally:
+        # Drop each message as soon as it is parsed so temp space stays bounded.
+        file.unlink(missing_ok=True)
+
+
+def _stream_pst_via_readpst(path: Path) -> List[EmailContent]:
+    """Run readpst in per-message mode and parse messages while it is still extracting.
+
+    readpst cannot write to stdout, so messages land as individual ``.eml`` files;
+    each is parsed and deleted as soon as it is complete instead of materializing
+    every folder as an mbox first. ``READPST_JOBS`` > 0 lets readpst extract
+    folders in parallel, but then even one folder's files may be written out of
+    order, so nothing is known to be complete before it exits: streaming and
+    bounded temp space only apply without ``-j``. Completed files are parsed on
+    a thread pool and merged back in folder/message order.
+    """
+    jobs = max(0, Config.READPST_JOBS)
+    sequential = jobs == 0
+    source = str(path)
+    futures: Dict[Tuple[str, int], Future] = {}
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        out_dir = Path(tmpdir) / "out"
+        out_dir.mkdir(parents=True, exist_ok=True)
+        stderr_path = Path(tmpdir) / "stderr.log"
+        with stderr_path.open("w") as stderr_fp, ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+            proc = subprocess.Popen(
+                ["readpst", "-e", "-q", "-j", str(jobs), "-o", str(out_dir), source],
+                stdout=subprocess.DEVNULL,
+                stderr=stderr_fp,
+            )
+            if not sequential:
+                proc.wait()
+            delay = _READPST_POLL_SECONDS
+            while True:
+                finished = proc.poll() is not None
+                submitted = len(futures)
+                for key, file in _ready_readpst_files(out_dir, finished, sequential):
+                    if key not in futures:
+                        futures[key] = pool.submit(_parse_readpst_message, file, source)
+                if finished:
+                    break
+                if len(futures) == submitted:
+                    delay = min(delay * 2, _READPST_MAX_POLL_SECONDS)
+                else:
+                    delay = _READPST_POLL_SECONDS
+                time.sleep(delay)
+            results = {key: future.result() for key, future in futures.items()}
+
+        if proc.returncode != 0:
+            return [
+                EmailContent(
+                    source_path=source,
+                    parser="readpst",
+                    error=f"readpst failed: {stderr_path.read_text(errors='replace').strip()}",
+                )
+            ]
+
+    if not results:
+        return [
+            EmailContent(
+                source_path=source,
+                parser="readpst",
+                error="readpst succeeded but no messages were produced",
+            )
+        ]
+    return [results[key] for key in sorted(results)]
+
+
 def _parse_mbox_file(mbox_path: Path, source: str) -> List[EmailContent]:
     messages: List[EmailContent] = []
     try:
@@ -258,29 +548,32 @@ def _email_message_to_content(message: EmailMessage, source: str) -> EmailConten
     if date:
         content.received_at = date
 
-    content.body = _extract_email_body(message)
+    content.body = _extract_email_body(message, content)
     return content
 
 
-def _extract_email_body(message: EmailMessage) -> str:
+def _extract_email_body(message: EmailMessage, content: Optional[EmailContent] = None) -> str:
+    content = content if content is not None else EmailContent(source_path="")
     if message.is_multipart():
         for part in message.walk():
-            if part.get_content_type() == "text/plain":
+            if part.get_content_type() == "text/plain" and not _part_over_budget(_payload_size(part), content):
                 try:
-                    return part.get_content().strip()
+                    return _budget_text(part.get_content(), content).strip()
                 except Exception:
                     continue
         for part in message.walk():
-            if part.get_content_type() == "text/html":
+            if part.get_content_type() == "text/html" and not _part_over_budget(_payload_size(part), content):
                 try:
-                    return _strip_html(part.get_content())
+                    return _budget_text(part.get_content(), content, is_html=True)
                 except Exception:
                     continue
         return ""
+    if _part_over_budget(_payload_size(message), content):
+        return ""
     try:
         if message.get_content_type() == "text/html":
-            return _strip_html(message.get_content())
-        return message.get_content().strip()
+            return _budget_text(message.get_content(), content, is_html=True)
+        return _budget_text(message.get_content(), content).strip()
     except Exception:
         return ""
 
@@ -304,6 +597,126 @@ def _collect_pst_folder(folder, messages: List[EmailContent], folder_name: Optio
         return
 
 
+@dataclass(frozen=True)
+class _PstFolderRef:
+    """A folder addressed by its sub-folder indices from the root, so workers can re-open it."""
+
+    index_path: Tuple[int, ...]
+    name: Optional[str]
+    message_count: int
+
+
+def _enumerate_pst_folders(
+    folder,
+    index_path: Tuple[int, ...] = (),
+    folder_name: Optional[str] = None,
+    refs: Optional[List[_PstFolderRef]] = None,
+) -> List[_PstFolderRef]:
+    """List folders in the same pre-order ``_collect_pst_folder`` visits them, without reading messages."""
+    refs = [] if refs is None else refs
+    folder_name = folder_name or getattr(folder, "get_name", lambda: "Root")()
+    try:
+        refs.append(_PstFolderRef(index_path, folder_name, folder.get_number_of_sub_messages()))
+        for i in range(folder.get_number_of_sub_folders()):
+            try:
+                sub = folder.get_sub_folder(i)
+                _enumerate_pst_folders(sub, index_path + (i,), sub.get_name(), refs)
+            except Exception:
+                continue
+    except Exception:
+        pass
+    return refs
+
+
+# Per-process pypff handles, opened lazily by pool workers and reused across tasks.
+_WORKER_PST_HANDLES: Dict[str, object] = {}
+
+
+def _extract_pst_range(
+    source: str, index_path: Tuple[int, ...], folder_name: Optional[str], start: int, end: int
+) -> Tuple[List[EmailContent], int]:
+    """Worker entry point: decode messages ``[start, end)`` of one folder via this process's own handle.
+
+    Returns the decoded messages and how many in the range could not be decoded.
+    """
+    pst = _WORKER_PST_HANDLES.get(source)
+    if pst is None:
+        import pypff  # type: ignore
+
+        pst = pypff.file()
+        pst.open(source)
+        _WORKER_PST_HANDLES[source] = pst
+    folder = pst.get_root_folder()
+    for i in index_path:
+        folder = folder.get_sub_folder(i)
+    messages: List[EmailContent] = []
+    failures = 0
+    for i in range(start, end):
+        try:
+            messages.append(_pst_item_to_content(folder.get_sub_message(i), folder_name))
+        except Exception as exc:
+            failures += 1
+            logger.warning("Skip undecodable PST message %s[%d] in %s: %s", folder_name, i, source, exc)
+    return messages, failures
+
+
+def _log_pst_progress(source: str) -> ProgressCallback:
+    step = {"next": 0.0}
+
+    def report(done: int, total: int) -> None:
+        ratio = done / total if total else 1.0
+        if ratio >= step["next"] or done == total:
+            logger.info("PST extraction %s: %d/%d messages", source, done, total)
+            step["next"] = ratio + 0.1
+
+    return report
+
+
+def _collect_pst_parallel(
+    path: Path, root, workers: int, progress: Optional[ProgressCallback] = None
+) -> List[EmailContent]:
+    """Extract a PST across processes and merge the results in folder order.
+
+    Folder and message indices are enumerated up front on the parent's handle;
+    each ``PST_PARALLEL_CHUNK``-sized message range then becomes one task.
+    Messages come back in the same order as the single-process walk; messages
+    that fail to decode are logged by the worker and counted here.
+    """
+    source = str(path)
+    chunk = max(1, Config.PST_PARALLEL_CHUNK)
+    tasks: List[Tuple[Tuple[int, int], _PstFolderRef, int, int]] = []
+    for ordinal, ref in enumerate(_enumerate_pst_folders(root)):
+        for start in range(0, ref.message_count, chunk):
+            tasks.append(((ordinal, start), ref, start, min(start + chunk, ref.message_count)))
+    total = sum(end - start for _, _, start, end in tasks)
+    if not tasks:
+        return []
+
+    report = progress or _log_pst_progress(source)
+    chunks: Dict[Tuple[int, int], List[EmailContent]] = {}
+    done = failures = 0
+    # The server process runs threads (event loop, executors), so never fork it.
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks)), mp_context=context) as pool:
+        futures = {
+            pool.submit(_extract_pst_range, source, ref.index_path, ref.name, start, end): (key, end - start)
+            for key, ref, start, end in tasks
+        }
+        for future in as_completed(futures):
+            key, size = futures[future]
+            chunks[key], failed = future.result()
+            failures += failed
+            done += size
+            report(done, total)
+    if failures:
+        logger.warning("PST extraction %s: %d of %d messages could not be decoded", source, failures, total)
+
+    messages: List[EmailContent] = []
+    for key in sorted(chunks):
+        messages.extend(chunks[key])
+    return messages
+
+
 def _pst_item_to_content(item, folder_name: str) -> EmailContent:
     content = EmailContent(source_path=folder_name, parser="pypff")
     content.subject = getattr(item, "get_subject", lambda: "")() or ""
@@ -335,23 +748,52 @@ def _pst_item_to_content(item, folder_name: str) -> EmailContent:
         content.created_at = str(created)
 
     body = getattr(item, "get_plain_text_body", lambda: "")() or ""
-    if not body:
+    if body:
+        content.body = _budget_text(body, content)
+    else:
         body = getattr(item, "get_html_body", lambda: "")() or ""
-    content.body = _strip_html(body) if body else ""
+        content.body = _budget_text(body, content, is_html=True) if body else ""
     return content
 
 
-def parse_email_file(path: Path) -> List[EmailContent]:
+def parse_email_file(path: Path, progress: Optional[ProgressCallback] = None) -> List[EmailContent]:
+    """Parse one .eml/.msg/.pst file; ``progress(done, total)`` follows parallel PST extraction."""
     path = path.resolve()
     suffix = path.suffix.lower()
     logger.info("Parsing email file: %s", path)
-    if suffix == ".msg":
-        return [_parse_msg(path)]
-    if suffix == ".pst":
-        return _parse_pst(path)
-    if suffix == ".eml":
-        return [_parse_eml(path)]
-    raise ValueError(f"unsupported file type: {suffix}")
+    with timed("parse"):
+        if suffix == ".msg":
+            results = [_parse_msg(path)]
+        elif suffix == ".pst":
+            results = _parse_pst(path, progress)
+        elif suffix == ".eml":
+            results = [_parse_eml(path)]
+        else:
+            raise ValueError(f"unsupported file type: {suffix}")
+    count("messages_parsed", len(results))
+    _BODY_LIMITS.record(results)
+    return results
+
+
+_OLE_MAGIC = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"
+
+
+def parse_email_bytes(data: bytes, filename: str = "") -> EmailContent:
+    """Parse a single in-memory EML/MSG payload without touching disk.
+
+    The format is taken from ``filename`` when given, otherwise sniffed from the
+    OLE2 signature that every .msg file starts with.
+    """
+    source_path = filename or "<memory>"
+    suffix = Path(filename).suffix.lower() if filename else ""
+    if suffix == ".msg" or (not suffix and data.startswith(_OLE_MAGIC)):
+        content = _parse_msg_source(data, source_path=source_path)
+    elif suffix in {"", ".eml"}:
+        content = _parse_eml_bytes(data, source_path=source_path)
+    else:
+        raise ValueError(f"unsupported in-memory file type: {suffix}")
+    _BODY_LIMITS.record([content])
+    return content
 
 
 def parse_directory(path: Path) -> List[EmailContent]:
@@ -0,0 +1,133 @@
+"""Header-only EML scanner used by the mmap fast path in ``email_parser``.
+
+Instead of building the full MIME tree, the scanner parses the top-level
+headers, walks multipart boundaries directly on the (memory-mapped) buffer and
+records the byte range of the first ``text/plain`` and ``text/html`` parts.
+Only the chosen part is later handed to the stdlib parser for decoding, so
+attachment payloads are never copied or decoded.
+"""
+
+from __future__ import annotations
+
+import io
+from dataclasses import dataclass
+from email import policy
+from email.message import EmailMessage
+from email.parser import BytesParser
+from typing import Optional, Tuple
+
+# Guard against pathological nesting in crafted messages.
+_MAX_DEPTH = 8
+
+
+class UnsupportedLayout(Exception):
+    """The fast path cannot handle this message; callers fall back to the full parser."""
+
+
+@dataclass
+class EmlScan:
+    headers: EmailMessage
+    is_multipart: bool
+    plain: Optional[Tuple[int, int]] = None
+    html: Optional[Tuple[int, int]] = None
+
+
+def _parse_slice(buf, start: int, end: int, headersonly: bool = False) -> EmailMessage:
+    # ``parse`` (not ``parsebytes``) applies universal newlines exactly like the
+    # full file-based parser, so decoded text is identical.
+    return BytesParser(policy=policy.default).parse(io.BytesIO(buf[start:end]), headersonly=headersonly)
+
+
+def _parse_headers(buf, start: int, end: int) -> EmailMessage:
+    return _parse_slice(buf, start, end, headersonly=True)
+
+
+def _split_headers(buf, start: int, end: int) -> Tuple[int, int]:
+    """Return (header_end, body_start) for the entity occupying ``buf[start:end]``."""
+    if buf[start : start + 1] == b"\n":
+        return start, start + 1
+    if buf[start : start + 2] == b"\r\n":
+        return start, start + 2
+    candidates = []
+    lf = buf.find(b"\n\n", start, end)
+    if lf != -1:
+        candidates.append((lf + 1, lf + 2))
+    crlf = buf.find(b"\n\r\n", start, end)
+    if crlf != -1:
+        candidates.append((crlf + 1, crlf + 3))
+    if not candidates:
+        return end, end
+    return min(candidates)
+
+
+def _find_delimiter(buf, delimiter: bytes, pos: int, end: int, at_start: bool) -> int:
+    if at_start and buf[pos : pos + len(delimiter)] == delimiter:
+        return pos
+    idx = buf.find(b"\n" + delimiter, pos, end)
+    return -1 if idx == -1 else idx + 1
+
+
+def _iter_parts(buf, boundary: str, start: int, end: int):
+    """Yield (part_start, part_end) byte ranges between multipart delimiters."""
+    delimiter = b"--" + boundary.encode("ascii", errors="strict")
+    pos = _find_delimiter(buf, delimiter, start, end, at_start=True)
+    while pos != -1:
+        after = pos + len(delimiter)
+        if buf[after : after + 2] == b"--":
+            return
+        line_end = buf.find(b"\n", after, end)
+        if line_end == -1:
+            return
+        part_start = line_end + 1
+        nxt = _find_delimiter(buf, delimiter, part_start, end, at_start=False)
+        part_end = end if nxt == -1 else nxt - 1
+        if part_end > part_start and buf[part_end - 1 : part_end] == b"\r":
+            part_end -= 1
+        yield part_start, max(part_start, part_end)
+        pos = nxt
+
+
+def _scan_multipart(buf, scan: EmlScan, boundary: str, start: int, end: int, depth: int) -> None:
+    if depth > _MAX_DEPTH:
+        raise UnsupportedLayout("multipart nesting too deep")
+    for part_start, part_end in _iter_parts(buf, boundary, start, end):
+        header_end, body_start = _split_headers(buf, part_start, part_end)
+        headers = _parse_headers(buf, part_start, header_end)
+        content_type = headers.get_content_type()
+        if headers.get_content_maintype() == "multipart":
+            nested = headers.get_param("boundary")
+            if not nested:
+                raise UnsupportedLayout("multipart part without boundary")
+            _scan_multipart(buf, scan, str(nested), body_start, part_end, depth + 1)
+        elif content_type == "message/rfc822":
+            # The full parser walks into attached messages, so their text parts could
+            # come first; let it handle these rare layouts to keep identical output.
+            raise UnsupportedLayout("attached message before body parts")
+        elif content_type == "text/plain" and scan.plain is None:
+            scan.plain = (part_start, part_end)
+        elif content_type == "text/html" and scan.html is None:
+            scan.html = (part_start, part_end)
+        if scan.plain is not None and scan.html is not None:
+            return
+
+
+def scan_eml(buf) -> EmlScan:
+    """Scan headers and MIME structure of an EML held in ``buf`` (bytes or mmap)."""
+    end = len(buf)
+    header_end, body_start = _split_headers(buf, 0, end)
+    headers = _parse_headers(buf, 0, header_end)
+    scan = EmlScan(headers=headers, is_multipart=headers.get_content_maintype() == "multipart")
+    if not scan.is_multipart:
+        scan.plain = (0, end)
+        return scan
+    boundary = headers.get_param("boundary")
+    if not boundary:
+        raise UnsupportedLayout("multipart message without boundary")
+    _scan_multipart(buf, scan, str(boundary), body_start, end, depth=0)
+    return scan
+
+
+def decode_part(buf, span: Tuple[int, int]) -> EmailMessage:
+    """Parse just one MIME entity (headers + payload) for ``get_content()``."""
+    start, end = span
+    return _parse_slice(buf, start, end)
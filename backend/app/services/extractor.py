@@ -5,6 +5,7 @@ from collections import Counter
 from dataclasses import dataclass
 from typing import Dict, List, Sequence, Set
 
+from app.services.pipeline_settings import ConfigLike
 from app.utils.config import Config
 
 
@@ -33,7 +34,7 @@ class KeywordMatch:
 class KeywordExtractor:
     """Extract technical keywords per job block, counting once per block."""
 
-    def __init__(self, config: type[Config] = Config):
+    def __init__(self, config: ConfigLike = Config):
         self.config = config
         self.keywords_by_category = config.keywords_tech()
         self.sorted_keywords = _sorted_keywords(self.keywords_by_category)
@@ -1,11 +1,17 @@
 from __future__ import annotations
 
+import asyncio
 import json
 import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Optional, Protocol
+from typing import Any, AsyncIterator, Dict, Hashable, List, Optional, Protocol, Tuple
 
+from app.services.db_pool import acquire, build_dsn, direct_connections
 from app.utils.config import Config
 from app.utils.logging import logger
 
@@ -32,6 +38,10 @@ class IndexRuleStore(Protocol):
     async def load_rules(self) -> List[IndexRule]:  # pragma: no cover - interface
         ...
 
+    async def version(self) -> Optional[Hashable]:  # pragma: no cover - interface
+        """Cheap change token; ``None`` means unknown, so the rules are reloaded."""
+        ...
+
 
 class InlineIndexRuleStore:
     def __init__(self, data: dict):
@@ -40,6 +50,10 @@ class InlineIndexRuleStore:
     async def load_rules(self) -> List[IndexRule]:
         return self._load_from_dict(self.data)
 
+    async def version(self) -> Optional[Hashable]:
+        # Inline rules only change by replacing the config, which selects a new store.
+        return "inline"
+
     @staticmethod
     def _load_from_dict(raw: dict) -> List[IndexRule]:
         rules: List[IndexRule] = []
@@ -68,6 +82,13 @@ class FileIndexRuleStore:
         # additional threading overhead in small deployments.
         return self._load_sync()
 
+    async def version(self) -> Optional[Hashable]:
+        try:
+            stat = self.path.stat()
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
     def _load_sync(self) -> List[IndexRule]:
         if not self.path.exists():
             logger.warning("Index rules file not found: %s", self.path)
@@ -101,9 +122,12 @@ class DatabaseIndexRuleStore:
         self,
         dsn: str,
         table_name: str,
+        config: type[Config] = Config,
     ):
         self.dsn = dsn
         self.table_name = self._sanitize_table_name(table_name)
+        self.config = config
+        self._has_updated_at: Optional[bool] = None
 
     @staticmethod
     def _sanitize_table_name(table_name: str) -> str:
@@ -112,20 +136,7 @@ class DatabaseIndexRuleStore:
         return table_name
 
     async def load_rules(self) -> List[IndexRule]:
-        try:
-            import asyncpg
-        except ImportError as exc:  # pragma: no cover - optional dep
-            raise RuntimeError(
-                "Database index rule source requires asyncpg. Install it before enabling DB mode."
-            ) from exc
-
-        try:
-            conn = await asyncpg.connect(self.dsn)
-        except Exception as exc:  # pragma: no cover - environment dependent
-            logger.error("Failed to connect to database for index rules: %s", exc)
-            raise
-
-        try:
+        async with self._acquire() as conn:
             rows = await conn.fetch(
                 f"""
                 SELECT name, pattern, COALESCE(description, '') AS description,
@@ -135,8 +146,6 @@ class DatabaseIndexRuleStore:
                 ORDER BY name
                 """
             )
-        finally:
-            await conn.close()
 
         return [
             IndexRule(
@@ -149,7 +158,53 @@ class DatabaseIndexRuleStore:
         ]
 
 
+    @asynccontextmanager
+    async def _acquire(self) -> AsyncIterator[Any]:
+        try:
+            async with acquire(self.dsn, self.config) as conn:
+                yield conn
+        except RuntimeError:
+            raise  # asyncpg missing
+        except Exception as exc:  # pragma: no cover - environment dependent
+            logger.error("Database access for index rules failed: %s", exc)
+            raise
+
+    async def version(self) -> Optional[Hashable]:
+        """Row count and latest ``updated_at`` when the table has that column."""
+        async with self._acquire() as conn:
+            if self._has_updated_at is None:
+                self._has_updated_at = bool(
+                    await conn.fetchval(
+                        """
+                        SELECT 1 FROM information_schema.columns
+                        WHERE table_name = $1 AND column_name = 'updated_at'
+                        """,
+                        self.table_name,
+                    )
+                )
+            if not self._has_updated_at:
+                return None
+            row = await conn.fetchrow(f"SELECT COUNT(*) AS n, MAX(updated_at) AS latest FROM {self.table_name}")
+        return (row["n"], row["latest"])
+
+
+@dataclass
+class _CachedRules:
+    rules: List[IndexRule]
+    version: Optional[Hashable]
+    expires_at: float
+
+
 class IndexRuleService:
+    """Loads index rules from the configured source and serves them from memory.
+
+    Rules are kept for ``INDEX_RULE_CACHE_TTL`` seconds; after that the store's
+    ``version()`` token (file mtime/size, DB ``updated_at``) is checked and the
+    rules are only re-read when it changed. A change of source settings (path,
+    table, inline rules from ``PUT /pipeline/config``) selects a new store and
+    drops the cache.
+    """
+
     def __init__(
         self,
         config: type[Config] = Config,
@@ -158,6 +213,31 @@ class IndexRuleService:
         self.config = config
         self._store_override = store
         self._store: Optional[IndexRuleStore] = None
+        self._store_key: Optional[Tuple] = None
+        self._cache: Optional[_CachedRules] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.reloads = 0
+
+    def _source_key(self) -> Tuple:
+        inline_rules = getattr(self.config, "INDEX_RULES_INLINE", None)
+        return (
+            (self.config.INDEX_RULE_SOURCE or "file").lower(),
+            self.config.INDEX_RULES_PATH,
+            self.config.INDEX_RULE_TABLE,
+            json.dumps(inline_rules, sort_keys=True, ensure_ascii=False) if inline_rules else None,
+        )
+
+    def _current_store(self) -> IndexRuleStore:
+        if self._store_override:
+            return self._store_override
+        key = self._source_key()
+        with self._lock:
+            if self._store is None or key != self._store_key:
+                self._store = self._create_store()
+                self._store_key = key
+                self._cache = None
+            return self._store
 
     def _create_store(self) -> IndexRuleStore:
         if self._store_override:
@@ -175,26 +255,94 @@ class IndexRuleService:
                 dsn,
                 self.config.INDEX_RULE_TABLE,
             )
-            return DatabaseIndexRuleStore(dsn=dsn, table_name=self.config.INDEX_RULE_TABLE)
+            return DatabaseIndexRuleStore(dsn=dsn, table_name=self.config.INDEX_RULE_TABLE, config=self.config)
 
         logger.info("Loading index rules from file: %s", self.config.INDEX_RULES_PATH)
         return FileIndexRuleStore(self.config.INDEX_RULES_PATH)
 
     def _build_dsn(self) -> str:
-        user = self.config.DB_USER
-        password = self.config.DB_PASS
-        host = self.config.DB_HOST
-        port = self.config.DB_PORT
-        db = self.config.DB_NAME
-        if password:
-            return f"postgresql://{user}:{password}@{host}:{port}/{db}"
-        return f"postgresql://{user}@{host}:{port}/{db}"
+        return build_dsn(self.config)
+
+    def _fresh_rules(self) -> Optional[List[IndexRule]]:
+        cached = self._cache
+        if cached is not None and time.monotonic() < cached.expires_at:
+            self.hits += 1
+            return list(cached.rules)
+        return None
 
     async def list_rules(self) -> List[IndexRule]:
-        if self._store is None:
-            self._store = self._create_store()
-        return await self._store.load_rules()
+        store = self._current_store()
+        rules = self._fresh_rules()
+        if rules is not None:
+            return rules
+
+        ttl = float(getattr(self.config, "INDEX_RULE_CACHE_TTL", 0))
+        cached = self._cache
+        version_of = getattr(store, "version", None)
+        version = await version_of() if version_of else None
+        if cached is not None and version is not None and version == cached.version:
+            cached.expires_at = time.monotonic() + ttl
+            self.hits += 1
+            return list(cached.rules)
+
+        rules = await store.load_rules()
+        self.reloads += 1
+        if store is self._store or store is self._store_override:
+            self._cache = _CachedRules(rules=rules, version=version, expires_at=time.monotonic() + ttl)
+        return list(rules)
+
+    def list_rules_sync(self) -> List[IndexRule]:
+        """``list_rules`` for synchronous callers (e.g. building a Pipeline outside the server).
+
+        The load runs on a private event loop (on a helper thread inside a running
+        loop, so it never blocks on or re-enters the caller's loop) and uses
+        one-off database connections instead of a pool tied to that short-lived loop.
+        """
+        self._current_store()
+        rules = self._fresh_rules()
+        if rules is not None:
+            return rules
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self._list_rules_direct())
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            return pool.submit(asyncio.run, self._list_rules_direct()).result()
+
+    async def _list_rules_direct(self) -> List[IndexRule]:
+        with direct_connections():
+            return await self.list_rules()
+
+    def cache_stats(self) -> Dict[str, object]:
+        cached = self._cache
+        return {
+            "hits": self.hits,
+            "reloads": self.reloads,
+            "cached_rules": len(cached.rules) if cached else 0,
+            "expires_in": round(max(cached.expires_at - time.monotonic(), 0.0), 3) if cached else 0.0,
+        }
+
+
+_SERVICES: Dict[Hashable, IndexRuleService] = {}
+_SERVICES_LOCK = threading.Lock()
+# Config classes are few; settings objects change with every config version.
+_MAX_SERVICES = 8
+
+
+def shared_index_rule_service(config=Config) -> IndexRuleService:
+    """Process-wide service per config class or ``PipelineSettings``, so its rule cache outlives a request."""
+    with _SERVICES_LOCK:
+        service = _SERVICES.get(config)
+        if service is None:
+            if len(_SERVICES) >= _MAX_SERVICES:
+                _SERVICES.pop(next(iter(_SERVICES)))
+            service = _SERVICES[config] = IndexRuleService(config)
+        return service
 
 
 def get_index_rule_service() -> IndexRuleService:
-    return IndexRuleService()
+    # Inline rules come from the loaded pipeline config, not from Config itself.
+    from app.services.pipeline_config import get_snapshot_cache
+
+    snapshot = get_snapshot_cache(Config).current
+    return shared_index_rule_service(snapshot.settings if snapshot else Config)
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+from typing import Dict, Optional, Set
+
+from app.services.email_parser import parse_email_file
+from app.services.pipeline import get_pipeline
+from app.services.pipeline_settings import PipelineSettings
+from app.services.results_store import (
+    get_prepared_store,
+    get_result_store,
+    hash_file,
+    serialize_pipeline_result,
+    serialize_prepared,
+)
+from app.utils.logging import logger
+
+INGEST_MODES = ("off", "prepare", "embed")
+
+# Keep references so background tasks are not garbage-collected mid-flight.
+_INFLIGHT: Set[asyncio.Task] = set()
+
+
+async def ingest_file(path: Path, mode: str, settings: Optional[PipelineSettings] = None) -> Dict[str, object]:
+    """Run the early pipeline stages for one uploaded file and persist the artefacts.
+
+    ``prepare`` stores parsed, cleaned and line-filtered bodies so the next run
+    starts at the semantic stage; ``embed`` runs the whole pipeline and stores the
+    final per-file results, so the next run reuses them outright. Artefacts are
+    keyed by the pipeline's ``result_key`` for ``settings`` (defaults to ``Config``).
+    Without a store there is nowhere to keep them, so nothing is run.
+    """
+    store = get_result_store() if mode == "embed" else get_prepared_store()
+    if store is None:
+        logger.warning("Eager ingestion (%s) skipped for %s: RESULT_STORE is off", mode, path.name)
+        return {"filename": path.name, "messages": 0, "mode": "off"}
+
+    file_hash = await asyncio.to_thread(hash_file, path)
+    pipeline = await get_pipeline(settings or PipelineSettings.from_config())
+    config_hash = pipeline.result_key
+    contents = await asyncio.to_thread(parse_email_file, path)
+    prepared = await asyncio.to_thread(pipeline.prepare_messages, contents)
+
+    if mode == "embed":
+        results = await pipeline.process_prepared_async(prepared)
+        await store.save(file_hash, config_hash, path.name, [serialize_pipeline_result(r) for r in results])
+    else:
+        await store.save(file_hash, config_hash, path.name, serialize_prepared(prepared))
+
+    logger.info("Eager ingestion (%s) finished for %s: %d messages", mode, path.name, len(prepared))
+    return {"filename": path.name, "messages": len(prepared), "mode": mode}
+
+
+def schedule_ingestion(path: Path, mode: str, settings: Optional[PipelineSettings] = None) -> None:
+    """Start ``ingest_file`` in the background on the running event loop."""
+
+    async def _run() -> None:
+        try:
+            await ingest_file(path, mode, settings)
+        except Exception as exc:  # pragma: no cover - defensive
+            logger.error("Eager ingestion failed for %s: %s", path, exc)
+
+    task = asyncio.get_running_loop().create_task(_run())
+    _INFLIGHT.add(task)
+    task.add_done_callback(_INFLIGHT.discard)
+
+
+async def wait_for_ingestion() -> None:
+    """Block until background ingestion started by uploads has finished."""
+    pending = list(_INFLIGHT)
+    if pending:
+        logger.info("Waiting for %d background ingestion tasks", len(pending))
+        await asyncio.gather(*pending, return_exceptions=True)
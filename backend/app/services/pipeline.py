@@ -1,17 +1,22 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import json
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import Dict, List, Sequence
-
-from app.services.aggregator import Aggregator
-from app.services.classifier import Classifier
-from app.services.extractor import KeywordExtractor
-from app.services.preprocess import LineFilter
-from app.services.semantic import SemanticResult, get_semantic_extractor, prepare_semantic_input
-from app.services.splitter import SplitBlock, Splitter
-from app.services.cleaner import clean_body
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from app.services.block_executor import BlockBatch, BlockExecutor, BlockStages
+from app.services.pipeline_settings import ConfigLike, PipelineSettings
+from app.services.preprocess import BodyLines, LineFilter
+from app.services.semantic import SemanticResult, get_semantic_extractor
+from app.services.splitter import SplitBlock, load_index_rule_markers, resolve_marker_patterns
+from app.services.cleaner import clean_lines
 from app.utils.config import Config
 from app.utils.logging import logger
+from app.utils.metrics import count, timed
 
 
 @dataclass
@@ -23,37 +28,58 @@ class PipelineResult:
     blocks: List[SplitBlock]
 
 
+class PipelineResults(list):
+    """Per-message ``PipelineResult`` list plus the batch ``summary`` merged from worker partials.
+
+    ``summary`` is ``None`` when the aggregator step is disabled.
+    """
+
+    def __init__(self, results=(), summary: Optional[Dict[str, object]] = None):
+        super().__init__(results)
+        self.summary = summary
+
+
 class Pipeline:
-    """Configurable orchestrator allowing per-step enablement."""
+    """Configurable orchestrator allowing per-step enablement.
+
+    ``config`` is the ``Config`` class or, for runs driven by a loaded pipeline
+    configuration, a ``PipelineSettings``; every stage is built from it alone.
+    ``marker_patterns`` are the splitter markers when the caller already resolved
+    them (see ``get_pipeline``); otherwise the splitter loads index rules itself.
+    ``result_key`` identifies everything that shapes the output (all settings,
+    env-level ones included, plus the resolved markers) and keys stored results.
+    """
 
-    def __init__(self, config: type[Config] = Config):
+    def __init__(self, config: ConfigLike = Config, marker_patterns: Optional[Sequence[str]] = None):
         self.config = config
         self.steps = [step.strip() for step in config.PIPELINE_STEPS if step.strip()]
 
         self.line_filter = LineFilter(config) if "line_filter" in self.steps else None
-        self.splitter = Splitter(config) if "splitter" in self.steps else None
-        self.keyword_extractor = KeywordExtractor(config) if "extractor" in self.steps else None
-        self.classifier = (
-            Classifier(config.CLASSIFIER_FOREIGNER_PATH, config) if "classifier" in self.steps else None
-        )
-        self.semantic_extractor = get_semantic_extractor() if "semantic" in self.steps else None
-        self.aggregator = Aggregator(
-            keyword_extractor=self.keyword_extractor if "extractor" in self.steps else None,
-            classifier=self.classifier if "classifier" in self.steps else None,
-        )
-
-    def _apply_line_filter(self, body: str) -> str:
+        self.semantic_extractor = get_semantic_extractor(config=config) if "semantic" in self.steps else None
+        # Split/extract/classify/aggregate; batches may run them across workers.
+        self.block_stages = BlockStages(config, self.steps, marker_patterns)
+        self.block_executor = BlockExecutor(config)
+        self.splitter = self.block_stages.splitter
+        self.keyword_extractor = self.block_stages.keyword_extractor
+        self.classifier = self.block_stages.classifier
+        self.aggregator = self.block_stages.aggregator
+        # Settings alone miss index rules loaded from the database, so the resolved markers are hashed too.
+        markers = list(self.splitter.marker_sources) if self.splitter else []
+        encoded = json.dumps([getattr(config, "fingerprint", ""), markers], ensure_ascii=False).encode("utf-8")
+        self.result_key = hashlib.sha256(encoded).hexdigest()
+
+    def _apply_line_filter(self, body: BodyLines) -> BodyLines:
         if not self.line_filter:
             return body
-        return prepare_semantic_input(body, line_filter=self.line_filter)
+        with timed("line_filter"):
+            filtered = self.line_filter.filter_body(body)
+        count("lines_kept", len(filtered))
+        return filtered
 
-    def _split(self, body: str) -> List[SplitBlock]:
-        if not self.splitter:
-            cleaned = body.strip()
-            return [SplitBlock(text=cleaned, start_line=0, end_line=len(cleaned.splitlines()) - 1)] if cleaned else []
-        return self.splitter.split(body)
+    def _split(self, body: BodyLines) -> List[SplitBlock]:
+        return self.block_stages.split(body)
 
-    def _semantic(self, body: str) -> Optional[SemanticResult]:
+    def _semantic(self, body: BodyLines) -> Optional[SemanticResult]:
         if not self.semantic_extractor:
             return None
         try:
@@ -62,17 +88,26 @@ class Pipeline:
             logger.error("Semantic extractor failed: %s", exc)
             return None
 
+    def _clean(self, message) -> BodyLines:
+        """Produce the line-oriented body that the later stages share without re-splitting."""
+        with timed("clean"):
+            if "cleaner" in self.steps:
+                body = BodyLines(clean_lines(message))
+            elif getattr(message, "body_type", "plain") == "html":
+                # The parser leaves HTML bodies unstripped, so they still need the one HTML pass.
+                body = BodyLines(clean_lines(getattr(message, "body", "")))
+            else:
+                body = BodyLines.from_text(getattr(message, "body", ""))
+        count("lines_cleaned", len(body))
+        return body
+
     def process_message(self, message) -> PipelineResult:
         logger.info("Pipeline running for %s with steps=%s", getattr(message, "source_path", ""), self.steps)
 
-        body_clean = clean_body(message) if "cleaner" in self.steps else getattr(message, "body", "")
+        body_clean = self._clean(message)
         body_filtered = self._apply_line_filter(body_clean)
         semantic_result = self._semantic(body_filtered)
-        blocks = self._split(body_filtered)
-
-        aggregation = (
-            self.aggregator.aggregate_blocks(blocks) if "aggregator" in self.steps else {"blocks": [], "summary": {}}
-        )
+        blocks, aggregation = self.block_stages.run(body_filtered)
 
         return PipelineResult(
             source_path=getattr(message, "source_path", ""),
@@ -82,33 +117,26 @@ class Pipeline:
             aggregation=aggregation,
         )
 
-    def process_messages(self, messages: Sequence) -> List[PipelineResult]:
-        # Preprocess all messages to batch semantic extraction
-        prepared: List[dict] = []
-        for msg in messages:
-            body_clean = clean_body(msg) if "cleaner" in self.steps else getattr(msg, "body", "")
-            body_filtered = self._apply_line_filter(body_clean)
-            prepared.append(
-                {
-                    "message": msg,
-                    "body_filtered": body_filtered,
-                }
-            )
-
-        semantic_results: List[SemanticResult | None] = []
-        if self.semantic_extractor:
-            semantic_results = self.semantic_extractor.extract_batch([p["body_filtered"] for p in prepared])
-        else:
-            semantic_results = [None for _ in prepared]
-
-        results: List[PipelineResult] = []
-        for item, semantic_result in zip(prepared, semantic_results):
+    def prepare_messages(self, messages: Sequence) -> List[dict]:
+        """Run the cleaner per message and the line filter once per batch; feeds ``process_prepared_async``.
+
+        ``body_filtered`` is a ``BodyLines`` so semantic and splitter reuse the lines as-is.
+        """
+        messages = list(messages)
+        bodies = [self._clean(msg) for msg in messages]
+        if self.line_filter:
+            # One pass over the distinct lines of the whole batch instead of per message.
+            with timed("line_filter"):
+                bodies = self.line_filter.filter_bodies(bodies)
+            count("lines_kept", sum(len(body) for body in bodies))
+        return [{"message": msg, "body_filtered": body} for msg, body in zip(messages, bodies)]
+
+    def _build_results(
+        self, prepared: List[dict], semantic_results: Sequence[SemanticResult | None], batch: BlockBatch
+    ) -> PipelineResults:
+        results = PipelineResults(summary=batch.summary)
+        for item, semantic_result, (blocks, aggregation) in zip(prepared, semantic_results, batch.outputs):
             msg = item["message"]
-            body_filtered = item["body_filtered"]
-            blocks = self._split(body_filtered)
-            aggregation = (
-                self.aggregator.aggregate_blocks(blocks) if "aggregator" in self.steps else {"blocks": [], "summary": {}}
-            )
             results.append(
                 PipelineResult(
                     source_path=getattr(msg, "source_path", ""),
@@ -119,3 +147,103 @@ class Pipeline:
                 )
             )
         return results
+
+    def process_messages(self, messages: Sequence) -> PipelineResults:
+        # Preprocess all messages to batch semantic extraction
+        prepared = self.prepare_messages(messages)
+
+        semantic_results: List[SemanticResult | None] = []
+        if self.semantic_extractor:
+            semantic_results = self.semantic_extractor.extract_batch([p["body_filtered"] for p in prepared])
+        else:
+            semantic_results = [None for _ in prepared]
+
+        batch = self.block_executor.run(self.block_stages, [p["body_filtered"] for p in prepared])
+        return self._build_results(prepared, semantic_results, batch)
+
+    async def process_messages_async(self, messages: Sequence) -> PipelineResults:
+        """Same as ``process_messages`` but encodes via the shared embedding batcher."""
+        return await self.process_prepared_async(self.prepare_messages(messages))
+
+    async def process_prepared_async(self, prepared: List[dict]) -> PipelineResults:
+        """Run the stages after line filtering on output of ``prepare_messages``."""
+        semantic_results: List[SemanticResult | None] = []
+        if self.semantic_extractor:
+            semantic_results = await self.semantic_extractor.extract_batch_async(
+                [p["body_filtered"] for p in prepared]
+            )
+        else:
+            semantic_results = [None for _ in prepared]
+
+        # Split/extract/classify are CPU-bound; keep them off the event loop.
+        batch = await self.block_executor.run_async(self.block_stages, [p["body_filtered"] for p in prepared])
+        return self._build_results(prepared, semantic_results, batch)
+
+
+# Keyed by (settings, resolved splitter markers): index rules read from a file or
+# the database can change without the settings changing.
+_PipelineKey = Tuple[PipelineSettings, Tuple[str, ...]]
+_PIPELINE_CACHE: "OrderedDict[_PipelineKey, Pipeline]" = OrderedDict()
+_PIPELINE_CACHE_LOCK = threading.Lock()
+# Runs with different settings may overlap (e.g. right after a config change).
+_PIPELINE_CACHE_SIZE = 4
+# One build per key at a time; the cache lock itself is never held while building.
+_BUILD_LOCKS: Dict[_PipelineKey, threading.Lock] = {}
+
+
+def _cached_pipeline(key: _PipelineKey) -> Optional[Pipeline]:
+    with _PIPELINE_CACHE_LOCK:
+        pipeline = _PIPELINE_CACHE.get(key)
+        if pipeline is not None:
+            _PIPELINE_CACHE.move_to_end(key)
+        return pipeline
+
+
+def _build_cached_pipeline(key: _PipelineKey) -> Pipeline:
+    with _PIPELINE_CACHE_LOCK:
+        build_lock = _BUILD_LOCKS.setdefault(key, threading.Lock())
+    try:
+        with build_lock:
+            pipeline = _cached_pipeline(key)
+            if pipeline is not None:
+                return pipeline
+            settings, markers = key
+            pipeline = Pipeline(settings, markers)
+            with _PIPELINE_CACHE_LOCK:
+                _PIPELINE_CACHE[key] = pipeline
+                while len(_PIPELINE_CACHE) > _PIPELINE_CACHE_SIZE:
+                    _PIPELINE_CACHE.popitem(last=False)
+            return pipeline
+    finally:
+        with _PIPELINE_CACHE_LOCK:
+            if _BUILD_LOCKS.get(key) is build_lock:
+                del _BUILD_LOCKS[key]
+
+
+def get_cached_pipeline(settings: PipelineSettings) -> Pipeline:
+    """Return a warm Pipeline for the given settings and current index rules, building it once.
+
+    Building a Pipeline compiles every pattern and embeds the semantic templates,
+    so low-latency callers reuse one instance per settings hash. Settings are
+    immutable, so a cached Pipeline never observes a later config change; the
+    splitter markers are re-resolved on every call (served from the index-rule
+    cache) and a changed rule set gets a new Pipeline and ``result_key``.
+    For synchronous callers; request handlers use ``get_pipeline``.
+    """
+    markers = (*settings.SPLITTER_MARKER_PATTERNS, *load_index_rule_markers(settings))
+    key = (settings, markers)
+    return _cached_pipeline(key) or _build_cached_pipeline(key)
+
+
+async def get_pipeline(settings: PipelineSettings) -> Pipeline:
+    """``get_cached_pipeline`` for the event loop.
+
+    Splitter markers (index rules, possibly from the database) are resolved on
+    the running loop, and a build (model load, template embedding, pattern
+    compilation) runs on a worker thread.
+    """
+    key = (settings, tuple(await resolve_marker_patterns(settings)))
+    pipeline = _cached_pipeline(key)
+    if pipeline is not None:
+        return pipeline
+    return await asyncio.to_thread(_build_cached_pipeline, key)
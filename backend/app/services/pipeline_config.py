@@ -1,15 +1,24 @@
 from __future__ import annotations
 
+import hashlib
 import json
-from dataclasses import dataclass
+import os
+import threading
+import time
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Set, Tuple
 
 import asyncpg
 
+from app.services.db_pool import acquire, build_dsn, get_pool
+from app.services.pipeline_settings import PipelineSettings, settings_for
 from app.utils.config import Config
 from app.utils.logging import logger
 
+# (dsn, table) pairs whose table has been created in this process.
+_SCHEMA_READY: Set[Tuple[str, str]] = set()
+
 
 def _load_json_safe(path: str) -> Dict[str, Any]:
     try:
@@ -27,6 +36,7 @@ class PipelineConfigData:
     keywords_tech: Dict[str, Any]
     index_rules: Dict[str, Any]
     classifier_foreigner: Dict[str, Any]
+    _fingerprint: Optional[str] = field(default=None, init=False, repr=False, compare=False)
 
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> "PipelineConfigData":
@@ -49,37 +59,176 @@ class PipelineConfigData:
             "classifier_foreigner": self.classifier_foreigner,
         }
 
+    def fingerprint(self) -> str:
+        """Stable hash of the configuration content, used as a cache key.
+
+        Computed once per instance; loaded configs are not mutated afterwards.
+        """
+        if self._fingerprint is not None:
+            return self._fingerprint
+        encoded = json.dumps(self.to_dict(), sort_keys=True, ensure_ascii=False).encode("utf-8")
+        self._fingerprint = hashlib.sha256(encoded).hexdigest()
+        return self._fingerprint
+
+
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    """One loaded configuration; ``version`` increases whenever the content changes."""
+
+    data: PipelineConfigData
+    source: str
+    settings: PipelineSettings
+    version: int
+    fingerprint: str
+    loaded_at: float
+    file_stamp: Tuple[Tuple[str, Optional[int]], ...]
+
+
+class ConfigSnapshotCache:
+    """Process-wide holder of the current ``ConfigSnapshot``.
+
+    Reads are a pointer read. The snapshot is replaced on ``PUT /pipeline/config``,
+    marked stale by a Postgres NOTIFY from another process, and re-checked when
+    a default config file's mtime changes (file source). Without a live NOTIFY
+    listener it is also reloaded after ``CONFIG_SNAPSHOT_MAX_AGE`` seconds.
+
+    Every invalidation bumps ``generation``. Loaders read it before awaiting the
+    store and pass it to ``publish``, so a NOTIFY that arrives mid-load leaves
+    the published snapshot stale instead of being forgotten.
+    """
+
+    def __init__(self, base: type[Config] = Config):
+        self.base = base
+        self._lock = threading.Lock()
+        self._snapshot: Optional[ConfigSnapshot] = None
+        self._generation = 0
+        self._loaded_generation = 0
+        self._version = 0
+        self.listening = False
+        self.hits = 0
+        self.refreshes = 0
+
+    @property
+    def current(self) -> Optional[ConfigSnapshot]:
+        return self._snapshot
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def invalidate(self, fingerprint: Optional[str] = None) -> None:
+        """Mark stale, unless ``fingerprint`` is what is already loaded (our own NOTIFY)."""
+        with self._lock:
+            snapshot = self._snapshot
+            if fingerprint and snapshot is not None and snapshot.fingerprint == fingerprint:
+                return
+            self._generation += 1
+
+    def publish(
+        self,
+        data: PipelineConfigData,
+        source: str,
+        file_stamp: Tuple[Tuple[str, Optional[int]], ...] = (),
+        generation: Optional[int] = None,
+    ) -> ConfigSnapshot:
+        """Install ``data`` as read at ``generation`` (default: now); fresh only if nothing was invalidated since."""
+        fingerprint = data.fingerprint()
+        with self._lock:
+            if generation is None:
+                generation = self._generation
+            previous = self._snapshot
+            if previous is not None and generation < self._loaded_generation:
+                return previous  # a concurrent loader already published something newer
+            if previous is None or previous.fingerprint != fingerprint or previous.source != source:
+                self._version += 1
+            snapshot = ConfigSnapshot(
+                data=data,
+                source=source,
+                settings=settings_for(data, source, self.base),
+                version=self._version,
+                fingerprint=fingerprint,
+                loaded_at=time.monotonic(),
+                file_stamp=file_stamp,
+            )
+            self._snapshot = snapshot
+            self._loaded_generation = generation
+            self.refreshes += 1
+        return snapshot
+
+    def is_fresh(self, snapshot: ConfigSnapshot, file_stamp, max_age: float) -> bool:
+        if self._loaded_generation != self._generation:
+            return False
+        if snapshot.source == "file" and file_stamp() != snapshot.file_stamp:
+            return False
+        if not self.listening and max_age > 0 and time.monotonic() - snapshot.loaded_at > max_age:
+            return False
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        return {
+            "version": self._version,
+            "fingerprint": snapshot.fingerprint if snapshot else None,
+            "source": snapshot.source if snapshot else None,
+            "listening": self.listening,
+            "hits": self.hits,
+            "refreshes": self.refreshes,
+        }
+
+
+_SNAPSHOTS: Dict[type, ConfigSnapshotCache] = {}
+_SNAPSHOTS_LOCK = threading.Lock()
+
+
+def get_snapshot_cache(config: type[Config] = Config) -> ConfigSnapshotCache:
+    with _SNAPSHOTS_LOCK:
+        cache = _SNAPSHOTS.get(config)
+        if cache is None:
+            cache = _SNAPSHOTS[config] = ConfigSnapshotCache(config)
+        return cache
+
 
 class PipelineConfigRepository:
-    """Simple asyncpg-backed key/value storage for pipeline configuration."""
+    """asyncpg-backed key/value storage for pipeline configuration.
+
+    Connections come from the shared pool in ``db_pool`` and the table is
+    created once per process (``init``), so a config read is one pooled query.
+    The SQL text is fixed per repository, which lets asyncpg reuse each
+    connection's prepared statement instead of re-parsing it per request.
+    """
 
     def __init__(self, config: type[Config] = Config, table_name: str = "pipeline_configs"):
         self.config = config
         self.table_name = table_name
+        self._create_sql = f"""
+            CREATE TABLE IF NOT EXISTS {table_name} (
+                key TEXT PRIMARY KEY,
+                content JSONB NOT NULL,
+                updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+            )
+            """
+        self._select_sql = f"SELECT content FROM {table_name} WHERE key = $1"
+        self._upsert_sql = f"""
+                INSERT INTO {table_name} (key, content)
+                VALUES ($1, $2::jsonb)
+                ON CONFLICT (key)
+                DO UPDATE SET content = EXCLUDED.content, updated_at = NOW()
+                """
 
     @staticmethod
     def _quote_ident(value: str) -> str:
-        return f"\"{value.replace('\"', '\"\"')}\""
+        escaped = value.replace('"', '""')
+        return f'"{escaped}"'
 
     def _dsn(self) -> str:
-        user = self.config.DB_USER
-        password = self.config.DB_PASS
-        host = self.config.DB_HOST
-        port = self.config.DB_PORT
-        db = self.config.DB_NAME
-        if password:
-            return f"postgresql://{user}:{password}@{host}:{port}/{db}"
-        return f"postgresql://{user}@{host}:{port}/{db}"
+        return build_dsn(self.config)
 
     def _bootstrap_dsn(self) -> str:
-        user = self.config.DB_USER
-        password = self.config.DB_PASS
-        host = self.config.DB_HOST
-        port = self.config.DB_PORT
-        db = self.config.DB_BOOTSTRAP_DB
-        if password:
-            return f"postgresql://{user}:{password}@{host}:{port}/{db}"
-        return f"postgresql://{user}@{host}:{port}/{db}"
+        return build_dsn(self.config, database=self.config.DB_BOOTSTRAP_DB)
 
     async def _bootstrap_database(self) -> None:
         bootstrap_dsn = self._bootstrap_dsn()
@@ -92,9 +241,10 @@ class PipelineConfigRepository:
         finally:
             await conn.close()
 
-    async def _connect(self) -> asyncpg.Connection:
+    async def _ensure_pool(self) -> str:
+        dsn = self._dsn()
         try:
-            return await asyncpg.connect(self._dsn())
+            await get_pool(dsn, self.config)
         except Exception as exc:
             if not self.config.DB_BOOTSTRAP:
                 raise
@@ -104,54 +254,45 @@ class PipelineConfigRepository:
             except Exception as bootstrap_exc:
                 logger.error("Database bootstrap failed: %s", bootstrap_exc)
                 raise exc from bootstrap_exc
-            return await asyncpg.connect(self._dsn())
-
-    async def _ensure_table(self, conn: asyncpg.Connection) -> None:
-        await conn.execute(
-            f"""
-            CREATE TABLE IF NOT EXISTS {self.table_name} (
-                key TEXT PRIMARY KEY,
-                content JSONB NOT NULL,
-                updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
-            )
-            """
-        )
+            await get_pool(dsn, self.config)
+        return dsn
+
+    async def init(self) -> None:
+        """Create the pool and the table once per process (called at startup and lazily)."""
+        dsn = await self._ensure_pool()
+        key = (dsn, self.table_name)
+        if key in _SCHEMA_READY:
+            return
+        async with acquire(dsn, self.config) as conn:
+            await conn.execute(self._create_sql)
+        _SCHEMA_READY.add(key)
 
     async def load(self) -> Optional[PipelineConfigData]:
-        conn = await self._connect()
-        try:
-            await self._ensure_table(conn)
-            row = await conn.fetchrow(
-                f"SELECT content FROM {self.table_name} WHERE key = $1",
-                "active",
-            )
-            if not row:
-                return None
-            content = row["content"]
-            if isinstance(content, str):
-                content = json.loads(content)
-            return PipelineConfigData.from_dict(content)
-        finally:
-            await conn.close()
+        await self.init()
+        async with acquire(self._dsn(), self.config) as conn:
+            row = await conn.fetchrow(self._select_sql, "active")
+        if not row:
+            return None
+        content = row["content"]
+        if isinstance(content, str):
+            content = json.loads(content)
+        return PipelineConfigData.from_dict(content)
 
     async def save(self, payload: PipelineConfigData) -> PipelineConfigData:
-        conn = await self._connect()
-        try:
-            await self._ensure_table(conn)
-            content = json.dumps(payload.to_dict())
-            await conn.execute(
-                f"""
-                INSERT INTO {self.table_name} (key, content)
-                VALUES ($1, $2::jsonb)
-                ON CONFLICT (key)
-                DO UPDATE SET content = EXCLUDED.content, updated_at = NOW()
-                """,
-                "active",
-                content,
-            )
-            return payload
-        finally:
-            await conn.close()
+        await self.init()
+        content = json.dumps(payload.to_dict())
+        async with acquire(self._dsn(), self.config) as conn:
+            async with conn.transaction():
+                await conn.execute(self._upsert_sql, "active", content)
+                # Delivered on commit; other processes drop their snapshot.
+                await conn.execute("SELECT pg_notify($1, $2)", self.config.PIPELINE_CONFIG_CHANNEL, payload.fingerprint())
+        return payload
+
+    async def listen(self, callback) -> asyncpg.Connection:
+        """Dedicated (unpooled) connection calling ``callback(fingerprint)`` on each NOTIFY."""
+        conn = await asyncpg.connect(self._dsn())
+        await conn.add_listener(self.config.PIPELINE_CONFIG_CHANNEL, lambda *args: callback(args[-1]))
+        return conn
 
 
 class PipelineConfigService:
@@ -178,63 +319,78 @@ class PipelineConfigService:
             classifier_foreigner=_load_json_safe(self.default_paths["classifier_foreigner"]),
         )
 
-    async def load_config(self) -> Tuple[PipelineConfigData, str]:
+    def _file_stamp(self) -> Tuple[Tuple[str, Optional[int]], ...]:
+        stamp = []
+        for path in self.default_paths.values():
+            try:
+                stamp.append((path, os.stat(path).st_mtime_ns))
+            except OSError:
+                stamp.append((path, None))
+        return tuple(stamp)
+
+    async def snapshot(self) -> ConfigSnapshot:
+        """Current config snapshot, reloaded only when it may have changed."""
+        cache = get_snapshot_cache(self.config)
+        current = cache.current
+        max_age = float(getattr(self.config, "CONFIG_SNAPSHOT_MAX_AGE", 0))
+        if current is not None and cache.is_fresh(current, self._file_stamp, max_age):
+            cache.hits += 1
+            return current
+
+        generation = cache.generation
+        stamp = self._file_stamp()
         try:
             db_config = await self.repository.load()
             if db_config:
-                self.apply_to_runtime(db_config, source="db")
-                return db_config, "db"
+                return self._publish(db_config, "db", stamp, generation)
         except Exception as exc:  # pragma: no cover - db connectivity
             logger.error("Failed to load pipeline config from database: %s", exc)
 
-        fallback = self._default_payload()
-        self.apply_to_runtime(fallback, source="file")
-        return fallback, "file"
+        return self._publish(self._default_payload(), "file", stamp, generation)
+
+    def _publish(
+        self, data: PipelineConfigData, source: str, stamp=(), generation: Optional[int] = None
+    ) -> ConfigSnapshot:
+        return get_snapshot_cache(self.config).publish(data, source, stamp, generation)
+
+    async def load_config(self) -> Tuple[PipelineConfigData, str]:
+        snapshot = await self.snapshot()
+        return snapshot.data, snapshot.source
 
     async def save_config(self, payload: PipelineConfigData) -> Tuple[PipelineConfigData, str]:
+        generation = get_snapshot_cache(self.config).generation
         try:
             saved = await self.repository.save(payload)
         except Exception as exc:  # pragma: no cover - db connectivity
             logger.error("Failed to save pipeline config to database: %s", exc)
-            self.apply_to_runtime(payload, source="file")
+            self._publish(payload, "file", self._file_stamp(), generation)
             return payload, "file"
 
-        self.apply_to_runtime(saved, source="db")
+        self._publish(saved, "db", generation=generation)
         return saved, "db"
 
-    def apply_to_runtime(self, payload: PipelineConfigData, source: str) -> None:
-        """Push loaded configuration into Config class attributes for runtime consumption."""
-        cfg = self.config
-        cfg.CONFIG_SOURCE = source
-        cfg.PIPELINE_STEPS = tuple(payload.steps)
-
-        cfg._KEYWORDS_TECH = payload.keywords_tech or {}
-
-        semantic = payload.semantic_templates or {}
-        cfg._SEMANTIC_TEMPLATES = semantic
-        cfg.SEMANTIC_CONTEXT_RADIUS = int(semantic.get("context_radius", cfg.SEMANTIC_CONTEXT_RADIUS))
-        cfg.SEMANTIC_JOB_GLOBAL_THRESHOLD = float(
-            semantic.get("global_threshold", cfg.SEMANTIC_JOB_GLOBAL_THRESHOLD)
-        )
-        cfg.SEMANTIC_JOB_FIELD_THRESHOLD = float(semantic.get("field_threshold", cfg.SEMANTIC_JOB_FIELD_THRESHOLD))
+    async def start_listener(self) -> asyncpg.Connection:
+        """Subscribe to config NOTIFYs so snapshots refresh on changes from other processes."""
+        cache = get_snapshot_cache(self.config)
+        conn = await self.repository.listen(cache.invalidate)
 
-        cfg._LINE_FILTER_SETTINGS = payload.line_filter or {}
-        cfg.LINE_FILTER_DECORATION_CHARS = cfg._LINE_FILTER_SETTINGS.get("decoration_chars", "")
-        cfg.LINE_FILTER_GREETING_PATTERNS = cfg._LINE_FILTER_SETTINGS.get("greeting_patterns", [])
-        cfg.LINE_FILTER_CLOSING_PATTERNS = cfg._LINE_FILTER_SETTINGS.get("closing_patterns", [])
-        cfg.LINE_FILTER_SIGNATURE_COMPANY_PREFIX = cfg._LINE_FILTER_SETTINGS.get("signature_company_prefix", [])
-        cfg.LINE_FILTER_SIGNATURE_KEYWORDS = cfg._LINE_FILTER_SETTINGS.get("signature_keywords", [])
-        cfg.LINE_FILTER_FOOTER_PATTERNS = cfg._LINE_FILTER_SETTINGS.get("footer_patterns", [])
-        cfg.LINE_FILTER_JOB_KEYWORDS = cfg._LINE_FILTER_SETTINGS.get("job_keywords", [])
-        cfg.LINE_FILTER_FORCE_DELETE_PATTERNS = cfg._LINE_FILTER_SETTINGS.get("force_delete_patterns", [])
+        def _lost(_conn) -> None:
+            cache.listening = False
+            cache.invalidate()
 
-        cfg.CLASSIFIER_FOREIGNER_CONFIG = payload.classifier_foreigner or {}
-        cfg.INDEX_RULES_INLINE = payload.index_rules or {}
+        conn.add_termination_listener(_lost)
+        cache.listening = True
+        cache.invalidate()  # changes made before subscribing were not notified
+        return conn
 
     def build_summary(self) -> Dict[str, Any]:
-        summary = dict(Config.summary())
-        summary["config_source"] = getattr(self.config, "CONFIG_SOURCE", "file")
-        summary["pipeline_steps"] = list(self.config.PIPELINE_STEPS)
+        snapshot = get_snapshot_cache(self.config).current
+        settings = snapshot.settings if snapshot else self.config
+        summary = dict(settings.summary())
+        summary["config_source"] = getattr(settings, "CONFIG_SOURCE", "file")
+        summary["pipeline_steps"] = list(settings.PIPELINE_STEPS)
+        summary["config_version"] = snapshot.version if snapshot else 0
+        summary["config_fingerprint"] = snapshot.fingerprint if snapshot else None
         return summary
 
 
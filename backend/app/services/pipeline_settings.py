@@ -0,0 +1,164 @@
+"""Immutable per-run settings built from a loaded pipeline configuration.
+
+``PipelineSettings`` exposes the same attribute names as ``Config`` (e.g.
+``LINE_FILTER_JOB_KEYWORDS``), so every stage that takes ``config`` accepts
+either the ``Config`` class or a settings object. Values are captured once
+and deep-frozen, so pipelines built from different configurations can run
+side by side in threads, and the settings hash can key caches.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Dict, Mapping, Union
+
+from app.utils.config import Config
+
+if TYPE_CHECKING:  # pragma: no cover - import guard for type hints
+    from app.services.pipeline_config import PipelineConfigData
+
+# Config attributes captured into settings: UPPER_CASE values and the private _UPPER data blobs.
+_SETTING_NAME_RE = re.compile(r"^_?[A-Z][A-Z0-9_]*$")
+
+
+class FrozenDict(dict):
+    """A ``dict`` that refuses mutation; still passes ``isinstance(x, dict)`` and JSON encoding."""
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("PipelineSettings values are read-only")
+
+    __setitem__ = __delitem__ = _readonly
+    clear = pop = popitem = setdefault = update = __ior__ = _readonly
+
+    def __hash__(self):  # pragma: no cover - settings hash via fingerprint
+        return hash(tuple(sorted(self.items(), key=repr)))
+
+    def __reduce__(self):
+        # The default dict pickling refills through __setitem__.
+        return FrozenDict, (dict(self),)
+
+
+def freeze(value: Any) -> Any:
+    """Deep copy ``value`` into immutable containers (dict -> FrozenDict, list/set -> tuple)."""
+    if isinstance(value, Mapping):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(freeze(item) for item in value)
+    return value
+
+
+def runtime_overrides(payload: "PipelineConfigData", base: ConfigLike = Config) -> Dict[str, Any]:
+    """Config attribute values implied by a loaded pipeline configuration."""
+    semantic = payload.semantic_templates or {}
+    line_filter = payload.line_filter or {}
+    return {
+        "PIPELINE_STEPS": tuple(payload.steps),
+        "_KEYWORDS_TECH": payload.keywords_tech or {},
+        "_SEMANTIC_TEMPLATES": semantic,
+        "SEMANTIC_CONTEXT_RADIUS": int(semantic.get("context_radius", base.SEMANTIC_CONTEXT_RADIUS)),
+        "SEMANTIC_JOB_GLOBAL_THRESHOLD": float(semantic.get("global_threshold", base.SEMANTIC_JOB_GLOBAL_THRESHOLD)),
+        "SEMANTIC_JOB_FIELD_THRESHOLD": float(semantic.get("field_threshold", base.SEMANTIC_JOB_FIELD_THRESHOLD)),
+        "_LINE_FILTER_SETTINGS": line_filter,
+        "LINE_FILTER_DECORATION_CHARS": line_filter.get("decoration_chars", ""),
+        "LINE_FILTER_GREETING_PATTERNS": line_filter.get("greeting_patterns", []),
+        "LINE_FILTER_CLOSING_PATTERNS": line_filter.get("closing_patterns", []),
+        "LINE_FILTER_SIGNATURE_COMPANY_PREFIX": line_filter.get("signature_company_prefix", []),
+        "LINE_FILTER_SIGNATURE_KEYWORDS": line_filter.get("signature_keywords", []),
+        "LINE_FILTER_FOOTER_PATTERNS": line_filter.get("footer_patterns", []),
+        "LINE_FILTER_JOB_KEYWORDS": line_filter.get("job_keywords", []),
+        "LINE_FILTER_FORCE_DELETE_PATTERNS": line_filter.get("force_delete_patterns", []),
+        "CLASSIFIER_FOREIGNER_CONFIG": payload.classifier_foreigner or {},
+        "INDEX_RULES_INLINE": payload.index_rules or {},
+    }
+
+
+class PipelineSettings:
+    """Frozen, hashable snapshot of ``Config`` with one pipeline configuration applied."""
+
+    __slots__ = ("_values", "fingerprint")
+
+    def __init__(self, values: Mapping[str, Any]):
+        frozen = FrozenDict((name, freeze(value)) for name, value in values.items())
+        encoded = json.dumps(frozen, sort_keys=True, ensure_ascii=False, default=repr).encode("utf-8")
+        object.__setattr__(self, "_values", frozen)
+        object.__setattr__(self, "fingerprint", hashlib.sha256(encoded).hexdigest())
+
+    @classmethod
+    def from_config(cls, base: type[Config] = Config, **overrides: Any) -> "PipelineSettings":
+        values = {
+            name: getattr(base, name)
+            for name in dir(base)
+            if _SETTING_NAME_RE.match(name) and not callable(getattr(base, name))
+        }
+        values.update(overrides)
+        return cls(values)
+
+    @classmethod
+    def from_data(cls, payload: "PipelineConfigData", source: str = "file", base: type[Config] = Config):
+        return cls.from_config(base, CONFIG_SOURCE=source, **runtime_overrides(payload, base))
+
+    def __getattr__(self, name: str) -> Any:
+        try:
+            return self._values[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("PipelineSettings is immutable")
+
+    def __reduce__(self):
+        # Settings travel to process-pool workers (see block_executor).
+        return PipelineSettings, (dict(self._values),)
+
+    def __hash__(self) -> int:
+        return hash(self.fingerprint)
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, PipelineSettings) and other.fingerprint == self.fingerprint
+
+    def __repr__(self) -> str:
+        return f"PipelineSettings(fingerprint={self.fingerprint[:12]}, steps={list(self.PIPELINE_STEPS)})"
+
+    # Derived views shared with Config (its classmethods only read attributes).
+    def semantic_global_templates(self) -> list[str]:
+        return Config.semantic_global_templates.__func__(self)
+
+    def semantic_field_templates(self) -> dict[str, list[str]]:
+        return Config.semantic_field_templates.__func__(self)
+
+    def keywords_tech(self) -> dict[str, list[str]]:
+        return Config.keywords_tech.__func__(self)
+
+    def summary(self) -> dict:
+        return Config.summary.__func__(self)
+
+
+ConfigLike = Union[type[Config], PipelineSettings]
+
+_BY_FINGERPRINT: "OrderedDict[tuple, PipelineSettings]" = OrderedDict()
+_BY_FINGERPRINT_LOCK = threading.Lock()
+_MAX_CACHED = 8
+
+
+def settings_for(
+    payload: "PipelineConfigData", source: str = "file", base: type[Config] = Config
+) -> PipelineSettings:
+    """Settings for a loaded configuration, built once per (content, source, base class)."""
+    key = (payload.fingerprint(), source, base)
+    with _BY_FINGERPRINT_LOCK:
+        settings = _BY_FINGERPRINT.get(key)
+        if settings is not None:
+            _BY_FINGERPRINT.move_to_end(key)
+            return settings
+    settings = PipelineSettings.from_data(payload, source, base)
+    with _BY_FINGERPRINT_LOCK:
+        _BY_FINGERPRINT[key] = settings
+        while len(_BY_FINGERPRINT) > _MAX_CACHED:
+            _BY_FINGERPRINT.popitem(last=False)
+    return settings
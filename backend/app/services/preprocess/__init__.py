@@ -1,5 +1,6 @@
 """Preprocessing utilities (e.g., lightweight line filter)."""
 
+from app.services.preprocess.body_lines import BodyLines
 from app.services.preprocess.line_filter import LineFilter
 
-__all__ = ["LineFilter"]
+__all__ = ["BodyLines", "LineFilter"]
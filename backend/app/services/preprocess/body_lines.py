@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import List, Sequence
+
+
+@dataclass
+class BodyLines:
+    """Line-oriented message body shared by cleaner, line filter, semantic and splitter.
+
+    ``indices`` holds each line's position in the cleaned body, so stages after
+    the line filter can still map back to it. ``filtered`` marks that the line
+    filter already ran, so later stages do not filter again.
+    """
+
+    lines: List[str]
+    indices: List[int] = field(default_factory=list)
+    filtered: bool = False
+
+    def __post_init__(self):
+        if not self.indices and self.lines:
+            self.indices = list(range(len(self.lines)))
+
+    @classmethod
+    def from_text(cls, text: str) -> "BodyLines":
+        return cls(text.splitlines())
+
+    def select(self, positions: Sequence[int]) -> "BodyLines":
+        """Keep the lines at ``positions`` (indices into ``lines``), marking the result filtered."""
+        return BodyLines(
+            lines=[self.lines[i] for i in positions],
+            indices=[self.indices[i] for i in positions],
+            filtered=True,
+        )
+
+    @property
+    def text(self) -> str:
+        return "\n".join(self.lines)
+
+    def __len__(self) -> int:
+        return len(self.lines)
@@ -1,20 +1,75 @@
 from __future__ import annotations
 
 import re
-from typing import Iterable, List
+from typing import Dict, Iterable, List, Optional, Sequence
 
+from app.services.preprocess.body_lines import BodyLines
+from app.services.pipeline_settings import ConfigLike
+from app.services.preprocess.verdict_cache import get_verdict_cache
 from app.utils.config import Config
 
 _EMAIL_RE = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}")
 _URL_RE = re.compile(r"(https?://|www\.)|\bURL\s*:", re.IGNORECASE)
 _PHONE_RE = re.compile(r"\d{2,4}-\d{2,4}-\d{3,4}")
 _PUNCT_DIGIT_RE = re.compile(r"^[\d\W_]+$")
+_WHITESPACE_RE = re.compile(r"\s+")
+# Patterns that cannot be safely merged into one alternation (numbered backreferences).
+_BACKREF_RE = re.compile(r"\\[1-9]")
+
+
+def literal_trie_pattern(words: Iterable[str]) -> Optional[str]:
+    """Regex matching any of ``words`` as a substring, built as a prefix trie.
+
+    Words containing another word are dropped first (a substring hit on the
+    shorter word is implied), and the trie lets the regex engine branch on each
+    character instead of trying every literal in turn.
+    """
+    unique = sorted(set(words), key=len)
+    minimal: List[str] = []
+    for word in unique:
+        if not any(shorter in word for shorter in minimal):
+            minimal.append(word)
+    if not minimal:
+        return None
+
+    trie: Dict[str, dict] = {}
+    for word in minimal:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node: Dict[str, dict]) -> str:
+        alternatives = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not alternatives:
+            return ""
+        body = alternatives[0] if len(alternatives) == 1 else "(?:" + "|".join(alternatives) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+def merge_patterns(patterns: Sequence[str], flags: int = 0) -> List[re.Pattern[str]]:
+    """Compile ``patterns`` into one alternation when that keeps each pattern's meaning.
+
+    Falls back to one compiled pattern per entry for lists the merge could
+    change (backreferences, inline global flags, duplicate group names).
+    """
+    patterns = [p for p in patterns]
+    if not patterns:
+        return []
+    if len(patterns) > 1 and not any(_BACKREF_RE.search(p) for p in patterns):
+        try:
+            return [re.compile("|".join(f"(?:{p})" for p in patterns), flags)]
+        except re.error:
+            pass
+    return [re.compile(p, flags) for p in patterns]
 
 
 class LineFilter:
     """Config-driven lightweight line filter between cleaner and semantic."""
 
-    def __init__(self, config: type[Config] = Config):
+    def __init__(self, config: ConfigLike = Config):
         self.config = config
         self.enabled = getattr(config, "ENABLE_LINE_FILTER", True)
         self.decoration_chars = set(config.LINE_FILTER_DECORATION_CHARS)
@@ -25,23 +80,124 @@ class LineFilter:
         self.greeting_patterns = self._compile_patterns(config.LINE_FILTER_GREETING_PATTERNS)
         self.closing_patterns = self._compile_patterns(config.LINE_FILTER_CLOSING_PATTERNS)
         self.footer_patterns = self._compile_patterns(config.LINE_FILTER_FOOTER_PATTERNS)
+        self.cache_size = int(getattr(config, "LINE_FILTER_CACHE_SIZE", 0))
+        self._compile_program()
+        # Every rule input, so verdicts cached under another config are never reused.
+        self._fingerprint = (
+            "".join(sorted(self.decoration_chars)),
+            tuple(self.job_keywords),
+            tuple(self.signature_keywords),
+            self.company_prefixes,
+            tuple(
+                tuple(p.pattern for p in patterns)
+                for patterns in (
+                    self.force_delete_patterns,
+                    self.greeting_patterns,
+                    self.closing_patterns,
+                    self.footer_patterns,
+                )
+            ),
+        )
+
+    def _compile_program(self) -> None:
+        """Compile the config into the merged matchers used by ``_keep_line``.
+
+        Every garbage rule leads to the same verdict, so rules are grouped by
+        regex flags rather than category: one case-insensitive alternation
+        (greeting/closing/footer/URL), one case-sensitive one (e-mail, phone,
+        signature keywords) and a literal trie for job keywords.
+        """
+        self._force_delete = merge_patterns(getattr(self.config, "LINE_FILTER_FORCE_DELETE_PATTERNS", []), re.IGNORECASE)
+        job_pattern = literal_trie_pattern(self.job_keywords)
+        self._job_keyword_re = re.compile(job_pattern) if job_pattern is not None else None
+        self._garbage_programs = merge_patterns(
+            [
+                *self.config.LINE_FILTER_GREETING_PATTERNS,
+                *self.config.LINE_FILTER_CLOSING_PATTERNS,
+                *self.config.LINE_FILTER_FOOTER_PATTERNS,
+                _URL_RE.pattern,
+            ],
+            re.IGNORECASE,
+        )
+        signature_pattern = literal_trie_pattern(self.signature_keywords)
+        self._garbage_programs += merge_patterns(
+            [_EMAIL_RE.pattern, _PHONE_RE.pattern] + ([signature_pattern] if signature_pattern is not None else [])
+        )
+        chars = "".join(re.escape(ch) for ch in sorted(self.decoration_chars))
+        self._decoration_re = re.compile(f"[\\s{chars}]+")
 
     def filter_lines(self, lines: List[str]) -> List[str]:
         """Return lines after negative filtering; preserves job-related lines."""
+        return [lines[i] for i in self.keep_indices(lines)]
+
+    def filter_body(self, body: BodyLines) -> BodyLines:
+        """Filter a line-oriented body once; the result is marked as filtered."""
+        return body.select(self.keep_indices(body.lines))
+
+    def filter_batch(self, bodies: Sequence[BodyLines | Sequence[str]]) -> List[List[int]]:
+        """Kept line positions for each body of a micro-batch.
+
+        Lines of all bodies are deduplicated first, so the decision program (or
+        the verdict cache) runs once per distinct line in the batch rather than
+        once per occurrence.
+        """
+        line_lists = [body.lines if isinstance(body, BodyLines) else body for body in bodies]
+        if not self.enabled:
+            return [list(range(len(lines))) for lines in line_lists]
+        unique = list(dict.fromkeys(line for lines in line_lists for line in lines))
+        verdicts = dict.fromkeys(unique, False)
+        for idx in self.keep_indices(unique):
+            verdicts[unique[idx]] = True
+        return [[idx for idx, line in enumerate(lines) if verdicts[line]] for lines in line_lists]
+
+    def filter_bodies(self, bodies: Sequence[BodyLines]) -> List[BodyLines]:
+        """``filter_body`` for a micro-batch, evaluated through ``filter_batch``."""
+        return [body.select(kept) for body, kept in zip(bodies, self.filter_batch(bodies))]
+
+    def keep_indices(self, lines: Sequence[str]) -> List[int]:
+        """Positions of the lines that survive filtering."""
         if not self.enabled:
-            return list(lines)
-
-        kept: List[str] = []
-        for line in lines:
-            if self._matches_any(self.force_delete_patterns, line):
-                continue
-            if self._contains_job_keyword(line):
-                kept.append(line)
-                continue
-            if self._is_garbage_line(line):
-                continue
-            kept.append(line)
-        return kept
+            return list(range(len(lines)))
+        cache = get_verdict_cache(self.cache_size)
+        if cache is not None:
+            return cache.keep_indices(self._fingerprint, lines, self._keep_line)
+        keep = self._keep_line
+        return [idx for idx, line in enumerate(lines) if keep(line)]
+
+    def _keep_line(self, line: str) -> bool:
+        """Compiled decision program; same verdicts as ``_keep_line_reference``."""
+        for program in self._force_delete:
+            if program.search(line):
+                return False
+        if self._job_keyword_re is not None and self._job_keyword_re.search(line):
+            return True
+        trimmed = line.strip()
+        if not trimmed:
+            return False
+        # Cheap structural checks before any regex over the whole line.
+        if len(trimmed) <= 4 and _PUNCT_DIGIT_RE.match(trimmed):
+            return False
+        first = trimmed[0]
+        if not first.isalnum():
+            compact = _WHITESPACE_RE.sub("", trimmed)
+            if len(compact) >= 3 and compact.count(first) == len(compact):
+                return False
+        if self._decoration_re.fullmatch(trimmed):
+            return False
+        if self.company_prefixes and trimmed.startswith(self.company_prefixes):
+            return False
+        for program in self._garbage_programs:
+            if program.search(trimmed):
+                return False
+        return True
+
+    def _keep_line_reference(self, line: str) -> bool:
+        """Rule-by-rule evaluation the compiled program is checked against."""
+        if self._matches_any(self.force_delete_patterns, line):
+            return False
+        if self._contains_job_keyword(line):
+            return True
+        return not self._is_garbage_line(line)
 
     def _contains_job_keyword(self, line: str) -> bool:
         return any(keyword in line for keyword in self.job_keywords)
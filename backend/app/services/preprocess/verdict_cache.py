@@ -0,0 +1,126 @@
+"""Process-wide LRU cache of line-filter verdicts keyed by line text.
+
+Greetings, closings, disclaimers and signatures repeat verbatim across
+messages, so after the first occurrence a line's keep/delete verdict is one
+dict lookup. Verdicts are partitioned by a fingerprint of the line-filter
+rules: filters built from different configs (concurrent runs with different
+settings) each read and write only their own partition, and switching back and
+forth between configs does not throw verdicts away. Only the
+``MAX_PARTITIONS`` most recently used rule sets are kept.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, List, Optional, Sequence
+
+MAX_PARTITIONS = 4
+
+
+class LineVerdictCache:
+    """Bounded LRU of ``line -> keep`` verdicts per rule fingerprint, with hit-rate counters."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._partitions: "OrderedDict[Hashable, OrderedDict[str, bool]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _partition(self, fingerprint: Hashable) -> "OrderedDict[str, bool]":
+        with self._lock:
+            verdicts = self._partitions.get(fingerprint)
+            if verdicts is None:
+                verdicts = self._partitions[fingerprint] = OrderedDict()
+                while len(self._partitions) > MAX_PARTITIONS:
+                    self._partitions.popitem(last=False)
+                    self.invalidations += 1
+            else:
+                self._partitions.move_to_end(fingerprint)
+            return verdicts
+
+    def keep_indices(self, fingerprint: Hashable, lines: Sequence[str], decide: Callable[[str], bool]) -> List[int]:
+        """Positions of kept lines, calling ``decide`` only for lines uncached under ``fingerprint``."""
+        verdicts = self._partition(fingerprint)
+        lookup = verdicts.get
+        touch = verdicts.move_to_end
+        kept: List[int] = []
+        misses: Dict[str, bool] = {}
+        hits = 0
+        for idx, line in enumerate(lines):
+            verdict = lookup(line)
+            if verdict is None:
+                verdict = misses.get(line)
+                if verdict is None:
+                    verdict = misses[line] = decide(line)
+                else:
+                    hits += 1
+            else:
+                hits += 1
+                try:
+                    touch(line)
+                except KeyError:  # evicted by a concurrent writer
+                    pass
+            if verdict:
+                kept.append(idx)
+        with self._lock:
+            self.hits += hits
+            self.misses += len(misses)
+            for line, verdict in misses.items():
+                verdicts[line] = verdict
+            overflow = len(verdicts) - self.max_entries
+            for _ in range(max(overflow, 0)):
+                verdicts.popitem(last=False)
+            self.evictions += max(overflow, 0)
+        return kept
+
+    def clear(self) -> None:
+        with self._lock:
+            self._partitions.clear()
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "max_entries": self.max_entries,
+                "partitions": len(self._partitions),
+                "entries": sum(len(verdicts) for verdicts in self._partitions.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+_CACHE: Optional[LineVerdictCache] = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_verdict_cache(max_entries: int) -> Optional[LineVerdictCache]:
+    """Shared cache, resized when ``LINE_FILTER_CACHE_SIZE`` changes; ``None`` when disabled."""
+    global _CACHE
+    if max_entries <= 0:
+        return None
+    cache = _CACHE
+    if cache is None or cache.max_entries != max_entries:
+        with _CACHE_LOCK:
+            if _CACHE is None or _CACHE.max_entries != max_entries:
+                _CACHE = LineVerdictCache(max_entries)
+            cache = _CACHE
+    return cache
+
+
+def line_verdict_cache_stats() -> Dict[str, object]:
+    """Hit-rate counters of the shared verdict cache (empty counters if unused)."""
+    cache = _CACHE
+    if cache is None:
+        return {"enabled": False, "stats": None}
+    return {"enabled": True, "stats": cache.snapshot()}
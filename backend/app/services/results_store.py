@@ -0,0 +1,292 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from contextlib import asynccontextmanager
+from dataclasses import asdict, is_dataclass
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional, Protocol, Set, Tuple
+
+from app.services.db_pool import acquire, build_dsn
+from app.services.email_parser import EmailContent
+from app.services.preprocess import BodyLines
+from app.services.splitter import SplitBlock
+from app.utils.config import Config
+from app.utils.logging import logger
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+# (dsn, table) pairs whose table exists; checked once per process, not per load/save.
+_SCHEMA_READY: Set[Tuple[str, str]] = set()
+
+
+def hash_file(path: Path) -> str:
+    """Streaming sha256 of a file's content."""
+    digest = hashlib.sha256()
+    with path.open("rb") as fp:
+        for chunk in iter(lambda: fp.read(_HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def serialize_pipeline_result(result) -> Dict[str, Any]:
+    """Convert a PipelineResult into the JSON-safe dict persisted per file."""
+    semantic = result.semantic
+    if is_dataclass(semantic):
+        semantic = asdict(semantic)
+    return {
+        "source_path": result.source_path,
+        "subject": result.subject,
+        "semantic": semantic,
+        "aggregation": result.aggregation,
+        "blocks": [asdict(block) for block in result.blocks],
+    }
+
+
+def stored_blocks(item: Dict[str, Any]) -> List[SplitBlock]:
+    return [SplitBlock(**block) for block in item.get("blocks", [])]
+
+
+def serialize_prepared(prepared: List[dict]) -> List[Dict[str, Any]]:
+    """Persistable form of ``Pipeline.prepare_messages`` output (parsed, cleaned, filtered)."""
+    return [
+        {
+            "source_path": getattr(item["message"], "source_path", ""),
+            "subject": getattr(item["message"], "subject", ""),
+            "body_filtered": item["body_filtered"].text,
+            "line_indices": item["body_filtered"].indices,
+            "line_filtered": item["body_filtered"].filtered,
+        }
+        for item in prepared
+    ]
+
+
+def _restore_lines(item: Dict[str, Any]) -> BodyLines:
+    text = item["body_filtered"]
+    lines = text.split("\n") if text else []
+    return BodyLines(
+        lines=lines,
+        indices=list(item.get("line_indices") or []),
+        filtered=bool(item.get("line_filtered", True)),
+    )
+
+
+def restore_prepared(items: List[Dict[str, Any]]) -> List[dict]:
+    return [
+        {
+            "message": EmailContent(source_path=item["source_path"], subject=item["subject"]),
+            "body_filtered": _restore_lines(item),
+        }
+        for item in items
+    ]
+
+
+class ResultStore(Protocol):
+    async def load(self, file_hash: str, config_hash: str) -> Optional[List[Dict[str, Any]]]:  # pragma: no cover
+        ...
+
+    async def save(
+        self, file_hash: str, config_hash: str, filename: str, results: List[Dict[str, Any]]
+    ) -> None:  # pragma: no cover - interface
+        ...
+
+
+class SqliteResultStore:
+    """Local results store; the blocking sqlite calls run in worker threads."""
+
+    def __init__(self, path: str, table_name: str = "pipeline_results"):
+        self.path = Path(path)
+        self.table_name = table_name
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path)
+        if not self._initialized:
+            conn.execute(
+                f"""
+                CREATE TABLE IF NOT EXISTS {self.table_name} (
+                    file_hash TEXT NOT NULL,
+                    config_hash TEXT NOT NULL,
+                    filename TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (file_hash, config_hash)
+                )
+                """
+            )
+            self._initialized = True
+        return conn
+
+    async def load(self, file_hash: str, config_hash: str) -> Optional[List[Dict[str, Any]]]:
+        return await asyncio.to_thread(self._load_sync, file_hash, config_hash)
+
+    async def save(self, file_hash: str, config_hash: str, filename: str, results: List[Dict[str, Any]]) -> None:
+        await asyncio.to_thread(self._save_sync, file_hash, config_hash, filename, results)
+
+    def _load_sync(self, file_hash: str, config_hash: str) -> Optional[List[Dict[str, Any]]]:
+        with self._lock:
+            conn = self._connect()
+            try:
+                row = conn.execute(
+                    f"SELECT content FROM {self.table_name} WHERE file_hash = ? AND config_hash = ?",
+                    (file_hash, config_hash),
+                ).fetchone()
+            finally:
+                conn.close()
+        return json.loads(row[0]) if row else None
+
+    def _save_sync(self, file_hash: str, config_hash: str, filename: str, results: List[Dict[str, Any]]) -> None:
+        content = json.dumps(results, ensure_ascii=False)
+        with self._lock:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.execute(
+                        f"""
+                        INSERT INTO {self.table_name} (file_hash, config_hash, filename, content)
+                        VALUES (?, ?, ?, ?)
+                        ON CONFLICT (file_hash, config_hash)
+                        DO UPDATE SET filename = excluded.filename, content = excluded.content,
+                                      updated_at = CURRENT_TIMESTAMP
+                        """,
+                        (file_hash, config_hash, filename, content),
+                    )
+            finally:
+                conn.close()
+
+
+class DatabaseResultStore:
+    """Postgres-backed results store on the shared connection pool of the config database."""
+
+    def __init__(self, config: type[Config] = Config, table_name: str = "pipeline_results"):
+        self.config = config
+        self.table_name = table_name
+        self._create_sql = f"""
+            CREATE TABLE IF NOT EXISTS {table_name} (
+                file_hash TEXT NOT NULL,
+                config_hash TEXT NOT NULL,
+                filename TEXT NOT NULL,
+                content JSONB NOT NULL,
+                updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                PRIMARY KEY (file_hash, config_hash)
+            )
+            """
+
+    @asynccontextmanager
+    async def _acquire(self) -> AsyncIterator[Any]:
+        """Pooled connection; the table is created by the first use per DSN."""
+        dsn = build_dsn(self.config)
+        async with acquire(dsn, self.config) as conn:
+            key = (dsn, self.table_name)
+            if key not in _SCHEMA_READY:
+                await conn.execute(self._create_sql)
+                _SCHEMA_READY.add(key)
+            yield conn
+
+    async def load(self, file_hash: str, config_hash: str) -> Optional[List[Dict[str, Any]]]:
+        async with self._acquire() as conn:
+            content = await conn.fetchval(
+                f"SELECT content FROM {self.table_name} WHERE file_hash = $1 AND config_hash = $2",
+                file_hash,
+                config_hash,
+            )
+        if content is None:
+            return None
+        return json.loads(content) if isinstance(content, str) else content
+
+    async def save(self, file_hash: str, config_hash: str, filename: str, results: List[Dict[str, Any]]) -> None:
+        async with self._acquire() as conn:
+            await conn.execute(
+                f"""
+                INSERT INTO {self.table_name} (file_hash, config_hash, filename, content)
+                VALUES ($1, $2, $3, $4::jsonb)
+                ON CONFLICT (file_hash, config_hash)
+                DO UPDATE SET filename = EXCLUDED.filename, content = EXCLUDED.content, updated_at = NOW()
+                """,
+                file_hash,
+                config_hash,
+                filename,
+                json.dumps(results, ensure_ascii=False),
+            )
+
+
+def _connection_errors() -> Tuple[type, ...]:
+    try:
+        import asyncpg
+    except ImportError:  # pragma: no cover - optional dep
+        return (OSError,)
+    return (OSError, asyncpg.PostgresConnectionError)
+
+
+class FallbackResultStore:
+    """Postgres first; while it is unreachable use sqlite and retry Postgres after a backoff.
+
+    Only connection errors trigger the fallback; query errors propagate so a bad
+    statement does not silently move the process onto another store.
+    """
+
+    def __init__(self, primary: ResultStore, fallback: ResultStore, retry_seconds: float = 30.0):
+        self.primary = primary
+        self.fallback = fallback
+        self.retry_seconds = retry_seconds
+        self._retry_at: Optional[float] = None
+
+    async def _call(self, method: str, *args):
+        if self._retry_at is None or time.monotonic() >= self._retry_at:
+            try:
+                result = await getattr(self.primary, method)(*args)
+            except _connection_errors() as exc:
+                if self._retry_at is None:
+                    logger.warning("Results store database unavailable, using sqlite: %s", exc)
+                self._retry_at = time.monotonic() + self.retry_seconds
+            else:
+                if self._retry_at is not None:
+                    logger.info("Results store database reachable again")
+                    self._retry_at = None
+                return result
+        return await getattr(self.fallback, method)(*args)
+
+    async def load(self, file_hash: str, config_hash: str) -> Optional[List[Dict[str, Any]]]:
+        return await self._call("load", file_hash, config_hash)
+
+    async def save(self, file_hash: str, config_hash: str, filename: str, results: List[Dict[str, Any]]) -> None:
+        await self._call("save", file_hash, config_hash, filename, results)
+
+
+_STORES: Dict[str, ResultStore] = {}
+
+
+def _get_store(table_name: str, config: type[Config]) -> Optional[ResultStore]:
+    mode = (config.RESULT_STORE or "off").lower()
+    if mode == "off":
+        return None
+    store = _STORES.get(table_name)
+    if store is None:
+        sqlite_store = SqliteResultStore(config.RESULT_STORE_SQLITE_PATH, table_name=table_name)
+        if mode == "sqlite":
+            store = sqlite_store
+        elif mode == "db":
+            store = DatabaseResultStore(config, table_name=table_name)
+        else:
+            store = FallbackResultStore(
+                DatabaseResultStore(config, table_name=table_name),
+                sqlite_store,
+                retry_seconds=config.RESULT_STORE_RETRY_SECONDS,
+            )
+        _STORES[table_name] = store
+    return store
+
+
+def get_result_store(config: type[Config] = Config) -> Optional[ResultStore]:
+    """Return the process-wide per-file results store, or None when incremental runs are disabled."""
+    return _get_store("pipeline_results", config)
+
+
+def get_prepared_store(config: type[Config] = Config) -> Optional[ResultStore]:
+    """Store for upload-time artefacts (parsed, cleaned and line-filtered bodies)."""
+    return _get_store("pipeline_prepared", config)
@@ -1,15 +1,19 @@
 from __future__ import annotations
 
+import asyncio
 import logging
 from dataclasses import dataclass
 from functools import lru_cache
-from typing import Dict, List, Optional, Protocol, Sequence, Tuple
+from typing import Dict, List, Optional, Protocol, Sequence, Tuple, Union
 
 import numpy as np
 
-from app.services.preprocess import LineFilter
+from app.services.pipeline_settings import ConfigLike
+from app.services.preprocess import BodyLines, LineFilter
+from app.services.semantic_batcher import EmbeddingBatcher
 from app.utils.config import Config
 from app.utils.logging import logger
+from app.utils.metrics import count, timed
 
 
 class EmbeddingModel(Protocol):
@@ -53,6 +57,10 @@ def _load_model() -> EmbeddingModel:
     return SentenceTransformer(Config.SEMANTIC_MODEL, device=Config.SEMANTIC_DEVICE)
 
 
+# Bodies may be plain text or the pipeline's line-oriented representation.
+BodyInput = Union[str, BodyLines]
+
+
 def prepare_semantic_input(body: str, line_filter: LineFilter | None = None) -> str:
     """Apply lightweight line filtering before semantic extraction."""
     active_filter = line_filter or LineFilter()
@@ -71,16 +79,20 @@ class SemanticExtractor:
         field_templates: Optional[Dict[str, Sequence[str]]] = None,
         field_threshold: Optional[float] = None,
         line_filter: LineFilter | None = None,
+        batcher: EmbeddingBatcher | None = None,
+        config: ConfigLike = Config,
     ):
         self.model = model
-        self.line_filter = line_filter or LineFilter()
-        self.global_templates = list(global_templates) if global_templates is not None else Config.semantic_global_templates()
-        self.field_templates = dict(field_templates) if field_templates is not None else Config.semantic_field_templates()
-        self.context_radius = context_radius if context_radius is not None else Config.SEMANTIC_CONTEXT_RADIUS
+        self.batcher = batcher
+        self.config = config
+        self.line_filter = line_filter or LineFilter(config)
+        self.global_templates = list(global_templates) if global_templates is not None else config.semantic_global_templates()
+        self.field_templates = dict(field_templates) if field_templates is not None else config.semantic_field_templates()
+        self.context_radius = context_radius if context_radius is not None else config.SEMANTIC_CONTEXT_RADIUS
         self.global_threshold = (
-            global_threshold if global_threshold is not None else Config.SEMANTIC_JOB_GLOBAL_THRESHOLD
+            global_threshold if global_threshold is not None else config.SEMANTIC_JOB_GLOBAL_THRESHOLD
         )
-        self.field_threshold = field_threshold if field_threshold is not None else Config.SEMANTIC_JOB_FIELD_THRESHOLD
+        self.field_threshold = field_threshold if field_threshold is not None else config.SEMANTIC_JOB_FIELD_THRESHOLD
 
         self.global_embeddings = self._embed(self.global_templates)
         self.field_embeddings = {name: self._embed(values) for name, values in self.field_templates.items() if values}
@@ -90,8 +102,8 @@ class SemanticExtractor:
             return np.empty((0, 0), dtype=float)
         embeddings = self.model.encode(
             sentences,
-            batch_size=Config.SEMANTIC_BATCH_SIZE,
-            show_progress_bar=Config.SEMANTIC_SHOW_PROGRESS,
+            batch_size=self.config.SEMANTIC_BATCH_SIZE,
+            show_progress_bar=self.config.SEMANTIC_SHOW_PROGRESS,
             normalize_embeddings=True,
         )
         return np.asarray(embeddings, dtype=float)
@@ -106,16 +118,23 @@ class SemanticExtractor:
             segments.append(Segment(text=segment_text, start=start, end=end, body_index=0))
         return segments
 
+    def _filtered_lines(self, body: BodyInput) -> List[str]:
+        """Lines to score; bodies the pipeline already line-filtered are not filtered again."""
+        if isinstance(body, BodyLines):
+            lines = body.lines if body.filtered else self.line_filter.filter_lines(body.lines)
+        else:
+            lines = self.line_filter.filter_lines(body.splitlines())
+        return [line for line in lines if line.strip()]
+
     def _prepare_batch(
-        self, bodies: Sequence[str]
+        self, bodies: Sequence[BodyInput]
     ) -> Tuple[List[Segment], List[List[int]], List[List[str]]]:
         all_segments: List[Segment] = []
         segment_indices_by_body: List[List[int]] = []
         lines_per_body: List[List[str]] = []
 
         for body_index, body in enumerate(bodies):
-            prepared_body = prepare_semantic_input(body, line_filter=self.line_filter)
-            lines = [line for line in prepared_body.splitlines() if line.strip()]
+            lines = self._filtered_lines(body)
             lines_per_body.append(lines)
 
             if not lines:
@@ -241,12 +260,13 @@ class SemanticExtractor:
             line_scores=[float(v) for v in line_scores],
         )
 
-    def extract_batch(self, bodies: Sequence[str]) -> List[Optional[SemanticResult]]:
-        segments, segment_indices_by_body, lines_per_body = self._prepare_batch(bodies)
-        if not segments and not any(lines_per_body):
-            return [None for _ in bodies]
-
-        segment_embeddings = self._embed([segment.text for segment in segments]) if segments else np.empty((0, 0))
+    def _finalize_batch(
+        self,
+        segments: List[Segment],
+        segment_indices_by_body: List[List[int]],
+        lines_per_body: List[List[str]],
+        segment_embeddings: np.ndarray,
+    ) -> List[Optional[SemanticResult]]:
         global_scores = self._compute_global_scores(segment_embeddings) if segments else np.asarray([], dtype=float)
 
         top_samples = sorted(
@@ -266,11 +286,56 @@ class SemanticExtractor:
             results.append(result)
         return results
 
-    def extract(self, body: str) -> Optional[SemanticResult]:
+    def extract_batch(self, bodies: Sequence[BodyInput]) -> List[Optional[SemanticResult]]:
+        with timed("semantic_segment"):
+            segments, segment_indices_by_body, lines_per_body = self._prepare_batch(bodies)
+        if not segments and not any(lines_per_body):
+            return [None for _ in bodies]
+
+        count("segments_encoded", len(segments))
+        with timed("semantic_encode"):
+            segment_embeddings = self._embed([segment.text for segment in segments]) if segments else np.empty((0, 0))
+        with timed("semantic_score"):
+            return self._finalize_batch(segments, segment_indices_by_body, lines_per_body, segment_embeddings)
+
+    async def extract_batch_async(self, bodies: Sequence[BodyInput]) -> List[Optional[SemanticResult]]:
+        """Async variant of ``extract_batch`` that encodes through the shared batcher.
+
+        Segments from concurrent callers are coalesced into one ``model.encode``;
+        without a batcher the encode runs in a worker thread instead.
+        """
+        with timed("semantic_segment"):
+            segments, segment_indices_by_body, lines_per_body = self._prepare_batch(bodies)
+        if not segments and not any(lines_per_body):
+            return [None for _ in bodies]
+
+        count("segments_encoded", len(segments))
+        texts = [segment.text for segment in segments]
+        # Wall time including any wait for the batcher to coalesce other callers.
+        with timed("semantic_encode"):
+            if not segments:
+                segment_embeddings = np.empty((0, 0))
+            elif self.batcher is not None:
+                segment_embeddings = await self.batcher.encode(texts, batch_size=self.config.SEMANTIC_BATCH_SIZE)
+            else:
+                segment_embeddings = await asyncio.to_thread(self._embed, texts)
+        with timed("semantic_score"):
+            return self._finalize_batch(segments, segment_indices_by_body, lines_per_body, segment_embeddings)
+
+    def extract(self, body: BodyInput) -> Optional[SemanticResult]:
         results = self.extract_batch([body])
         return results[0] if results else None
 
 
-def get_semantic_extractor(model: EmbeddingModel | None = None) -> SemanticExtractor:
+@lru_cache(maxsize=1)
+def get_embedding_batcher() -> EmbeddingBatcher:
+    """Process-wide batcher so concurrent runs share one encode queue."""
+    return EmbeddingBatcher(model=_load_model())
+
+
+def get_semantic_extractor(model: EmbeddingModel | None = None, config: ConfigLike = Config) -> SemanticExtractor:
     active_model = model or _load_model()
-    return SemanticExtractor(model=active_model, line_filter=LineFilter())
+    batcher = None
+    if model is None and config.SEMANTIC_COALESCE_ENABLED:
+        batcher = get_embedding_batcher()
+    return SemanticExtractor(model=active_model, line_filter=LineFilter(config), batcher=batcher, config=config)
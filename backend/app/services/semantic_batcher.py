@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import weakref
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Set
+
+import numpy as np
+
+from app.utils.config import Config
+from app.utils.logging import logger
+
+# Upper bounds (inclusive) for the batch-size histograms; the last bucket is open-ended.
+_HISTOGRAM_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+
+def _estimate_tokens(sentence: str) -> int:
+    """Character-based token estimate; CJK text tokenizes roughly one token per character."""
+    return max(1, len(sentence))
+
+
+@dataclass
+class _PendingRequest:
+    sentences: List[str]
+    tokens: int
+    future: asyncio.Future
+    batch_size: Optional[int] = None
+
+
+@dataclass
+class _LoopQueue:
+    """Pending requests, flush timer, encode lock and in-flight batches of one event loop."""
+
+    pending: List[_PendingRequest] = field(default_factory=list)
+    tokens: int = 0
+    flush_handle: Optional[asyncio.TimerHandle] = None
+    encode_lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    # The loop only keeps weak references to tasks; these keep batches alive until done.
+    tasks: Set[asyncio.Task] = field(default_factory=set)
+
+
+@dataclass
+class BatcherStats:
+    queue_depth: int = 0
+    queued_sentences: int = 0
+    max_queue_depth: int = 0
+    batches: int = 0
+    requests: int = 0
+    sentences: int = 0
+    batch_sentences_histogram: Dict[str, int] = field(default_factory=dict)
+    batch_requests_histogram: Dict[str, int] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "queue_depth": self.queue_depth,
+            "queued_sentences": self.queued_sentences,
+            "max_queue_depth": self.max_queue_depth,
+            "batches": self.batches,
+            "requests": self.requests,
+            "sentences": self.sentences,
+            "batch_sentences_histogram": dict(self.batch_sentences_histogram),
+            "batch_requests_histogram": dict(self.batch_requests_histogram),
+        }
+
+
+def _bucket_label(value: int) -> str:
+    for bound in _HISTOGRAM_BUCKETS:
+        if value <= bound:
+            return f"le_{bound}"
+    return "le_inf"
+
+
+class EmbeddingBatcher:
+    """Coalesce concurrent encode requests into a single ``model.encode`` call.
+
+    Requests are collected until ``max_wait_ms`` elapses or the queued token
+    estimate reaches ``max_batch_tokens``; the combined batch is encoded once in a
+    worker thread and each caller receives its own slice of the embeddings.
+
+    The instance is process-wide, but asyncio primitives belong to one loop, so
+    the queue and encode lock are kept per running loop (the server loop, a
+    TestClient loop, ``asyncio.run`` in a worker thread); requests are only
+    coalesced with others on the same loop. Each request carries the
+    ``SEMANTIC_BATCH_SIZE`` of the run that submitted it; a coalesced batch
+    encodes with the smallest of them, so no run's memory bound is exceeded.
+    """
+
+    def __init__(
+        self,
+        model,
+        max_wait_ms: Optional[float] = None,
+        max_batch_tokens: Optional[int] = None,
+        config: type[Config] = Config,
+    ):
+        self.model = model
+        self.config = config
+        self.max_wait = (max_wait_ms if max_wait_ms is not None else config.SEMANTIC_COALESCE_WAIT_MS) / 1000.0
+        self.max_batch_tokens = (
+            max_batch_tokens if max_batch_tokens is not None else config.SEMANTIC_COALESCE_MAX_TOKENS
+        )
+        self._queues: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopQueue]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._queues_lock = threading.Lock()
+        self._stats = BatcherStats()
+
+    def stats(self) -> Dict[str, object]:
+        return self._stats.to_dict()
+
+    async def encode(self, sentences: Sequence[str], batch_size: Optional[int] = None) -> np.ndarray:
+        """Embeddings for ``sentences``; ``batch_size`` defaults to the batcher's config."""
+        if not sentences:
+            return np.empty((0, 0), dtype=float)
+
+        loop = asyncio.get_running_loop()
+        queue = self._queue_for(loop)
+
+        request = _PendingRequest(
+            sentences=list(sentences),
+            tokens=sum(_estimate_tokens(s) for s in sentences),
+            future=loop.create_future(),
+            batch_size=batch_size,
+        )
+        queue.pending.append(request)
+        queue.tokens += request.tokens
+        self._update_queue_stats()
+
+        if queue.tokens >= self.max_batch_tokens or self.max_wait <= 0:
+            self._flush(queue)
+        elif queue.flush_handle is None:
+            queue.flush_handle = loop.call_later(self.max_wait, self._flush, queue)
+
+        return await request.future
+
+    def _queue_for(self, loop: asyncio.AbstractEventLoop) -> _LoopQueue:
+        with self._queues_lock:
+            queue = self._queues.get(loop)
+            if queue is None:
+                queue = self._queues[loop] = _LoopQueue()
+            return queue
+
+    def _update_queue_stats(self) -> None:
+        with self._queues_lock:
+            pending = [request for queue in self._queues.values() for request in queue.pending]
+        self._stats.queue_depth = len(pending)
+        self._stats.queued_sentences = sum(len(r.sentences) for r in pending)
+        self._stats.max_queue_depth = max(self._stats.max_queue_depth, self._stats.queue_depth)
+
+    def _flush(self, queue: _LoopQueue) -> None:
+        if queue.flush_handle is not None:
+            queue.flush_handle.cancel()
+            queue.flush_handle = None
+        if not queue.pending:
+            return
+        batch = queue.pending
+        queue.pending = []
+        queue.tokens = 0
+        self._update_queue_stats()
+        task = asyncio.get_running_loop().create_task(self._run_batch(queue, batch))
+        queue.tasks.add(task)
+        task.add_done_callback(queue.tasks.discard)
+
+    def _record_batch(self, batch: List[_PendingRequest], sentence_count: int) -> None:
+        stats = self._stats
+        stats.batches += 1
+        stats.requests += len(batch)
+        stats.sentences += sentence_count
+        sentence_bucket = _bucket_label(sentence_count)
+        request_bucket = _bucket_label(len(batch))
+        stats.batch_sentences_histogram[sentence_bucket] = stats.batch_sentences_histogram.get(sentence_bucket, 0) + 1
+        stats.batch_requests_histogram[request_bucket] = stats.batch_requests_histogram.get(request_bucket, 0) + 1
+
+    def _encode_sync(self, sentences: List[str], batch_size: int) -> np.ndarray:
+        embeddings = self.model.encode(
+            sentences,
+            batch_size=batch_size,
+            show_progress_bar=self.config.SEMANTIC_SHOW_PROGRESS,
+            normalize_embeddings=True,
+        )
+        return np.asarray(embeddings, dtype=float)
+
+    async def _run_batch(self, queue: _LoopQueue, batch: List[_PendingRequest]) -> None:
+        sentences = [s for request in batch for s in request.sentences]
+        batch_size = min(
+            (request.batch_size for request in batch if request.batch_size),
+            default=self.config.SEMANTIC_BATCH_SIZE,
+        )
+        self._record_batch(batch, len(sentences))
+        logger.debug("Coalesced %d encode requests into one batch of %d sentences", len(batch), len(sentences))
+
+        try:
+            # One encode at a time per loop; requests arriving meanwhile form the next batch.
+            async with queue.encode_lock:
+                embeddings = await asyncio.to_thread(self._encode_sync, sentences, batch_size)
+        except Exception as exc:
+            for request in batch:
+                if not request.future.done():
+                    request.future.set_exception(exc)
+            return
+
+        offset = 0
+        for request in batch:
+            count = len(request.sentences)
+            if not request.future.done():
+                request.future.set_result(embeddings[offset : offset + count])
+            offset += count
@@ -2,9 +2,17 @@ from __future__ import annotations
 
 import re
 from dataclasses import dataclass
-from typing import List, Sequence
+from functools import lru_cache
+from typing import List, Sequence, Tuple, Union
 
+from app.services.index_rules import shared_index_rule_service
+from app.services.pipeline_settings import ConfigLike
+from app.services.preprocess import BodyLines
 from app.utils.config import Config
+from app.utils.logging import logger
+
+# Leading global flags, which Python only accepts at the very start of a pattern.
+_GLOBAL_FLAGS_RE = re.compile(r"^\(\?([imsx]+)\)")
 
 
 @dataclass
@@ -14,25 +22,108 @@ class SplitBlock:
     end_line: int
 
 
+def _scoped(pattern: str) -> str:
+    """Turn ``(?i)rest`` into ``(?i:rest)`` so it can sit inside an alternation."""
+    matched = _GLOBAL_FLAGS_RE.match(pattern)
+    if not matched:
+        return f"(?:{pattern})"
+    return f"(?{matched.group(1)}:{pattern[matched.end():]})"
+
+
+@lru_cache(maxsize=16)
+def compile_marker_set(patterns: Tuple[str, ...]) -> Tuple[re.Pattern[str], ...]:
+    """Compile marker patterns into one alternation, cached per pattern set.
+
+    The key is the pattern tuple itself, so a changed rule set compiles anew
+    while splitters rebuilt from an unchanged config reuse the same program.
+    Returns one pattern per marker only if the merged form does not compile.
+    """
+    if not patterns:
+        return ()
+    try:
+        return (re.compile("|".join(_scoped(p) for p in patterns)),)
+    except re.error:
+        return tuple(re.compile(p) for p in patterns)
+
+
+def _select_markers(config: ConfigLike, rules: Sequence) -> List[str]:
+    by_name = {rule.name: rule for rule in rules if rule.enabled}
+    patterns: List[str] = []
+    for name in getattr(config, "SPLITTER_INDEX_RULES", []):
+        rule = by_name.get(name)
+        if rule is None:
+            continue
+        try:
+            re.compile(rule.pattern)
+        except re.error as exc:
+            logger.warning("Skip invalid index rule %s for splitter: %s", name, exc)
+            continue
+        patterns.append(rule.pattern)
+    return patterns
+
+
+def load_index_rule_markers(config: ConfigLike = Config) -> List[str]:
+    """Patterns of the enabled index rules named in ``SPLITTER_INDEX_RULES``.
+
+    Synchronous fallback for splitters built without ``marker_patterns``; the
+    server resolves markers with ``resolve_marker_patterns`` before building.
+    """
+    if not getattr(config, "SPLITTER_INDEX_RULES", []):
+        return []
+    try:
+        rules = shared_index_rule_service(config).list_rules_sync()
+    except Exception as exc:  # pragma: no cover - db/env dependent
+        logger.warning("Index rules unavailable for splitter, using built-in markers only: %s", exc)
+        return []
+    return _select_markers(config, rules)
+
+
+async def resolve_marker_patterns(config: ConfigLike = Config) -> List[str]:
+    """Built-in markers plus index-rule markers, loaded on the caller's event loop."""
+    patterns = list(config.SPLITTER_MARKER_PATTERNS)
+    if not getattr(config, "SPLITTER_INDEX_RULES", []):
+        return patterns
+    try:
+        rules = await shared_index_rule_service(config).list_rules()
+    except Exception as exc:  # pragma: no cover - db/env dependent
+        logger.warning("Index rules unavailable for splitter, using built-in markers only: %s", exc)
+        return patterns
+    return [*patterns, *_select_markers(config, rules)]
+
+
 class Splitter:
-    """Identify multiple recruitment blocks based on marker lines."""
+    """Identify multiple recruitment blocks based on marker lines.
+
+    Markers are the built-in ``SPLITTER_MARKER_PATTERNS`` plus the index rules
+    listed in ``SPLITTER_INDEX_RULES`` (e.g. ``section_heading_split``), matched
+    at the start of each line through one combined regex.
+    """
 
-    def __init__(self, config: type[Config] = Config):
+    def __init__(self, config: ConfigLike = Config, marker_patterns: Sequence[str] | None = None):
         self.config = config
         self.skip_lines = config.SPLITTER_SKIP_LINES
-        self.marker_patterns = [re.compile(p) for p in config.SPLITTER_MARKER_PATTERNS]
+        if marker_patterns is None:
+            marker_patterns = [*config.SPLITTER_MARKER_PATTERNS, *load_index_rule_markers(config)]
+        self.marker_sources = tuple(marker_patterns)
+        self.marker_patterns = compile_marker_set(self.marker_sources)
+        if len(self.marker_patterns) == 1:
+            self._match_marker = self.marker_patterns[0].match
+        else:
+            self._match_marker = lambda line: any(p.match(line) for p in self.marker_patterns)
 
     def _is_marker(self, line: str, index: int, total: int) -> bool:
         if index <= self.skip_lines or index >= total - self.skip_lines:
             return False
-        return any(pattern.match(line) for pattern in self.marker_patterns)
+        return bool(self._match_marker(line))
 
-    def split(self, body: str) -> List[SplitBlock]:
-        lines = body.splitlines()
+    def split(self, body: Union[str, BodyLines]) -> List[SplitBlock]:
+        lines = body.lines if isinstance(body, BodyLines) else body.splitlines()
         total = len(lines)
-        markers = [idx for idx, line in enumerate(lines) if self._is_marker(line, idx, total)]
+        # Only lines outside the skipped head/tail can be markers.
+        match = self._match_marker
+        markers = [idx for idx in range(self.skip_lines + 1, total - self.skip_lines) if match(lines[idx])]
         if not markers:
-            cleaned = body.strip()
+            cleaned = (body.text if isinstance(body, BodyLines) else body).strip()
             return [SplitBlock(text=cleaned, start_line=0, end_line=total - 1)] if cleaned else []
 
         markers.sort()
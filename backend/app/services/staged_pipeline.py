@@ -0,0 +1,257 @@
+"""Pipelined execution of a run: parse → clean/filter → embed → aggregate.
+
+Each stage is a small group of threads connected to the next by a bounded
+``queue.Queue``, so parsing the next files overlaps with encoding and
+aggregation of earlier messages, and a slow stage back-pressures the ones
+before it instead of letting messages pile up in memory. The embed stage is a
+single thread that drains whatever is queued (up to ``SEMANTIC_BATCH_SIZE``)
+into one ``extract_batch`` call.
+
+Per stage the runner records busy time (working on items), starved time
+(waiting for input) and blocked time (waiting for room downstream);
+``utilization`` = busy / (elapsed × workers). The busiest stage is the
+bottleneck; a stage with high blocked time is being held back by the next one.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.services.email_parser import parse_email_file
+from app.services.pipeline import Pipeline, PipelineResult
+from app.utils.logging import logger
+
+_DONE = object()
+
+
+@dataclass
+class StageStats:
+    name: str
+    workers: int
+    items: int = 0
+    busy: float = 0.0
+    starved: float = 0.0
+    blocked: float = 0.0
+    queue_peak: int = 0
+
+    def add(self, other: "StageStats") -> None:
+        self.items += other.items
+        self.busy += other.busy
+        self.starved += other.starved
+        self.blocked += other.blocked
+
+    def to_dict(self, elapsed: float) -> Dict[str, Any]:
+        capacity = elapsed * self.workers
+        return {
+            "workers": self.workers,
+            "items": self.items,
+            "busy_ms": round(self.busy * 1000, 3),
+            "starved_ms": round(self.starved * 1000, 3),
+            "blocked_ms": round(self.blocked * 1000, 3),
+            "utilization": round(self.busy / capacity, 4) if capacity else 0.0,
+            "input_queue_peak": self.queue_peak,
+        }
+
+
+@dataclass
+class StagedRun:
+    """Per-path results (in input order) and per-stage metrics of one staged run."""
+
+    results: List[List[PipelineResult]]
+    stages: Dict[str, Dict[str, Any]]
+    elapsed: float
+    bottleneck: str = ""
+
+    def metrics(self) -> Dict[str, Any]:
+        return {"elapsed_ms": round(self.elapsed * 1000, 3), "bottleneck": self.bottleneck, "stages": self.stages}
+
+
+@dataclass
+class _Stage:
+    stats: StageStats
+    inbox: "queue.Queue"
+    outbox: Optional["queue.Queue"]
+    downstream_workers: int
+    remaining: int
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+class StagedPipeline:
+    """Runs ``Pipeline`` stages for a list of files as a thread pipeline with bounded queues."""
+
+    def __init__(self, pipeline: Pipeline, parse: Callable[[Path], Sequence] = parse_email_file):
+        config = pipeline.config
+        self.pipeline = pipeline
+        self.parse = parse
+        self.queue_size = max(1, config.PIPELINE_STAGE_QUEUE_SIZE)
+        self.batch_size = max(1, config.SEMANTIC_BATCH_SIZE)
+        self.workers = {
+            "parse": max(1, config.PIPELINE_PARSE_WORKERS),
+            "clean": max(1, config.PIPELINE_CLEAN_WORKERS),
+            "embed": 1,
+            "aggregate": max(1, config.PIPELINE_AGGREGATE_WORKERS),
+        }
+
+    # --- stage bodies ----------------------------------------------------
+    def _parse(self, item):
+        file_index, path = item
+        messages = list(self.parse(path))
+        with self._lock:
+            self._counts[file_index] = len(messages)
+        return [((file_index, n), message) for n, message in enumerate(messages)]
+
+    def _clean(self, item):
+        key, message = item
+        return [(key, message, self.pipeline._apply_line_filter(self.pipeline._clean(message)))]
+
+    def _embed(self, batch):
+        extractor = self.pipeline.semantic_extractor
+        bodies = [body for _, _, body in batch]
+        semantic = extractor.extract_batch(bodies) if extractor else [None] * len(batch)
+        return [(key, message, body, result) for (key, message, body), result in zip(batch, semantic)]
+
+    def _aggregate(self, item):
+        key, message, body, semantic = item
+        blocks, aggregation = self.pipeline.block_stages.run(body)
+        result = PipelineResult(
+            source_path=getattr(message, "source_path", ""),
+            subject=getattr(message, "subject", ""),
+            semantic=semantic,
+            blocks=blocks,
+            aggregation=aggregation,
+        )
+        with self._lock:
+            self._results[key] = result
+        return []
+
+    # --- plumbing ----------------------------------------------------------
+    def _put(self, stage: _Stage, item, local: StageStats) -> None:
+        start = time.perf_counter()
+        stage.outbox.put(item)
+        local.blocked += time.perf_counter() - start
+
+    def _get(self, stage: _Stage, local: StageStats):
+        start = time.perf_counter()
+        item = stage.inbox.get()
+        local.starved += time.perf_counter() - start
+        size = stage.inbox.qsize()
+        if size > stage.stats.queue_peak:
+            stage.stats.queue_peak = size
+        return item
+
+    def _next_batch(self, stage: _Stage, local: StageStats):
+        """Block for one item, then take whatever else is already queued, up to the batch size."""
+        first = self._get(stage, local)
+        if first is _DONE:
+            return first, False
+        batch = [first]
+        while len(batch) < self.batch_size:
+            try:
+                item = stage.inbox.get_nowait()
+            except queue.Empty:
+                break
+            if item is _DONE:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _work(self, stage: _Stage, fn: Callable, batched: bool = False) -> None:
+        local = StageStats(stage.stats.name, 1)
+        try:
+            finished = False
+            while not finished:
+                if batched:
+                    item, finished = self._next_batch(stage, local)
+                else:
+                    item = self._get(stage, local)
+                if item is _DONE:
+                    break
+                if self._failed.is_set():
+                    continue  # keep draining so upstream never blocks on a full queue
+                start = time.perf_counter()
+                try:
+                    outputs = fn(item)
+                except Exception as exc:
+                    self._fail(stage.stats.name, exc)
+                    continue
+                local.busy += time.perf_counter() - start
+                local.items += len(item) if batched else 1
+                for output in outputs:
+                    self._put(stage, output, local)
+        finally:
+            with stage.lock:
+                stage.stats.add(local)
+                stage.remaining -= 1
+                last = stage.remaining == 0
+            if last and stage.outbox is not None:
+                for _ in range(stage.downstream_workers):
+                    stage.outbox.put(_DONE)
+
+    def _fail(self, name: str, exc: Exception) -> None:
+        with self._lock:
+            if self._error is None:
+                logger.error("Staged pipeline failed in %s stage: %s", name, exc)
+                self._error = exc
+        self._failed.set()
+
+    # --- entry point -------------------------------------------------------
+    def run(self, paths: Sequence[Path]) -> StagedRun:
+        self._lock = threading.Lock()
+        self._failed = threading.Event()
+        self._error: Optional[Exception] = None
+        self._counts: Dict[int, int] = {}
+        self._results: Dict[Tuple[int, int], PipelineResult] = {}
+
+        names = ["parse", "clean", "embed", "aggregate"]
+        bodies = {"parse": self._parse, "clean": self._clean, "embed": self._embed, "aggregate": self._aggregate}
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in names]
+        stages: Dict[str, _Stage] = {}
+        for index, name in enumerate(names):
+            last = index == len(names) - 1
+            stages[name] = _Stage(
+                stats=StageStats(name, self.workers[name]),
+                inbox=queues[index],
+                outbox=None if last else queues[index + 1],
+                downstream_workers=0 if last else self.workers[names[index + 1]],
+                remaining=self.workers[name],
+            )
+
+        start = time.perf_counter()
+        threads = [
+            threading.Thread(
+                # Per-thread context copies carry the caller's per-run metrics collector.
+                target=contextvars.copy_context().run,
+                args=(self._work, stages[name], bodies[name], name == "embed"),
+                name=f"staged-{name}-{n}",
+                daemon=True,
+            )
+            for name in names
+            for n in range(self.workers[name])
+        ]
+        for thread in threads:
+            thread.start()
+        for item in enumerate(paths):
+            queues[0].put(item)
+        for _ in range(self.workers["parse"]):
+            queues[0].put(_DONE)
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        if self._error is not None:
+            raise self._error
+
+        results = [
+            [self._results[(file_index, n)] for n in range(self._counts.get(file_index, 0))]
+            for file_index in range(len(paths))
+        ]
+        metrics = {name: stage.stats.to_dict(elapsed) for name, stage in stages.items()}
+        bottleneck = max(metrics, key=lambda name: metrics[name]["utilization"]) if paths else ""
+        logger.info("Staged pipeline: files=%d, elapsed=%.3fs, bottleneck=%s", len(paths), elapsed, bottleneck)
+        return StagedRun(results=results, stages=metrics, elapsed=elapsed, bottleneck=bottleneck)
@@ -84,6 +84,12 @@ class Config:
     DB_NAME = os.getenv("DB_NAME", "erex")
     DB_BOOTSTRAP = os.getenv("DB_BOOTSTRAP", "true").lower() == "true"
     DB_BOOTSTRAP_DB = os.getenv("DB_BOOTSTRAP_DB", "postgres")
+    # Shared asyncpg pool (app/services/db_pool.py)
+    DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", 1))
+    DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", 10))
+    # Pipeline config snapshot: NOTIFY channel, and max age when no listener is connected (0 = no limit)
+    PIPELINE_CONFIG_CHANNEL = os.getenv("PIPELINE_CONFIG_CHANNEL", "pipeline_config_changed")
+    CONFIG_SNAPSHOT_MAX_AGE = float(os.getenv("CONFIG_SNAPSHOT_MAX_AGE", 60))
 
     # Redis
     REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
@@ -114,6 +120,10 @@ class Config:
     SEMANTIC_JOB_FIELD_THRESHOLD = float(
         os.getenv("SEMANTIC_JOB_FIELD_THRESHOLD", _SEMANTIC_TEMPLATES.get("field_threshold", 0.4))
     )
+    # Request coalescing: concurrent encode calls are merged into one model.encode
+    SEMANTIC_COALESCE_ENABLED = os.getenv("SEMANTIC_COALESCE_ENABLED", "true").lower() == "true"
+    SEMANTIC_COALESCE_WAIT_MS = float(os.getenv("SEMANTIC_COALESCE_WAIT_MS", 5))
+    SEMANTIC_COALESCE_MAX_TOKENS = int(os.getenv("SEMANTIC_COALESCE_MAX_TOKENS", 16384))
 
     # Keyword extractor
     KEYWORDS_TECH_PATH = os.getenv("KEYWORDS_TECH_PATH", _default_keywords_path())
@@ -130,6 +140,10 @@ class Config:
         r"^[\s\W]*案件名[\s\W]*$",
         r"^[\s\W]*案件[\s\W]*$",
     ]
+    # Index rules whose patterns also mark block starts (comma separated names; empty disables)
+    SPLITTER_INDEX_RULES = [
+        name.strip() for name in os.getenv("SPLITTER_INDEX_RULES", "section_heading_split").split(",") if name.strip()
+    ]
 
     # Pipeline orchestration
     PIPELINE_STEPS = (
@@ -141,6 +155,66 @@ class Config:
         .split(",")
     )
 
+    # Split/extract/classify after semantic: serial | thread | process | auto
+    # (auto: thread on free-threaded builds, process otherwise); messages are partitioned across workers
+    PIPELINE_CPU_EXECUTOR = os.getenv("PIPELINE_CPU_EXECUTOR", "serial").lower()
+    PIPELINE_CPU_WORKERS = int(os.getenv("PIPELINE_CPU_WORKERS", 0))  # 0: os.cpu_count()
+    PIPELINE_CPU_MIN_MESSAGES = int(os.getenv("PIPELINE_CPU_MIN_MESSAGES", 64))  # smaller batches stay serial
+
+    # Per-stage timers/counters (app/utils/metrics.py): run "timings" and GET /metrics
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+    # cProfile for /pipeline/run: off | request (?profile=true) | always
+    PIPELINE_PROFILING = os.getenv("PIPELINE_PROFILING", "off").lower()
+    PIPELINE_PROFILE_DIR = os.getenv("PIPELINE_PROFILE_DIR", str(PROJECT_ROOT / ".cache" / "profiles"))
+    PIPELINE_PROFILE_TOP_N = int(os.getenv("PIPELINE_PROFILE_TOP_N", 25))
+    PIPELINE_PROFILE_KEEP = int(os.getenv("PIPELINE_PROFILE_KEEP", 50))  # newest .prof files kept; 0: all
+
+    # Staged /pipeline/run: parse → clean/filter → embed → aggregate threads linked by bounded queues
+    PIPELINE_STAGED = os.getenv("PIPELINE_STAGED", "false").lower() == "true"
+    PIPELINE_STAGE_QUEUE_SIZE = int(os.getenv("PIPELINE_STAGE_QUEUE_SIZE", 256))  # items per queue
+    PIPELINE_PARSE_WORKERS = int(os.getenv("PIPELINE_PARSE_WORKERS", 2))
+    PIPELINE_CLEAN_WORKERS = int(os.getenv("PIPELINE_CLEAN_WORKERS", 2))
+    PIPELINE_AGGREGATE_WORKERS = int(os.getenv("PIPELINE_AGGREGATE_WORKERS", 2))
+
+    # Email parsing: mmap + header/boundary scan for .eml, decoding only the chosen text part
+    EML_FAST_PARSE = os.getenv("EML_FAST_PARSE", "true").lower() == "true"
+
+    # Cleaner: single-pass line-streaming HTML scanner; bounded memory but slower in CPython
+    # than the C-level regex passes, so opt-in (see benchmarks/bench_cleaner.py)
+    CLEANER_STREAMING = os.getenv("CLEANER_STREAMING", "false").lower() == "true"
+
+    # Body size budgets (0 disables, the default since they drop content): oversized text
+    # parts are skipped before decoding, decoded bodies (HTML before stripping) are
+    # truncated to BODY_MAX_CHARS.
+    BODY_MAX_PART_BYTES = int(os.getenv("BODY_MAX_PART_BYTES", 0))
+    BODY_MAX_CHARS = int(os.getenv("BODY_MAX_CHARS", 0))
+
+    # readpst fallback: stream per-message files instead of a full mbox round trip
+    READPST_STREAMING = os.getenv("READPST_STREAMING", "true").lower() == "true"
+    READPST_JOBS = int(os.getenv("READPST_JOBS", 0))  # >0: readpst extracts folders in parallel
+
+    # pypff: extract message ranges in a process pool (each worker opens its own handle)
+    PST_PARALLEL_WORKERS = int(os.getenv("PST_PARALLEL_WORKERS", 0))  # <=1: single process
+    PST_PARALLEL_CHUNK = int(os.getenv("PST_PARALLEL_CHUNK", 200))  # messages per worker task
+
+    # Incremental runs: per-file results keyed by content hash + config hash
+    RESULT_STORE = os.getenv("RESULT_STORE", "auto").lower()  # auto | sqlite | db | off
+    RESULT_STORE_SQLITE_PATH = os.getenv(
+        "RESULT_STORE_SQLITE_PATH", str(PROJECT_ROOT / ".cache" / "pipeline_results.sqlite3")
+    )
+    # auto mode: seconds on sqlite after a Postgres connection failure before retrying Postgres
+    RESULT_STORE_RETRY_SECONDS = float(os.getenv("RESULT_STORE_RETRY_SECONDS", 30))
+
+    # Upload-time eager ingestion: off | prepare (parse/clean/filter) | embed (full pipeline)
+    UPLOAD_EAGER_INGEST = os.getenv("UPLOAD_EAGER_INGEST", "off").lower()
+
+    # Chunked, resumable uploads (staging area lives outside data/)
+    UPLOAD_STAGING_DIR = os.getenv("UPLOAD_STAGING_DIR", str(PROJECT_ROOT / ".cache" / "uploads"))
+    UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", 8 * 1024 * 1024))
+    UPLOAD_MAX_SIZE = int(os.getenv("UPLOAD_MAX_SIZE", 20 * 1024**3))  # declared size limit, 0 = none
+    UPLOAD_SESSION_TTL = int(os.getenv("UPLOAD_SESSION_TTL", 24 * 3600))  # idle seconds before a session is swept
+
     # Lightweight line filter (between cleaner and semantic)
     ENABLE_LINE_FILTER = os.getenv("ENABLE_LINE_FILTER", "true").lower() == "true"
     LINE_FILTER_CONFIG_PATH = os.getenv("LINE_FILTER_CONFIG_PATH", _default_line_filter_config_path())
@@ -153,11 +227,15 @@ class Config:
     LINE_FILTER_FOOTER_PATTERNS = _LINE_FILTER_SETTINGS.get("footer_patterns", [])
     LINE_FILTER_JOB_KEYWORDS = _LINE_FILTER_SETTINGS.get("job_keywords", [])
     LINE_FILTER_FORCE_DELETE_PATTERNS = _LINE_FILTER_SETTINGS.get("force_delete_patterns", [])
+    # Process-wide LRU of per-line verdicts (0 disables)
+    LINE_FILTER_CACHE_SIZE = int(os.getenv("LINE_FILTER_CACHE_SIZE", 50000))
 
     # Index rule source
     INDEX_RULE_SOURCE = os.getenv("INDEX_RULE_SOURCE", "file").lower()
     INDEX_RULES_PATH = os.getenv("INDEX_RULES_PATH", _default_index_rules_path())
     INDEX_RULE_TABLE = os.getenv("INDEX_RULE_TABLE", "index_rules")
+    # Seconds rules are served from memory before the source is checked for changes (0 = check every call)
+    INDEX_RULE_CACHE_TTL = float(os.getenv("INDEX_RULE_CACHE_TTL", 30))
 
     @classmethod
     def summary(cls):
@@ -179,11 +257,21 @@ class Config:
             "semantic_context_radius": cls.SEMANTIC_CONTEXT_RADIUS,
             "semantic_global_threshold": cls.SEMANTIC_JOB_GLOBAL_THRESHOLD,
             "semantic_field_threshold": cls.SEMANTIC_JOB_FIELD_THRESHOLD,
+            "semantic_coalesce_enabled": cls.SEMANTIC_COALESCE_ENABLED,
+            "semantic_coalesce_wait_ms": cls.SEMANTIC_COALESCE_WAIT_MS,
+            "semantic_coalesce_max_tokens": cls.SEMANTIC_COALESCE_MAX_TOKENS,
             "keywords_tech_path": cls.KEYWORDS_TECH_PATH,
+            "pipeline_cpu_executor": cls.PIPELINE_CPU_EXECUTOR,
+            "pipeline_cpu_workers": cls.PIPELINE_CPU_WORKERS,
+            "pipeline_staged": cls.PIPELINE_STAGED,
+            "metrics_enabled": cls.METRICS_ENABLED,
+            "pipeline_profiling": cls.PIPELINE_PROFILING,
             "line_filter_enabled": cls.ENABLE_LINE_FILTER,
             "line_filter_config_path": cls.LINE_FILTER_CONFIG_PATH,
+            "line_filter_cache_size": cls.LINE_FILTER_CACHE_SIZE,
             "line_filter_job_keywords": len(cls.LINE_FILTER_JOB_KEYWORDS),
             "line_filter_greeting_patterns": len(cls.LINE_FILTER_GREETING_PATTERNS),
+            "result_store": cls.RESULT_STORE,
             "index_rule_source": cls.INDEX_RULE_SOURCE,
             "index_rules_path": cls.INDEX_RULES_PATH,
             "index_rule_table": cls.INDEX_RULE_TABLE,
@@ -192,7 +280,7 @@ class Config:
     @classmethod
     def semantic_global_templates(cls) -> list[str]:
         data = cls._SEMANTIC_TEMPLATES.get("global", [])
-        return list(data) if isinstance(data, list) else []
+        return list(data) if isinstance(data, (list, tuple)) else []
 
     @classmethod
     def semantic_field_templates(cls) -> dict[str, list[str]]:
@@ -200,7 +288,7 @@ class Config:
         output: dict[str, list[str]] = {}
         if isinstance(fields, dict):
             for key, value in fields.items():
-                if isinstance(value, list):
+                if isinstance(value, (list, tuple)):
                     output[str(key)] = [str(v) for v in value]
         return output
 
@@ -209,7 +297,7 @@ class Config:
         output: dict[str, list[str]] = {}
         if isinstance(cls._KEYWORDS_TECH, dict):
             for key, values in cls._KEYWORDS_TECH.items():
-                if isinstance(values, list):
+                if isinstance(values, (list, tuple)):
                     output[str(key)] = [str(v) for v in values]
         return output
 
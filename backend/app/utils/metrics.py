@@ -0,0 +1,170 @@
+"""Lightweight per-stage timers and counters.
+
+``timed("clean")`` and ``count("blocks", n)`` record into a process-wide
+``MetricsRegistry`` (scraped via ``GET /metrics``) and, inside a
+``collect_run()`` block, into that run's registry as well, which the run
+endpoint returns as ``timings``. The current run travels in a ``ContextVar``,
+so it follows ``await`` and ``asyncio.to_thread``; threads started by hand
+must run their target in ``contextvars.copy_context()``. Worker processes
+collect into their own run registry and return ``export()`` for the parent's
+``merge_metrics``.
+
+With ``METRICS_ENABLED=false`` ``timed`` returns one shared no-op context
+manager and ``count`` returns immediately, so instrumented code pays only an
+attribute lookup per call.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional
+
+from app.utils.config import Config
+
+_NOOP = contextlib.nullcontext()
+
+
+class MetricsRegistry:
+    """Thread-safe stage timings (calls / total / max seconds) and named counters."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._timings: Dict[str, List[float]] = {}
+        self._counters: Dict[str, int] = {}
+
+    def observe(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            entry = self._timings.get(stage)
+            if entry is None:
+                self._timings[stage] = [1, seconds, seconds]
+            else:
+                entry[0] += 1
+                entry[1] += seconds
+                if seconds > entry[2]:
+                    entry[2] = seconds
+
+    def incr(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def export(self) -> Dict[str, Dict]:
+        """Raw timings and counters, picklable so a worker process can hand them to ``merge``."""
+        with self._lock:
+            return {
+                "timings": {stage: list(entry) for stage, entry in self._timings.items()},
+                "counters": dict(self._counters),
+            }
+
+    def merge(self, exported: Dict[str, Dict]) -> None:
+        with self._lock:
+            for stage, (calls, total, peak) in exported["timings"].items():
+                entry = self._timings.get(stage)
+                if entry is None:
+                    self._timings[stage] = [calls, total, peak]
+                else:
+                    entry[0] += calls
+                    entry[1] += total
+                    if peak > entry[2]:
+                        entry[2] = peak
+            for name, value in exported["counters"].items():
+                self._counters[name] = self._counters.get(name, 0) + value
+
+    def reset(self) -> None:
+        with self._lock:
+            self._timings.clear()
+            self._counters.clear()
+
+    def snapshot(self) -> Dict[str, Dict]:
+        with self._lock:
+            stages = {
+                stage: {"calls": int(calls), "total_ms": round(total * 1000, 3), "max_ms": round(peak * 1000, 3)}
+                for stage, (calls, total, peak) in self._timings.items()
+            }
+            return {"stages": stages, "counters": dict(self._counters)}
+
+    def prometheus(self, prefix: str = "pipeline") -> str:
+        """Render in the Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            timings = sorted(self._timings.items())
+            counters = sorted(self._counters.items())
+        lines = [
+            f"# HELP {prefix}_stage_calls_total Number of times each pipeline stage ran.",
+            f"# TYPE {prefix}_stage_calls_total counter",
+            *(f'{prefix}_stage_calls_total{{stage="{stage}"}} {int(calls)}' for stage, (calls, _, _) in timings),
+            f"# HELP {prefix}_stage_seconds_total Time spent in each pipeline stage.",
+            f"# TYPE {prefix}_stage_seconds_total counter",
+            *(f'{prefix}_stage_seconds_total{{stage="{stage}"}} {total:.6f}' for stage, (_, total, _) in timings),
+            f"# HELP {prefix}_stage_seconds_max Longest single call of each pipeline stage.",
+            f"# TYPE {prefix}_stage_seconds_max gauge",
+            *(f'{prefix}_stage_seconds_max{{stage="{stage}"}} {peak:.6f}' for stage, (_, _, peak) in timings),
+            f"# HELP {prefix}_events_total Items counted by pipeline stages.",
+            f"# TYPE {prefix}_events_total counter",
+            *(f'{prefix}_events_total{{name="{name}"}} {value}' for name, value in counters),
+            f"# HELP {prefix}_metrics_enabled Whether stage instrumentation is on.",
+            f"# TYPE {prefix}_metrics_enabled gauge",
+            f"{prefix}_metrics_enabled {int(Config.METRICS_ENABLED)}",
+        ]
+        return "\n".join(lines) + "\n"
+
+
+PROCESS_METRICS = MetricsRegistry()
+_RUN_METRICS: ContextVar[Optional[MetricsRegistry]] = ContextVar("run_metrics", default=None)
+
+
+class _Timer:
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self) -> "_Timer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        elapsed = time.perf_counter() - self.start
+        PROCESS_METRICS.observe(self.stage, elapsed)
+        run = _RUN_METRICS.get()
+        if run is not None:
+            run.observe(self.stage, elapsed)
+
+
+def timed(stage: str):
+    """Context manager timing one call of ``stage``."""
+    return _Timer(stage) if Config.METRICS_ENABLED else _NOOP
+
+
+def count(name: str, value: int = 1) -> None:
+    if not Config.METRICS_ENABLED:
+        return
+    PROCESS_METRICS.incr(name, value)
+    run = _RUN_METRICS.get()
+    if run is not None:
+        run.incr(name, value)
+
+
+def merge_metrics(exported: Optional[Dict[str, Dict]]) -> None:
+    """Record metrics collected in another process (see ``MetricsRegistry.export``)."""
+    if not exported or not Config.METRICS_ENABLED:
+        return
+    PROCESS_METRICS.merge(exported)
+    run = _RUN_METRICS.get()
+    if run is not None:
+        run.merge(exported)
+
+
+@contextlib.contextmanager
+def collect_run() -> Iterator[Optional[MetricsRegistry]]:
+    """Collect the metrics of everything run inside the block; yields ``None`` when disabled."""
+    if not Config.METRICS_ENABLED:
+        yield None
+        return
+    registry = MetricsRegistry()
+    token = _RUN_METRICS.set(registry)
+    try:
+        yield registry
+    finally:
+        _RUN_METRICS.reset(token)
@@ -0,0 +1,139 @@
+"""Opt-in cProfile capture for pipeline runs.
+
+``profile_run()`` enables ``cProfile`` for the duration of a ``with`` block,
+writes the raw stats to ``PIPELINE_PROFILE_DIR/<id>.prof`` (loadable with
+``pstats`` or snakeviz) and summarizes the top-N functions by cumulative time.
+
+cProfile only sees the thread that enabled it: for ``/pipeline/run`` that is
+the event loop thread, so work handed to other threads (``asyncio.to_thread``,
+staged pipeline workers, thread pools) shows up as the waiting call rather
+than its own functions, and coroutines of concurrent requests are included.
+Only one run can be profiled at a time: an explicitly requested profile fails
+with ``ProfilerBusyError``, an optional one (``PIPELINE_PROFILING=always``) is
+skipped. Only the newest ``PIPELINE_PROFILE_KEEP`` artefacts are kept.
+"""
+
+from __future__ import annotations
+
+import cProfile
+import pstats
+import re
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from app.utils.config import Config
+
+PROFILING_MODES = ("off", "request", "always")
+_PROFILE_ID_RE = re.compile(r"^run-\d{8}T\d{6}-[0-9a-f]{8}$")
+_ACTIVE = threading.Lock()
+
+
+class ProfilerBusyError(RuntimeError):
+    """Another run is already being profiled."""
+
+
+def profiling_mode(config: type[Config] = Config) -> str:
+    mode = (config.PIPELINE_PROFILING or "off").strip().lower()
+    return mode if mode in PROFILING_MODES else "off"
+
+
+def profile_path(profile_id: str, config: type[Config] = Config) -> Optional[Path]:
+    """Artefact path for a profile id, or ``None`` for ids this module would not have produced."""
+    if not _PROFILE_ID_RE.match(profile_id):
+        return None
+    return Path(config.PIPELINE_PROFILE_DIR) / f"{profile_id}.prof"
+
+
+def prune_profiles(config: type[Config] = Config) -> int:
+    """Delete all but the newest ``PIPELINE_PROFILE_KEEP`` artefacts; returns how many were removed."""
+    keep = config.PIPELINE_PROFILE_KEEP
+    directory = Path(config.PIPELINE_PROFILE_DIR)
+    if keep <= 0 or not directory.is_dir():
+        return 0
+    artefacts = [path for path in directory.glob("run-*.prof") if _PROFILE_ID_RE.match(path.stem)]
+    # Ids start with a second-resolution timestamp; mtime breaks ties within a second.
+    artefacts.sort(key=lambda path: (path.stem[:19], path.stat().st_mtime_ns), reverse=True)
+    removed = 0
+    for path in artefacts[keep:]:
+        try:
+            path.unlink()
+            removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
+
+
+def top_functions(stats: pstats.Stats, limit: int, sort: str = "cumulative") -> List[Dict[str, object]]:
+    stats.sort_stats(sort)
+    rows: List[Dict[str, object]] = []
+    for func in stats.fcn_list[:limit]:
+        primitive_calls, total_calls, tottime, cumtime, _ = stats.stats[func]
+        filename, line, name = func
+        rows.append(
+            {
+                "function": pstats.func_std_string(func),
+                "file": filename,
+                "line": line,
+                "name": name,
+                "ncalls": total_calls,
+                "primitive_calls": primitive_calls,
+                "tottime_ms": round(tottime * 1000, 3),
+                "cumtime_ms": round(cumtime * 1000, 3),
+            }
+        )
+    return rows
+
+
+class RunProfiler:
+    """Context manager profiling one run; ``report()`` describes the stored artefact.
+
+    With ``required=False`` a run that finds the profiler busy is simply not
+    profiled (``report()`` stays ``None``) instead of raising.
+    """
+
+    def __init__(self, top_n: Optional[int] = None, config: type[Config] = Config, required: bool = True):
+        self.config = config
+        self.required = required
+        self.active = False
+        self.top_n = max(1, top_n or config.PIPELINE_PROFILE_TOP_N)
+        self.profile_id = f"run-{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.path = profile_path(self.profile_id, config)
+        self._profiler = cProfile.Profile()
+        self._report: Optional[Dict[str, object]] = None
+        self._started = 0.0
+
+    def __enter__(self) -> "RunProfiler":
+        if not _ACTIVE.acquire(blocking=False):
+            if self.required:
+                raise ProfilerBusyError("another pipeline run is being profiled")
+            return self
+        self.active = True
+        self._started = time.perf_counter()
+        self._profiler.enable()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if not self.active:
+            return
+        self.active = False
+        self._profiler.disable()
+        elapsed = time.perf_counter() - self._started
+        _ACTIVE.release()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._profiler.dump_stats(str(self.path))
+        prune_profiles(self.config)
+        stats = pstats.Stats(self._profiler)
+        self._report = {
+            "id": self.profile_id,
+            "path": str(self.path),
+            "elapsed_ms": round(elapsed * 1000, 3),
+            "total_calls": stats.total_calls,
+            "sort": "cumulative",
+            "top": top_functions(stats, self.top_n),
+        }
+
+    def report(self) -> Optional[Dict[str, object]]:
+        return self._report
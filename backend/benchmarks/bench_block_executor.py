@@ -0,0 +1,117 @@
+"""
+基准脚本：semantic 之后 splitter/extractor/classifier/aggregator 的多 worker 扩展性
+  - serial：单线程逐封处理（PIPELINE_CPU_EXECUTOR=serial）
+  - thread / process：按消息分片到 1..N 个 worker，各 worker 返回部分汇总后再合并
+输出各 worker 数下的耗时、吞吐（消息/秒）与相对 serial 的加速比，并校验块切分结果与 serial 一致。
+普通 CPython 上 thread 受 GIL 限制，free-threaded 构建（python3.13t 等）才会随核数扩展。
+用法：
+    cd backend && uv run python benchmarks/bench_block_executor.py --messages 2000
+    cd backend && uv run python benchmarks/bench_block_executor.py --kinds process --max-workers 8
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+# 确保 backend 根目录在 sys.path 中，便于直接运行脚本
+BACKEND_ROOT = Path(__file__).resolve().parents[1]
+if str(BACKEND_ROOT) not in sys.path:
+    sys.path.insert(0, str(BACKEND_ROOT))
+
+from app.services.block_executor import BlockExecutor, BlockStages, shutdown_block_pools
+from app.services.pipeline_settings import PipelineSettings
+from app.services.preprocess import BodyLines
+from app.utils.config import Config
+from app.utils.logging import logger
+
+STEPS = ("splitter", "extractor", "classifier", "aggregator")
+
+_HEADER = ["株式会社サンプル 営業部の山田です。", "いつもお世話になっております。", "下記案件のご紹介です。"]
+_BLOCK = [
+    "■案件名: {name}",
+    "必須スキル: Java, Spring Boot, PostgreSQL, {skill}",
+    "歓迎スキル: AWS, Docker, Kubernetes",
+    "勤務地: 東京都港区（リモート併用）",
+    "単価: {price}万円",
+    "外国籍: {foreigner}",
+    "面談: 1回",
+]
+_SKILLS = ["Python", "Go", "React", "TypeScript", "C#", "Ruby"]
+
+
+def _generate(messages: int, seed: int = 0) -> List[BodyLines]:
+    rng = random.Random(seed)
+    bodies = []
+    for idx in range(messages):
+        lines = list(_HEADER) + [f"配信番号 {idx}"] * 3
+        for block in range(rng.randint(1, 4)):
+            lines.extend(
+                line.format(
+                    name=f"案件{idx}-{block}",
+                    skill=rng.choice(_SKILLS),
+                    price=rng.randint(50, 90),
+                    foreigner=rng.choice(["可", "不可"]),
+                )
+                for line in _BLOCK
+            )
+        lines.extend(["以上、よろしくお願いいたします。"] * 6)
+        bodies.append(BodyLines(lines))
+    return bodies
+
+
+def _time(kind: str, workers: int, bodies: List[BodyLines], repeat: int):
+    settings = PipelineSettings.from_config(
+        Config,
+        PIPELINE_STEPS=STEPS,
+        PIPELINE_CPU_EXECUTOR=kind,
+        PIPELINE_CPU_WORKERS=workers,
+        PIPELINE_CPU_MIN_MESSAGES=2,
+    )
+    stages = BlockStages(settings, STEPS)
+    executor = BlockExecutor(settings)
+    executor.run(stages, bodies[: workers * 4])  # 预热：启动 worker 池
+    best = float("inf")
+    batch = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        batch = executor.run(stages, bodies)
+        best = min(best, time.perf_counter() - start)
+    return best, batch
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scaling of the post-semantic block stages from 1 to N workers")
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--kinds", default="thread,process", help="逗号分隔：thread,process")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    logger.disabled = True
+
+    bodies = _generate(args.messages)
+    print(f"[corpus] {len(bodies)} messages, {sum(len(b) for b in bodies)} lines, cpus={os.cpu_count()}")
+
+    serial_time, reference = _time("serial", 1, bodies, args.repeat)
+    expected = [blocks for blocks, _ in reference.outputs]
+    print(f"[serial] {serial_time * 1000:.1f} ms ({len(bodies) / serial_time:.0f} msg/s)")
+
+    workers_list = sorted({1, *[2**i for i in range(1, 8) if 2**i <= args.max_workers], args.max_workers})
+    try:
+        for kind in [k.strip() for k in args.kinds.split(",") if k.strip()]:
+            for workers in workers_list:
+                elapsed, batch = _time(kind, workers, bodies, args.repeat)
+                same = [blocks for blocks, _ in batch.outputs] == expected
+                print(
+                    f"[{kind} x{workers}] {elapsed * 1000:.1f} ms ({len(bodies) / elapsed:.0f} msg/s, "
+                    f"x{serial_time / elapsed:.2f}), blocks={batch.summary['block_count']}, match={same}"
+                )
+    finally:
+        shutdown_block_pools()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+基准脚本：对比 cleaner 的三种实现
+  - legacy：原始五遍正则 + 逐行正则归一化（此处内联保留作为参照）
+  - regex：当前多遍实现（跳过不可能命中的遍、整体归一化空白）
+  - stream：单遍流式扫描 iter_html_lines（CLEANER_STREAMING=true），逐行产出
+输出吞吐（MiB/s）与 tracemalloc 峰值内存，并校验与 legacy 输出一致。
+用法：
+    cd backend && uv run python benchmarks/bench_cleaner.py --messages 200 --kb 256
+    cd backend && uv run python benchmarks/bench_cleaner.py --input ../data   # 使用现有 .eml/.html 文件
+"""
+
+import argparse
+import html
+import random
+import re
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, List
+
+# 确保 backend 根目录在 sys.path 中，便于直接运行脚本
+BACKEND_ROOT = Path(__file__).resolve().parents[1]
+if str(BACKEND_ROOT) not in sys.path:
+    sys.path.insert(0, str(BACKEND_ROOT))
+
+from app.services.cleaner import _normalize_whitespace, _replace_tags, iter_html_lines
+from app.services.email_parser import parse_email_file
+
+_LEGACY_PASSES = [
+    (re.compile(r"(?is)<(script|style).*?>.*?</\1>"), " "),
+    (re.compile(r"(?is)<br\s*/?>"), "\n"),
+    (re.compile(r"(?is)</(p|div|section|article|li|tr|td|th|h[1-6])>"), "\n"),
+    (re.compile(r"<[^>]+>"), " "),
+]
+_LEGACY_SPACE_RE = re.compile(r"[ \t\f\v]+")
+
+
+def legacy_strip_html(text: str) -> str:
+    for pattern, replacement in _LEGACY_PASSES:
+        text = pattern.sub(replacement, text)
+    text = html.unescape(text).replace("\r\n", "\n").replace("\r", "\n")
+    lines = []
+    for line in text.split("\n"):
+        cleaned = _LEGACY_SPACE_RE.sub(" ", line).strip()
+        if cleaned:
+            lines.append(cleaned)
+    return "\n".join(lines)
+
+
+def regex_strip_html(text: str) -> str:
+    return _normalize_whitespace(_replace_tags(text))
+
+
+def stream_strip_html(text: str) -> str:
+    return "\n".join(iter_html_lines(text))
+
+
+_BLOCKS = [
+    "<tr><td class=\"cell\">案件名: 決済基盤 {n}</td><td>単価: 70万&nbsp;円</td></tr>",
+    "<p style=\"margin:0\">必須スキル: Java, Spring&amp;Boot <b>{n}</b></p>",
+    "<div><a href=\"https://example.com/track?id={n}\">詳細はこちら</a><br/></div>",
+    "<style>.c{n} {{ color: red; }}</style><span>  勤務地:\t東京  </span>",
+    "<script>var x{n} = '<p>not text</p>';</script><li>面談 1 回</li>",
+]
+
+
+def _generate(messages: int, kb: int, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    bodies = []
+    for idx in range(messages):
+        parts = ["<html><body><table>"]
+        size = 0
+        while size < kb * 1024:
+            block = rng.choice(_BLOCKS).format(n=idx)
+            parts.append(block)
+            size += len(block)
+        parts.append("</table></body></html>")
+        bodies.append("".join(parts))
+    return bodies
+
+
+def _load(input_dir: Path) -> List[str]:
+    bodies = []
+    for path in sorted(input_dir.rglob("*")):
+        suffix = path.suffix.lower()
+        if suffix in {".html", ".htm"}:
+            bodies.append(path.read_text(errors="replace"))
+        elif suffix in {".eml", ".msg", ".pst"}:
+            bodies.extend(item.body for item in parse_email_file(path) if item.body)
+    return bodies
+
+
+def _measure(fn: Callable[[str], str], bodies: List[str], repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for body in bodies:
+            fn(body)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    for body in bodies:
+        fn(body)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark multi-pass regex cleaner vs single-pass scanner")
+    parser.add_argument("--input", help="可选：已有 .html/.eml 目录；不指定则生成合成 HTML")
+    parser.add_argument("--messages", type=int, default=100)
+    parser.add_argument("--kb", type=int, default=128, help="每封合成 HTML 的大小（KiB）")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    bodies = _load(Path(args.input)) if args.input else _generate(args.messages, args.kb)
+    total_mb = sum(len(b) for b in bodies) / (1024 * 1024)
+
+    print(f"[corpus] {len(bodies)} bodies, {total_mb:.1f} MiB")
+    baseline = None
+    for name, fn in (("legacy", legacy_strip_html), ("regex", regex_strip_html), ("stream", stream_strip_html)):
+        mismatches = 0 if fn is legacy_strip_html else sum(1 for b in bodies if fn(b) != legacy_strip_html(b))
+        elapsed, peak = _measure(fn, bodies, args.repeat)
+        baseline = baseline or elapsed
+        print(
+            f"[{name}] {elapsed * 1000:.1f} ms ({total_mb / elapsed:.1f} MiB/s, x{baseline / elapsed:.2f}), "
+            f"peak {peak / 1024:.0f} KiB, mismatches={mismatches}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+基准脚本：对比 EML 完整解析（BytesParser 构建完整 MIME 树）与 mmap 快速路径（只扫描头部/边界，只解码正文部分）。
+默认生成带多个大附件的邮件，并校验两条路径输出一致。
+用法：
+    cd backend && uv run python benchmarks/bench_eml_parse.py --messages 50 --attachments 4 --attachment-kb 1024
+    cd backend && uv run python benchmarks/bench_eml_parse.py --input ../data   # 使用现有 .eml 文件
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from email.message import EmailMessage
+from pathlib import Path
+from typing import List
+
+# 确保 backend 根目录在 sys.path 中，便于直接运行脚本
+BACKEND_ROOT = Path(__file__).resolve().parents[1]
+if str(BACKEND_ROOT) not in sys.path:
+    sys.path.insert(0, str(BACKEND_ROOT))
+
+from app.services.email_parser import _parse_eml_full, _parse_eml_mmap
+
+
+def _generate(target_dir: Path, messages: int, attachments: int, attachment_kb: int) -> List[Path]:
+    paths: List[Path] = []
+    for idx in range(messages):
+        msg = EmailMessage()
+        msg["Subject"] = f"【案件】Java開発 {idx}"
+        msg["From"] = "sales@example.com"
+        msg["To"] = "engineer@example.com"
+        msg.set_content(f"案件名: 決済基盤 {idx}\n必須スキル: Java, Spring\n単価: 70万")
+        msg.add_alternative(f"<p>案件名: 決済基盤 {idx}</p><p>必須スキル: Java</p>", subtype="html")
+        for n in range(attachments):
+            msg.add_attachment(
+                os.urandom(attachment_kb * 1024),
+                maintype="application",
+                subtype="pdf",
+                filename=f"skillsheet_{n}.pdf",
+            )
+        path = target_dir / f"bench_{idx:05d}.eml"
+        path.write_bytes(msg.as_bytes())
+        paths.append(path)
+    return paths
+
+
+def _time(fn, paths: List[Path], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for path in paths:
+            fn(path)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark EML full parser vs mmap fast path")
+    parser.add_argument("--input", help="可选：已有 .eml 目录；不指定则生成合成邮件")
+    parser.add_argument("--messages", type=int, default=30)
+    parser.add_argument("--attachments", type=int, default=3)
+    parser.add_argument("--attachment-kb", type=int, default=1024)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        if args.input:
+            paths = sorted(p for p in Path(args.input).rglob("*") if p.suffix.lower() == ".eml")
+        else:
+            paths = _generate(Path(tmpdir), args.messages, args.attachments, args.attachment_kb)
+        total_mb = sum(p.stat().st_size for p in paths) / (1024 * 1024)
+
+        mismatches = [p.name for p in paths if _parse_eml_full(p) != _parse_eml_mmap(p)]
+        full = _time(_parse_eml_full, paths, args.repeat)
+        fast = _time(_parse_eml_mmap, paths, args.repeat)
+
+    print(f"[corpus] {len(paths)} files, {total_mb:.1f} MiB")
+    print(f"[full] {full * 1000:.1f} ms ({len(paths) / full:.1f} msg/s)")
+    print(f"[fast] {fast * 1000:.1f} ms ({len(paths) / fast:.1f} msg/s)")
+    print(f"[speedup] x{full / fast:.1f}")
+    print(f"[parity] mismatches={len(mismatches)} {mismatches[:5]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+基准脚本：HTML 正文只在 cleaner 中处理一次所节省的 CPU。
+解析器现在返回带类型的正文（body_type=plain/html），HTML 不再在 email_parser 中预先去标签。
+本脚本对同一批纯 HTML 邮件测量 解析 + clean_body 的 CPU 时间，并与「解析后再按旧规则去一次标签」对比。
+用法：
+    cd backend && uv run python benchmarks/bench_html_bodies.py --messages 300 --kb 64
+    cd backend && uv run python benchmarks/bench_html_bodies.py --input ../data
+"""
+
+import argparse
+import html
+import random
+import re
+import sys
+import tempfile
+import time
+from email.message import EmailMessage
+from pathlib import Path
+from typing import List
+
+# 确保 backend 根目录在 sys.path 中，便于直接运行脚本
+BACKEND_ROOT = Path(__file__).resolve().parents[1]
+if str(BACKEND_ROOT) not in sys.path:
+    sys.path.insert(0, str(BACKEND_ROOT))
+
+from app.services.cleaner import clean_body
+from app.services.email_parser import parse_email_file
+from app.utils.logging import logger
+
+# 旧版 email_parser._strip_html：解析阶段额外的一次 HTML 处理
+_OLD_SCRIPT_STYLE_RE = re.compile(r"(?is)<(script|style).*?>.*?</\1>")
+_OLD_TAG_RE = re.compile(r"<[^>]+>")
+
+_ROWS = [
+    "<tr><td style=\"padding:8px;font-family:Arial\">案件名: 決済基盤 {n}</td><td>単価: 70万&nbsp;円</td></tr>",
+    "<tr><td><p>必須スキル: Java, Spring&amp;Boot</p><p>勤務地: 東京</p></td></tr>",
+    "<tr><td><a href=\"https://click.example.com/?id={n}\">詳細はこちら</a><br/>配信停止</td></tr>",
+]
+
+
+def _old_parser_strip(text: str) -> str:
+    return html.unescape(_OLD_TAG_RE.sub("", _OLD_SCRIPT_STYLE_RE.sub("", text)))
+
+
+def _generate(target_dir: Path, messages: int, kb: int) -> List[Path]:
+    rng = random.Random(0)
+    paths: List[Path] = []
+    for idx in range(messages):
+        rows, size = [], 0
+        while size < kb * 1024:
+            row = rng.choice(_ROWS).format(n=idx)
+            rows.append(row)
+            size += len(row.encode())
+        msg = EmailMessage()
+        msg["Subject"] = f"【ニュースレター】{idx}"
+        msg["From"] = "news@example.com"
+        msg.set_content("<html><body><table>" + "".join(rows) + "</table></body></html>", subtype="html")
+        path = target_dir / f"html_{idx:05d}.eml"
+        path.write_bytes(msg.as_bytes())
+        paths.append(path)
+    return paths
+
+
+def _run(paths: List[Path], double_strip: bool) -> float:
+    start = time.process_time()
+    for path in paths:
+        for item in parse_email_file(path):
+            if double_strip and item.body_type == "html":
+                item.body = _old_parser_strip(item.body)
+            clean_body(item)
+    return time.process_time() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CPU saved by stripping HTML bodies once (cleaner only)")
+    parser.add_argument("--input", help="可选：已有邮件目录；不指定则生成纯 HTML 合成邮件")
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--kb", type=int, default=64, help="每封合成 HTML 的大小（KiB）")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    logger.disabled = True  # clean_body 每封都会记录日志
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        if args.input:
+            paths = sorted(p for p in Path(args.input).rglob("*") if p.suffix.lower() in {".eml", ".msg", ".pst"})
+        else:
+            paths = _generate(Path(tmpdir), args.messages, args.kb)
+        html_bodies = sum(1 for p in paths for item in parse_email_file(p) if item.body_type == "html")
+
+        before = min(_run(paths, double_strip=True) for _ in range(args.repeat))
+        after = min(_run(paths, double_strip=False) for _ in range(args.repeat))
+
+    print(f"[corpus] {len(paths)} files, {html_bodies} HTML bodies")
+    print(f"[parser strip + cleaner] {before * 1000:.1f} ms CPU")
+    print(f"[cleaner only]           {after * 1000:.1f} ms CPU")
+    print(f"[saved] {(before - after) * 1000:.1f} ms ({(1 - after / before) * 100:.1f}%)")
+
+
+if __name__ == "__main__":
+    main()
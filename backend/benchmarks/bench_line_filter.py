@@ -0,0 +1,131 @@
+"""
+基准脚本：对比 LineFilter 的逐规则实现与编译后的判定程序
+  - reference：逐类别、逐个正则/关键词依次判断（_keep_line_reference）
+  - compiled：按标志合并的正则 alternation + 关键词前缀树正则 + 廉价字符前置判断（_keep_line）
+  - cached：按 50 行一封邮件调用 keep_indices，重复行命中进程级判定缓存（LINE_FILTER_CACHE_SIZE）
+  - batch：关闭缓存，整批邮件交给 filter_batch，去重后每个不同的行只判定一次
+输出每秒处理行数，并校验两者的保留/删除判定完全一致。
+用法：
+    cd backend && uv run python benchmarks/bench_line_filter.py --lines 200000
+    cd backend && uv run python benchmarks/bench_line_filter.py --input ../data   # 使用现有邮件
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List
+
+# 确保 backend 根目录在 sys.path 中，便于直接运行脚本
+BACKEND_ROOT = Path(__file__).resolve().parents[1]
+if str(BACKEND_ROOT) not in sys.path:
+    sys.path.insert(0, str(BACKEND_ROOT))
+
+from app.services.cleaner import clean_lines
+from app.services.email_parser import parse_email_file
+from app.services.preprocess import LineFilter
+from app.services.preprocess.verdict_cache import line_verdict_cache_stats
+from app.utils.config import Config
+from app.utils.logging import logger
+
+_TEMPLATES = [
+    "お世話になっております。{n}",
+    "株式会社サンプル 営業部 {n}",
+    "TEL: 03-1234-{n:04d}",
+    "mail: sales{n}@example.co.jp",
+    "https://example.com/jobs/{n}",
+    "━━━━━━━━━━━━━━━━",
+    "＝＝＝＝＝＝",
+    "案件名: 決済基盤リプレイス {n}",
+    "必須スキル: Java, Spring Boot, AWS",
+    "単価: {n}万円 / 精算 140-180h",
+    "勤務地: 東京都港区（リモート併用）",
+    "面談回数: 1回",
+    "以上、よろしくお願いいたします。",
+    "配信停止をご希望の方はこちらまでご連絡ください",
+    "本メールは送信専用です",
+    "開発チームは 10 名体制で、週 2 回の定例があります {n}",
+    "ご不明点があればお気軽にどうぞ",
+    "・",
+    "",
+]
+
+
+def _generate(count: int, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    return [rng.choice(_TEMPLATES).format(n=rng.randint(0, 9999)) for _ in range(count)]
+
+
+def _load(input_dir: Path) -> List[str]:
+    lines: List[str] = []
+    for path in sorted(input_dir.rglob("*")):
+        if path.suffix.lower() in {".eml", ".msg", ".pst"}:
+            for item in parse_email_file(path):
+                lines.extend(clean_lines(item))
+    return lines
+
+
+def _measure(fn: Callable[[str], bool], lines: List[str], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for line in lines:
+            fn(line)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark rule-by-rule vs compiled line filter")
+    parser.add_argument("--input", help="可选：已有邮件目录；不指定则生成合成的招聘邮件行")
+    parser.add_argument("--lines", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    logger.disabled = True  # clean_lines 每封都会记录日志
+
+    lines = _load(Path(args.input)) if args.input else _generate(args.lines)
+    line_filter = LineFilter()
+
+    reference = [line_filter._keep_line_reference(line) for line in lines]
+    compiled = [line_filter._keep_line(line) for line in lines]
+    mismatches = sum(1 for a, b in zip(reference, compiled) if a != b)
+
+    print(f"[corpus] {len(lines)} lines, kept {sum(reference)} ({sum(reference) / max(len(lines), 1) * 100:.1f}%)")
+    baseline = None
+    for name, fn in (("reference", line_filter._keep_line_reference), ("compiled", line_filter._keep_line)):
+        elapsed = _measure(fn, lines, args.repeat)
+        baseline = baseline or elapsed
+        print(f"[{name}] {elapsed * 1000:.1f} ms ({len(lines) / elapsed:,.0f} lines/s, x{baseline / elapsed:.2f})")
+
+    messages = [lines[i : i + 50] for i in range(0, len(lines), 50)]
+    best = float("inf")
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        for message in messages:
+            line_filter.keep_indices(message)
+        best = min(best, time.perf_counter() - start)
+    cached = [False] * len(lines)
+    for offset, message in zip(range(0, len(lines), 50), messages):
+        for idx in line_filter.keep_indices(message):
+            cached[offset + idx] = True
+    mismatches += sum(1 for a, b in zip(reference, cached) if a != b)
+    stats = line_verdict_cache_stats()["stats"] or {}
+    print(
+        f"[cached] {best * 1000:.1f} ms ({len(lines) / best:,.0f} lines/s, x{baseline / best:.2f}), "
+        f"hit_rate={stats.get('hit_rate', 0)}"
+    )
+
+    uncached = LineFilter(type("NoCacheConfig", (Config,), {"LINE_FILTER_CACHE_SIZE": 0}))
+    best = float("inf")
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        batched = uncached.filter_batch(messages)
+        best = min(best, time.perf_counter() - start)
+    mismatches += sum(1 for message, kept in zip(messages, batched) if kept != uncached.keep_indices(message))
+    print(f"[batch] {best * 1000:.1f} ms ({len(lines) / best:,.0f} lines/s, x{baseline / best:.2f})")
+    print(f"[parity] mismatches={mismatches}")
+
+
+if __name__ == "__main__":
+    main()
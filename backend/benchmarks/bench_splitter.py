@@ -0,0 +1,96 @@
+"""
+基准脚本：对比 splitter 的标记行判断方式
+  - per-pattern：对每行依次 any(pattern.match) 遍历标记模式列表（旧实现）
+  - combined：内置标记 + index rule（section_heading_split）合并为一个正则，每行一次 match
+在多案件邮件上输出每秒处理行数 / 邮件数，并校验两种方式切分结果一致。
+用法：
+    cd backend && uv run python benchmarks/bench_splitter.py --messages 2000 --blocks 8
+"""
+
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+# 确保 backend 根目录在 sys.path 中，便于直接运行脚本
+BACKEND_ROOT = Path(__file__).resolve().parents[1]
+if str(BACKEND_ROOT) not in sys.path:
+    sys.path.insert(0, str(BACKEND_ROOT))
+
+from app.services.preprocess import BodyLines
+from app.services.splitter import Splitter, load_index_rule_markers
+from app.utils.config import Config
+from app.utils.logging import logger
+
+_HEADINGS = ["【案件{n}】決済基盤リプレイス", "■案件 {n}", "◆案件：{n}", "案件名", "＜案件＞"]
+_DETAILS = [
+    "必須スキル: Java, Spring Boot",
+    "単価: {n}万円",
+    "勤務地: 東京都港区",
+    "期間: 即日〜長期",
+    "面談: 1回（オンライン）",
+    "備考: 外国籍可",
+]
+
+
+def _generate(messages: int, blocks: int, seed: int = 0) -> List[BodyLines]:
+    rng = random.Random(seed)
+    bodies = []
+    for _ in range(messages):
+        lines = [f"ご挨拶 {i}" for i in range(6)]
+        for _ in range(blocks):
+            lines.append(rng.choice(_HEADINGS).format(n=rng.randint(1, 99)))
+            lines.extend(rng.choice(_DETAILS).format(n=rng.randint(50, 90)) for _ in range(rng.randint(3, 8)))
+        lines.extend(f"署名 {i}" for i in range(6))
+        bodies.append(BodyLines(lines))
+    return bodies
+
+
+class PerPatternSplitter(Splitter):
+    """旧的逐模式判断，仅替换标记判断部分作为参照。"""
+
+    def __init__(self, patterns):
+        super().__init__()
+        self.marker_patterns = tuple(re.compile(p) for p in patterns)
+        self._match_marker = lambda line: any(p.match(line) for p in self.marker_patterns)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-pattern vs combined splitter markers")
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--blocks", type=int, default=8, help="每封邮件的案件块数")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    logger.disabled = True
+
+    patterns = [*Config.SPLITTER_MARKER_PATTERNS, *load_index_rule_markers(Config)]
+    combined = Splitter(marker_patterns=patterns)
+    reference = PerPatternSplitter(patterns)
+
+    bodies = _generate(args.messages, args.blocks)
+    total_lines = sum(len(body) for body in bodies)
+    mismatches = sum(1 for body in bodies if combined.split(body) != reference.split(body))
+    blocks = sum(len(combined.split(body)) for body in bodies)
+    print(f"[corpus] {len(bodies)} mails, {total_lines} lines, {blocks} blocks, {len(patterns)} marker patterns")
+
+    baseline = None
+    for name, splitter in (("per-pattern", reference), ("combined", combined)):
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            for body in bodies:
+                splitter.split(body)
+            best = min(best, time.perf_counter() - start)
+        baseline = baseline or best
+        print(
+            f"[{name}] {best * 1000:.1f} ms ({total_lines / best:,.0f} lines/s, "
+            f"{len(bodies) / best:,.0f} mails/s, x{baseline / best:.2f})"
+        )
+    print(f"[parity] mismatches={mismatches}")
+
+
+if __name__ == "__main__":
+    main()
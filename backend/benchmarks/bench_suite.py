@@ -0,0 +1,325 @@
+"""
+基准套件：在合成邮箱（benchmarks/synthetic_mailbox.py）上逐阶段测量吞吐、延迟与峰值 RSS，结果输出为 JSON，并可与已保存的 baseline 对比。
+阶段：parse（parse_email_bytes）→ clean_body → line_filter（LineFilter）→ semantic（SemanticExtractor + 确定性的哈希 embedding 假模型）
+      → splitter（Splitter）→ extractor（KeywordExtractor）→ classifier（Classifier）
+  - 每个阶段默认在独立的 spawn 子进程中运行：先不计时地跑完上游阶段准备输入，再重置峰值 RSS（Linux /proc/self/clear_refs）后计时，
+    因此 peak_rss_mib 只反映该阶段（其他平台退回 ru_maxrss，包含准备阶段）。
+  - 延迟按单次调用统计：semantic 以 SEMANTIC_BATCH_SIZE 封为一次 extract_batch，其余阶段按封。
+  - 吞吐：messages/s 与输入 MiB/s（parse 为 EML 字节，其余为正文 UTF-8 字节）。
+用法：
+    cd backend && uv run python benchmarks/bench_suite.py --sizes 100,1000 --output /tmp/bench.json
+    cd backend && uv run python benchmarks/bench_suite.py --sizes 1000 --baseline benchmarks/baselines/synthetic-1000.json
+    cd backend && uv run python benchmarks/bench_suite.py --sizes 1000 --save-baseline benchmarks/baselines/synthetic-1000.json
+    cd backend && uv run python benchmarks/bench_suite.py --input /tmp/corpus.mbox --stages parse,clean_body
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# 确保 backend 根目录在 sys.path 中，便于直接运行脚本
+BACKEND_ROOT = Path(__file__).resolve().parents[1]
+if str(BACKEND_ROOT) not in sys.path:
+    sys.path.insert(0, str(BACKEND_ROOT))
+BENCH_ROOT = Path(__file__).resolve().parent
+if str(BENCH_ROOT) not in sys.path:
+    sys.path.insert(0, str(BENCH_ROOT))
+
+from synthetic_mailbox import iter_eml_bytes, load_eml_bytes
+
+from app.services.classifier import Classifier
+from app.services.cleaner import clean_body
+from app.services.email_parser import parse_email_bytes
+from app.services.extractor import KeywordExtractor
+from app.services.preprocess import BodyLines, LineFilter
+from app.services.semantic import SemanticExtractor
+from app.services.splitter import Splitter
+from app.utils.config import Config
+from app.utils.logging import logger
+
+STAGES = ["parse", "clean_body", "line_filter", "semantic", "splitter", "extractor", "classifier"]
+# Lower is better for these metrics; throughput metrics are higher-is-better.
+_LOWER_IS_BETTER = {"p50_ms", "p95_ms", "peak_rss_mib"}
+_COMPARED = ["messages_per_s", "p50_ms", "p95_ms", "peak_rss_mib"]
+
+
+class HashingEmbedding:
+    """Deterministic stand-in for the sentence-transformers model: hashed character bigrams, L2-normalized."""
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+
+    def encode(self, sentences: Sequence[str], *args, **kwargs) -> np.ndarray:
+        vectors = np.zeros((len(sentences), self.dim), dtype=np.float32)
+        for row, sentence in enumerate(sentences):
+            buckets = [zlib.crc32(sentence[i : i + 2].encode("utf-8")) % self.dim for i in range(max(1, len(sentence) - 1))]
+            vectors[row] = np.bincount(buckets, minlength=self.dim)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1.0, norms)
+
+
+# --- memory -----------------------------------------------------------------
+def _reset_peak_rss() -> bool:
+    """Reset the kernel's peak-RSS counter (VmHWM); False where unsupported."""
+    try:
+        with open("/proc/self/clear_refs", "w") as fp:
+            fp.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_mib(reset_ok: bool) -> float:
+    if reset_ok:
+        with open("/proc/self/status") as fp:
+            for line in fp:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _rss_mib() -> float:
+    try:
+        with open("/proc/self/statm") as fp:
+            return int(fp.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except OSError:
+        return 0.0
+
+
+# --- stage inputs -----------------------------------------------------------
+def _corpus(size: int, seed: int, html_ratio: float, source: Optional[str]) -> List[bytes]:
+    if source:
+        return load_eml_bytes(Path(source))[:size] if size else load_eml_bytes(Path(source))
+    return list(iter_eml_bytes(size, seed, html_ratio))
+
+
+def _stage_runner(stage: str, corpus: List[bytes]) -> Tuple[Callable, List, int, float]:
+    """(call, inputs, messages per call, input MiB) for ``stage``; upstream stages run untimed here."""
+    if stage == "parse":
+        return parse_email_bytes, corpus, 1, sum(map(len, corpus)) / 2**20
+
+    messages = [parse_email_bytes(data) for data in corpus]
+    if stage == "clean_body":
+        return clean_body, messages, 1, sum(len(m.body.encode("utf-8")) for m in messages) / 2**20
+
+    bodies = [BodyLines.from_text(clean_body(m)) for m in messages]
+    line_filter = LineFilter(Config)
+    if stage == "line_filter":
+        return line_filter.filter_body, bodies, 1, _body_mib(bodies)
+
+    filtered = [line_filter.filter_body(body) for body in bodies]
+    if stage == "semantic":
+        extractor = SemanticExtractor(model=HashingEmbedding(), config=Config)
+        batch = max(1, Config.SEMANTIC_BATCH_SIZE)
+        batches = [filtered[i : i + batch] for i in range(0, len(filtered), batch)]
+        return extractor.extract_batch, batches, batch, _body_mib(filtered)
+
+    splitter = Splitter(Config)
+    if stage == "splitter":
+        return splitter.split, filtered, 1, _body_mib(filtered)
+
+    block_texts = [[block.text for block in splitter.split(body)] for body in filtered]
+    texts_mib = sum(len(t.encode("utf-8")) for texts in block_texts for t in texts) / 2**20
+    if stage == "extractor":
+        return KeywordExtractor(Config).summarize, block_texts, 1, texts_mib
+    if stage == "classifier":
+        return Classifier(Config.CLASSIFIER_FOREIGNER_PATH, Config).summarize, block_texts, 1, texts_mib
+    raise ValueError(f"unknown stage: {stage}")
+
+
+def _body_mib(bodies: Sequence[BodyLines]) -> float:
+    return sum(len(body.text.encode("utf-8")) for body in bodies) / 2**20
+
+
+def _percentile(ordered: List[float], pct: float) -> float:
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def measure_stage(stage: str, size: int, seed: int, html_ratio: float, repeat: int, source: Optional[str] = None):
+    """Measure one stage; runs in a fresh process when the suite isolates stages."""
+    logger.disabled = True
+    corpus = _corpus(size, seed, html_ratio, source)
+    call, inputs, per_call, input_mib = _stage_runner(stage, corpus)
+    messages = len(corpus)
+
+    rss_before = _rss_mib()
+    reset_ok = _reset_peak_rss()
+    best = float("inf")
+    latencies: List[float] = []
+    for _ in range(max(1, repeat)):
+        timings = []
+        start = time.perf_counter()
+        for item in inputs:
+            t0 = time.perf_counter()
+            call(item)
+            timings.append(time.perf_counter() - t0)
+        elapsed = time.perf_counter() - start
+        if elapsed < best:
+            best, latencies = elapsed, timings
+    ordered = sorted(latencies)
+    return {
+        "messages": messages,
+        "calls": len(inputs),
+        "messages_per_call": per_call,
+        "seconds": round(best, 6),
+        "messages_per_s": round(messages / best, 2) if best else 0.0,
+        "mib_per_s": round(input_mib / best, 3) if best else 0.0,
+        "input_mib": round(input_mib, 3),
+        "p50_ms": round(_percentile(ordered, 50) * 1000, 4),
+        "p95_ms": round(_percentile(ordered, 95) * 1000, 4),
+        "p99_ms": round(_percentile(ordered, 99) * 1000, 4),
+        "max_ms": round((ordered[-1] if ordered else 0.0) * 1000, 4),
+        "rss_before_mib": round(rss_before, 2),
+        "peak_rss_mib": round(_peak_rss_mib(reset_ok), 2),
+        "peak_rss_stage_only": reset_ok,
+    }
+
+
+# --- suite / baseline -------------------------------------------------------
+def _git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_ROOT, capture_output=True, text=True, timeout=5
+        ).stdout.strip()
+    except Exception:
+        return ""
+
+
+def run_suite(sizes: List[int], stages: List[str], seed: int, html_ratio: float, repeat: int, isolate: bool, source):
+    runs: Dict[str, Dict] = {}
+    for size in sizes:
+        results: Dict[str, Dict] = {}
+        for stage in stages:
+            args = (stage, size, seed, html_ratio, repeat, source)
+            if isolate:
+                with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+                    results[stage] = pool.submit(measure_stage, *args).result()
+            else:
+                results[stage] = measure_stage(*args)
+            row = results[stage]
+            print(
+                f"[{size}] {stage:<12} {row['messages_per_s']:>10.1f} msg/s {row['mib_per_s']:>8.2f} MiB/s "
+                f"p50 {row['p50_ms']:.3f} ms p95 {row['p95_ms']:.3f} ms peak {row['peak_rss_mib']:.1f} MiB",
+                file=sys.stderr,
+            )
+        runs[str(size)] = {"stages": results}
+    return {
+        "meta": {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "seed": seed,
+            "html_ratio": html_ratio,
+            "repeat": repeat,
+            "isolated": isolate,
+            "source": source or "synthetic",
+        },
+        "runs": runs,
+    }
+
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> List[Dict]:
+    """Per (size, stage, metric) change against the baseline; status is regression / improvement / ok."""
+    rows = []
+    for size, run in current["runs"].items():
+        base_run = baseline.get("runs", {}).get(size)
+        if not base_run:
+            continue
+        for stage, metrics in run["stages"].items():
+            base = base_run["stages"].get(stage)
+            if not base:
+                continue
+            for metric in _COMPARED:
+                old, new = base.get(metric), metrics.get(metric)
+                if not old or new is None:
+                    continue
+                change = (new - old) / old
+                worse = change > threshold if metric in _LOWER_IS_BETTER else change < -threshold
+                better = change < -threshold if metric in _LOWER_IS_BETTER else change > threshold
+                rows.append(
+                    {
+                        "size": int(size),
+                        "stage": stage,
+                        "metric": metric,
+                        "baseline": old,
+                        "current": new,
+                        "change": round(change, 4),
+                        "status": "regression" if worse else "improvement" if better else "ok",
+                    }
+                )
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-stage throughput / latency / peak RSS benchmark suite")
+    parser.add_argument("--sizes", default="1000", help="逗号分隔的邮件封数，例如 100,1000,10000,100000")
+    parser.add_argument("--stages", default=",".join(STAGES), help="逗号分隔的阶段子集")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--html-ratio", type=float, default=0.3)
+    parser.add_argument("--repeat", type=int, default=3, help="每阶段重复次数，取最快一次")
+    parser.add_argument("--input", help="可选：使用已有 EML 目录或 mbox 代替合成语料（--sizes 截取前 N 封，0 为全部）")
+    parser.add_argument("--no-isolate", action="store_true", help="所有阶段在当前进程中运行（峰值 RSS 不再按阶段区分）")
+    parser.add_argument("--output", help="结果 JSON 路径；默认输出到 stdout")
+    parser.add_argument("--baseline", help="对比的 baseline JSON")
+    parser.add_argument("--threshold", type=float, default=0.10, help="判定回归/提升的相对变化阈值")
+    parser.add_argument("--save-baseline", help="把本次结果另存为 baseline")
+    parser.add_argument("--fail-on-regression", action="store_true", help="存在回归时以退出码 1 结束")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    stages = [stage.strip() for stage in args.stages.split(",") if stage.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stages: {sorted(unknown)}")
+
+    report = run_suite(sizes, stages, args.seed, args.html_ratio, args.repeat, not args.no_isolate, args.input)
+    regressions = []
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        report["comparison"] = {
+            "baseline": args.baseline,
+            "baseline_meta": baseline.get("meta", {}),
+            "threshold": args.threshold,
+            "rows": compare(report, baseline, args.threshold),
+        }
+        for row in report["comparison"]["rows"]:
+            if row["status"] != "ok":
+                print(
+                    f"[{row['status']}] {row['size']} {row['stage']} {row['metric']}: "
+                    f"{row['baseline']} -> {row['current']} ({row['change'] * 100:+.1f}%)",
+                    file=sys.stderr,
+                )
+        regressions = [row for row in report["comparison"]["rows"] if row["status"] == "regression"]
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n")
+    else:
+        print(text)
+    if args.save_baseline:
+        Path(args.save_baseline).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.save_baseline).write_text(json.dumps({k: report[k] for k in ("meta", "runs")}, indent=2) + "\n")
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""
+合成邮箱生成器：生成可复现的招聘邮件语料（EML 目录或 mbox），供 benchmarks/bench_suite.py 等基准使用。
+每封邮件包含问候/开场白、1～4 个「案件」块（技能、单价、勤务地、外国籍等）、结尾寒暄、签名、配信停止页脚和装饰线；
+按 --html-ratio 比例生成 HTML 正文（表格/段落/样式/脚本），约 10% 为不含案件的通知类邮件。
+同一 --seed 下输出逐字节一致。
+用法：
+    cd backend && uv run python benchmarks/synthetic_mailbox.py --count 1000 --output /tmp/corpus          # EML 目录
+    cd backend && uv run python benchmarks/synthetic_mailbox.py --count 100000 --format mbox --output /tmp/corpus.mbox
+"""
+
+import argparse
+import html
+import mailbox
+import random
+import sys
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from email.message import EmailMessage
+from email.utils import format_datetime
+from pathlib import Path
+from typing import Iterator, List
+
+_COMPANIES = ["株式会社テックリンク", "ネクストソリューションズ株式会社", "株式会社ブリッジワークス", "合同会社クラウドエッジ"]
+_SENDERS = [("山田", "yamada"), ("佐藤", "sato"), ("鈴木", "suzuki"), ("高橋", "takahashi"), ("田中", "tanaka")]
+_GREETINGS = [
+    "いつも大変お世話になっております。",
+    "お世話になっております。",
+    "平素より格別のお引き立てを賜り、誠にありがとうございます。",
+]
+_INTROS = [
+    "下記案件にて人材を募集しております。",
+    "本日の新着案件をご案内いたします。",
+    "以下の案件につきまして、ご提案可能な要員様がいらっしゃいましたらご連絡ください。",
+]
+_CLOSINGS = ["何卒よろしくお願い申し上げます。", "ご検討のほど、よろしくお願いいたします。", "以上、よろしくお願いいたします。"]
+_DECORATIONS = ["━━━━━━━━━━━━━━━━━━━━", "＝＝＝＝＝＝＝＝＝＝＝＝＝＝＝", "■□■□■□■□■□■□■□"]
+_PROJECTS = ["決済システム刷新", "物流管理基盤構築", "ECサイトリプレイス", "保険業務システム保守", "社内ポータル開発", "データ分析基盤構築"]
+_SKILLS = [
+    "Java", "Spring Boot", "Python", "Django", "Go", "TypeScript", "React", "Vue.js",
+    "AWS", "Azure", "Docker", "Kubernetes", "PostgreSQL", "Oracle", "C#", ".NET", "PHP", "Laravel",
+]
+_LOCATIONS = ["東京都港区", "東京都千代田区", "大阪府大阪市", "神奈川県横浜市", "フルリモート"]
+_FOREIGNER = ["外国籍: 可", "外国籍: 不可", "外国籍: 日本語ネイティブレベルであれば可", "外国籍不可"]
+_NOTICES = ["年末年始休業のお知らせ", "システムメンテナンスのお知らせ", "弊社オフィス移転のお知らせ"]
+
+
+@dataclass
+class SyntheticMail:
+    subject: str
+    sender: str
+    body: str
+    is_html: bool
+    date: datetime
+
+
+def _job_block(rng: random.Random, index: int) -> List[str]:
+    skills = rng.sample(_SKILLS, rng.randint(2, 5))
+    wanted = rng.sample(_SKILLS, rng.randint(1, 3))
+    return [
+        rng.choice(["■案件名", "【案件】", "案件名"]) + (f": {rng.choice(_PROJECTS)}" if rng.random() < 0.5 else ""),
+        f"概要: {rng.choice(_PROJECTS)}（No.{index:05d}）",
+        f"必須スキル: {', '.join(skills)}",
+        f"歓迎スキル: {', '.join(wanted)}",
+        f"勤務地: {rng.choice(_LOCATIONS)}（リモート併用）",
+        f"単価: {rng.randint(50, 95)}万円（スキル見合い）",
+        f"期間: {rng.randint(1, 12)}月～長期",
+        rng.choice(_FOREIGNER),
+        f"面談: {rng.randint(1, 2)}回",
+    ]
+
+
+def _signature(rng: random.Random, company: str, sender: str, mailbox_name: str) -> List[str]:
+    return [
+        rng.choice(_DECORATIONS),
+        company,
+        f"営業部 {sender}",
+        f"TEL: 03-{rng.randint(1000, 9999)}-{rng.randint(1000, 9999)}",
+        f"E-mail: {mailbox_name}@example.co.jp",
+        "URL: https://www.example.co.jp/",
+        rng.choice(_DECORATIONS),
+    ]
+
+
+def _footer(rng: random.Random) -> List[str]:
+    return [
+        "※本メールは送信専用アドレスから配信しています。",
+        f"配信停止はこちら: https://mail.example.co.jp/unsubscribe?id={rng.randint(10**6, 10**7)}",
+    ]
+
+
+def _to_html(lines: List[str], rng: random.Random) -> str:
+    parts = ["<html><head><style>td{padding:4px;font-family:Meiryo}</style></head><body>"]
+    if rng.random() < 0.3:
+        parts.append("<script>var tracking = '<p>not text</p>';</script>")
+    parts.append("<table>")
+    for line in lines:
+        escaped = html.escape(line)
+        kind = rng.random()
+        if kind < 0.5:
+            parts.append(f'<tr><td class="cell">{escaped}</td></tr>')
+        elif kind < 0.8:
+            parts.append(f'<p style="margin:0">{escaped}</p>')
+        else:
+            parts.append(f"<span>{escaped}</span><br/>")
+    parts.append("</table></body></html>")
+    return "".join(parts)
+
+
+def generate_mails(count: int, seed: int = 0, html_ratio: float = 0.3) -> Iterator[SyntheticMail]:
+    """Yield ``count`` deterministic recruitment mails."""
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1, 9, 0, tzinfo=timezone(timedelta(hours=9)))
+    for index in range(count):
+        company = rng.choice(_COMPANIES)
+        sender, mailbox_name = rng.choice(_SENDERS)
+        lines = [f"{company}の{sender}です。", rng.choice(_GREETINGS)]
+        if rng.random() < 0.1:
+            subject = f"【お知らせ】{rng.choice(_NOTICES)}"
+            lines += ["下記の通りお知らせいたします。", f"対象期間: {rng.randint(1, 12)}月{rng.randint(1, 28)}日～"]
+        else:
+            blocks = rng.choices([1, 2, 3, 4], weights=[50, 25, 15, 10])[0]
+            subject = f"【案件{blocks}件】{rng.choice(_PROJECTS)}ほか"
+            lines += [rng.choice(_INTROS), rng.choice(_DECORATIONS), ""]
+            for block in range(blocks):
+                lines += _job_block(rng, index * 4 + block) + [rng.choice(_DECORATIONS)]
+        lines += [rng.choice(_CLOSINGS), ""] + _signature(rng, company, sender, mailbox_name) + _footer(rng)
+        is_html = rng.random() < html_ratio
+        body = _to_html(lines, rng) if is_html else "\n".join(lines)
+        date = start + timedelta(minutes=17 * index)
+        yield SyntheticMail(subject=subject, sender=f"{sender} <{mailbox_name}@example.co.jp>", body=body, is_html=is_html, date=date)
+
+
+def build_message(mail: SyntheticMail) -> EmailMessage:
+    msg = EmailMessage()
+    msg["Subject"] = mail.subject
+    msg["From"] = mail.sender
+    msg["To"] = "recruit@example.com"
+    msg["Date"] = format_datetime(mail.date)
+    msg.set_content(mail.body, subtype="html" if mail.is_html else "plain")
+    return msg
+
+
+def iter_eml_bytes(count: int, seed: int = 0, html_ratio: float = 0.3) -> Iterator[bytes]:
+    for mail in generate_mails(count, seed, html_ratio):
+        yield build_message(mail).as_bytes()
+
+
+def write_eml_dir(target: Path, count: int, seed: int = 0, html_ratio: float = 0.3) -> List[Path]:
+    target.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for index, data in enumerate(iter_eml_bytes(count, seed, html_ratio)):
+        path = target / f"synthetic_{index:06d}.eml"
+        path.write_bytes(data)
+        paths.append(path)
+    return paths
+
+
+def write_mbox(path: Path, count: int, seed: int = 0, html_ratio: float = 0.3) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    box = mailbox.mbox(str(path), create=True)
+    box.lock()
+    try:
+        for mail in generate_mails(count, seed, html_ratio):
+            box.add(build_message(mail))
+        box.flush()
+    finally:
+        box.unlock()
+        box.close()
+    return path
+
+
+def load_eml_bytes(source: Path) -> List[bytes]:
+    """Raw messages of an existing corpus: a directory of .eml files or an mbox file."""
+    if source.is_dir():
+        return [path.read_bytes() for path in sorted(source.rglob("*.eml"))]
+    return [message.as_bytes() for message in mailbox.mbox(str(source), create=False)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic recruitment mailbox")
+    parser.add_argument("--count", type=int, default=1000, help="邮件封数（100～100000）")
+    parser.add_argument("--format", choices=["eml", "mbox"], default="eml")
+    parser.add_argument("--output", required=True, help="EML 目录或 mbox 文件路径")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--html-ratio", type=float, default=0.3, help="HTML 正文所占比例")
+    args = parser.parse_args()
+
+    output = Path(args.output)
+    if args.format == "eml":
+        written = len(write_eml_dir(output, args.count, args.seed, args.html_ratio))
+    else:
+        write_mbox(output, args.count, args.seed, args.html_ratio)
+        written = args.count
+    print(f"[mailbox] wrote {written} messages to {output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+from app.services.aggregator import Aggregator
+from app.services.classifier import Classifier
+from app.services.extractor import KeywordExtractor
+from app.services.splitter import SplitBlock
+from app.utils.config import Config
+
+
+def _blocks(*texts):
+    return [SplitBlock(text=text, start_line=0, end_line=0) for text in texts]
+
+
+def test_merge_aggregations_matches_aggregating_all_blocks():
+    aggregator = Aggregator(
+        keyword_extractor=KeywordExtractor(),
+        classifier=Classifier(Config.CLASSIFIER_FOREIGNER_PATH),
+    )
+    first = _blocks("Python と Java", "外国籍可")
+    second = _blocks("Python", "外国籍不可 React")
+
+    merged = Aggregator.merge_aggregations(
+        [aggregator.aggregate_blocks(first), aggregator.aggregate_blocks(second)]
+    )
+    combined = aggregator.aggregate_blocks(first + second)
+
+    assert merged["block_count"] == combined["block_count"] == 4
+    assert merged["class_summary"] == combined["class_summary"]
+    for category, items in combined["keyword_summary"].items():
+        assert sorted(items, key=lambda i: i["keyword"]) == sorted(
+            merged["keyword_summary"][category], key=lambda i: i["keyword"]
+        )
@@ -0,0 +1,120 @@
+import pickle
+
+import pytest
+
+from app.services import block_executor
+from app.services.aggregator import Aggregator
+from app.services.block_executor import BlockExecutor, BlockStages, partition
+from app.services.pipeline_config import PipelineConfigData
+from app.services.pipeline_settings import PipelineSettings, settings_for
+from app.services.preprocess import BodyLines
+from app.utils.config import Config
+
+STEPS = ("splitter", "extractor", "classifier", "aggregator")
+
+
+def _counts(summary):
+    # Tie order among keywords follows set iteration, which differs between processes.
+    return {cat: sorted((i["keyword"], i["count"]) for i in items) for cat, items in summary["keyword_summary"].items()}
+
+
+def _bodies(count):
+    header = [f"ご担当者様 {i}" for i in range(6)]
+    block = ["案件名", "必須スキル: Java, Python", "外国籍: 可", "勤務地: 東京"]
+    return [BodyLines(header + block * (1 + n % 3) + ["以上"] * 6) for n in range(count)]
+
+
+@pytest.fixture(autouse=True)
+def _close_pools():
+    yield
+    block_executor.shutdown_block_pools()
+
+
+def test_partition_is_contiguous_and_balanced():
+    slices = partition([1, 1, 1, 1, 10, 1, 1, 1], 3)
+
+    assert [i for s in slices for i in s] == list(range(8))
+    assert len(slices) == 3
+    assert partition([5], 4) == [range(0, 1)]
+    assert partition([], 4) == []
+
+
+@pytest.mark.parametrize("kind", ["thread", "process"])
+def test_parallel_matches_serial_and_merges_summaries(kind):
+    settings = PipelineSettings.from_config(Config, PIPELINE_STEPS=STEPS)
+    parallel = PipelineSettings.from_config(
+        Config, PIPELINE_STEPS=STEPS, PIPELINE_CPU_EXECUTOR=kind, PIPELINE_CPU_WORKERS=2, PIPELINE_CPU_MIN_MESSAGES=2
+    )
+    stages = BlockStages(parallel, STEPS)
+    bodies = _bodies(12)
+
+    serial = BlockStages(settings, STEPS).run_slice(bodies)
+    batch = BlockExecutor(parallel).run(stages, bodies)
+
+    assert [blocks for blocks, _ in batch.outputs] == [blocks for blocks, _ in serial[0]]
+    assert _counts(batch.summary) == _counts(serial[1])
+    assert _counts(batch.summary) == _counts(Aggregator.merge_aggregations([agg for _, agg in batch.outputs]))
+    assert batch.summary["block_count"] == sum(1 + n % 3 for n in range(12))
+
+
+def test_small_batches_and_unknown_kinds_stay_serial(monkeypatch):
+    monkeypatch.setattr(Config, "PIPELINE_CPU_EXECUTOR", "gpu")
+    executor = BlockExecutor(Config)
+    assert executor.kind == "serial"
+
+    monkeypatch.setattr(Config, "PIPELINE_CPU_EXECUTOR", "thread")
+    monkeypatch.setattr(Config, "PIPELINE_CPU_MIN_MESSAGES", 100)
+    BlockExecutor(Config).run(BlockStages(Config, STEPS), _bodies(3))
+    assert block_executor._POOLS == {}
+
+
+def test_settings_survive_pickling():
+    settings = settings_for(PipelineConfigData.from_dict({"steps": ["splitter"], "line_filter": {"job_keywords": ["案件"]}}))
+    restored = pickle.loads(pickle.dumps(settings))
+
+    assert restored == settings
+    assert restored.LINE_FILTER_JOB_KEYWORDS == ("案件",)
+
+
+def test_worker_stage_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(block_executor, "_WORKER_STAGES", block_executor.OrderedDict())
+    size = block_executor._WORKER_STAGES_SIZE
+    for n in range(size + 3):
+        block_executor._run_slice_in_worker(Config, STEPS, (f"^marker{n}$",), _bodies(1))
+    block_executor._run_slice_in_worker(Config, STEPS, (f"^marker{size + 2}$",), _bodies(1))
+
+    keys = list(block_executor._WORKER_STAGES)
+    assert len(keys) == size
+    assert keys[0][2] == ("^marker3$",)
+    assert keys[-1][2] == (f"^marker{size + 2}$",)
+
+
+@pytest.mark.anyio("asyncio")
+@pytest.mark.parametrize("kind", ["serial", "process"])
+async def test_run_async_keeps_the_loop_free_and_reports_worker_metrics(kind):
+    import asyncio
+
+    from app.utils.metrics import collect_run
+
+    settings = PipelineSettings.from_config(
+        Config, PIPELINE_STEPS=STEPS, PIPELINE_CPU_EXECUTOR=kind, PIPELINE_CPU_WORKERS=2, PIPELINE_CPU_MIN_MESSAGES=2
+    )
+    stages = BlockStages(settings, STEPS)
+    bodies = _bodies(200)
+    ticks = []
+
+    async def _tick():
+        while True:
+            ticks.append(None)
+            await asyncio.sleep(0)
+
+    ticker = asyncio.create_task(_tick())
+    with collect_run() as run:
+        batch = await BlockExecutor(settings).run_async(stages, bodies)
+    ticker.cancel()
+
+    assert len(batch.outputs) == 200
+    assert len(ticks) > 1
+    timings = run.snapshot()["stages"]
+    assert timings["split"]["calls"] == 200
+    assert timings["aggregate"]["calls"] == 200
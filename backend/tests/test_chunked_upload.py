@@ -0,0 +1,170 @@
+import hashlib
+from pathlib import Path
+
+import pytest
+
+from app.services.chunked_upload import ChunkedUploadManager, UploadError, UploadNotFoundError
+
+PAYLOAD = b"0123456789" * 10
+
+
+async def _stream(data: bytes):
+    yield data[: len(data) // 2]
+    yield data[len(data) // 2 :]
+
+
+def _manager(tmp_path: Path) -> ChunkedUploadManager:
+    return ChunkedUploadManager(data_dir=tmp_path / "data", staging_dir=tmp_path / "staging")
+
+
+@pytest.mark.anyio("asyncio")
+async def test_out_of_order_chunks_complete_with_correct_hash(tmp_path: Path):
+    manager = _manager(tmp_path)
+    session = manager.init_upload("big.pst", len(PAYLOAD))
+
+    await manager.write_chunk(session.upload_id, 50, _stream(PAYLOAD[50:]))
+    status = await manager.write_chunk(session.upload_id, 0, _stream(PAYLOAD[:50]))
+    filename, sha256, deduplicated = manager.complete_upload(session.upload_id)
+
+    assert status.received == [[0, len(PAYLOAD)]]
+    assert filename == "big.pst"
+    assert sha256 == hashlib.sha256(PAYLOAD).hexdigest()
+    assert deduplicated is False
+    assert (tmp_path / "data" / "big.pst").read_bytes() == PAYLOAD
+
+
+@pytest.mark.anyio("asyncio")
+async def test_resume_reports_next_offset_and_rejects_incomplete(tmp_path: Path):
+    manager = _manager(tmp_path)
+    session = manager.init_upload("big.pst", len(PAYLOAD))
+    await manager.write_chunk(session.upload_id, 0, _stream(PAYLOAD[:30]))
+
+    # A fresh manager (e.g. after restart) still sees the persisted progress.
+    resumed = _manager(tmp_path).get_session(session.upload_id)
+    assert resumed.next_offset() == 30
+    with pytest.raises(UploadError):
+        manager.complete_upload(session.upload_id)
+
+    await manager.write_chunk(session.upload_id, 30, _stream(PAYLOAD[30:]))
+    _, sha256, _ = _manager(tmp_path).complete_upload(session.upload_id)
+    assert sha256 == hashlib.sha256(PAYLOAD).hexdigest()
+
+
+@pytest.mark.anyio("asyncio")
+async def test_identical_content_is_deduplicated(tmp_path: Path):
+    manager = _manager(tmp_path)
+    first = manager.init_upload("a.pst", len(PAYLOAD))
+    await manager.write_chunk(first.upload_id, 0, _stream(PAYLOAD))
+    manager.complete_upload(first.upload_id)
+
+    second = manager.init_upload("b.pst", len(PAYLOAD))
+    await manager.write_chunk(second.upload_id, 0, _stream(PAYLOAD))
+    filename, sha256, deduplicated = manager.complete_upload(second.upload_id)
+
+    assert deduplicated is True
+    assert filename == "a.pst"
+    assert not (tmp_path / "data" / "b.pst").exists()
+    assert manager.find_duplicate(sha256) == "a.pst"
+
+
+@pytest.mark.anyio("asyncio")
+async def test_chunk_beyond_declared_size_is_rejected(tmp_path: Path):
+    manager = _manager(tmp_path)
+    session = manager.init_upload("small.eml", 4)
+
+    with pytest.raises(UploadError):
+        await manager.write_chunk(session.upload_id, 0, _stream(b"too long"))
+    with pytest.raises(UploadNotFoundError):
+        manager.get_session("../../etc/passwd")
+
+
+@pytest.mark.anyio("asyncio")
+async def test_concurrent_chunks_at_same_offset_keep_hash_correct(tmp_path: Path):
+    import asyncio
+
+    manager = _manager(tmp_path)
+    session = manager.init_upload("retry.pst", len(PAYLOAD))
+    gate = asyncio.Event()
+
+    async def slow_stream(data: bytes):
+        yield data[:10]
+        await gate.wait()
+        yield data[10:]
+
+    # A client retry overlapping the original request for the same chunk.
+    first = asyncio.create_task(manager.write_chunk(session.upload_id, 0, slow_stream(PAYLOAD)))
+    second = asyncio.create_task(manager.write_chunk(session.upload_id, 0, slow_stream(PAYLOAD)))
+    await asyncio.sleep(0.01)
+    gate.set()
+    await asyncio.gather(first, second)
+
+    _, sha256, _ = manager.complete_upload(session.upload_id)
+    assert sha256 == hashlib.sha256(PAYLOAD).hexdigest()
+
+
+@pytest.mark.parametrize("filename", ["", ".", "..", "dir/.."])
+def test_init_rejects_filenames_without_a_name(tmp_path: Path, filename):
+    with pytest.raises(UploadError):
+        _manager(tmp_path).init_upload(filename, 10)
+
+
+@pytest.mark.anyio("asyncio")
+async def test_complete_moves_across_filesystems(tmp_path: Path, monkeypatch):
+    import errno
+    import os
+
+    from app.services import chunked_upload
+
+    replace = os.replace
+
+    def cross_device_replace(src, dst):
+        if str(src).endswith(".part"):
+            raise OSError(errno.EXDEV, "Invalid cross-device link")
+        replace(src, dst)
+
+    manager = _manager(tmp_path)
+    session = manager.init_upload("moved.pst", len(PAYLOAD))
+    await manager.write_chunk(session.upload_id, 0, _stream(PAYLOAD))
+    monkeypatch.setattr(chunked_upload.os, "replace", cross_device_replace)
+
+    filename, _, _ = manager.complete_upload(session.upload_id)
+
+    assert (tmp_path / "data" / filename).read_bytes() == PAYLOAD
+
+
+def test_init_enforces_the_size_limit_and_sweeps_stale_sessions(tmp_path: Path):
+    import os
+    import time
+
+    manager = _manager(tmp_path)
+    manager.max_size = 1000
+    with pytest.raises(UploadError):
+        manager.init_upload("huge.pst", 1001)
+
+    stale = manager.init_upload("stale.pst", 1000)
+    assert (tmp_path / "staging" / f"{stale.upload_id}.part").stat().st_size == 0
+    old = time.time() - manager.session_ttl - 60
+    for suffix in ("json", "part"):
+        os.utime(tmp_path / "staging" / f"{stale.upload_id}.{suffix}", (old, old))
+    fresh = manager.init_upload("fresh.pst", 10)
+
+    with pytest.raises(UploadNotFoundError):
+        manager.get_session(stale.upload_id)
+    assert not (tmp_path / "staging" / f"{stale.upload_id}.part").exists()
+    assert stale.upload_id not in manager._hashes
+    assert manager.get_session(fresh.upload_id).filename == "fresh.pst"
+
+
+@pytest.mark.anyio("asyncio")
+async def test_files_already_in_data_are_deduplicated(tmp_path: Path):
+    manager = _manager(tmp_path)
+    (tmp_path / "data").mkdir()
+    (tmp_path / "data" / "copied.pst").write_bytes(PAYLOAD)
+    (tmp_path / "data" / "other.pst").write_bytes(b"x" * len(PAYLOAD))
+
+    assert manager.find_duplicate(hashlib.sha256(PAYLOAD).hexdigest(), len(PAYLOAD)) == "copied.pst"
+
+    session = manager.init_upload("again.pst", len(PAYLOAD))
+    await manager.write_chunk(session.upload_id, 0, _stream(PAYLOAD))
+    filename, _, deduplicated = manager.complete_upload(session.upload_id)
+    assert (filename, deduplicated) == ("copied.pst", True)
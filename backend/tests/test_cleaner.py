@@ -1,4 +1,4 @@
-from app.services.cleaner import clean_body, strip_html
+from app.services.cleaner import clean_body, clean_lines, strip_html
 from app.services.email_parser import EmailContent
 
 
@@ -13,10 +13,58 @@ def test_clean_body_from_text():
 
 
 def test_clean_body_from_email_content():
-    content = EmailContent(source_path="x", body="<p>Line1</p><p>Line2</p>")
+    content = EmailContent(source_path="x", body="<p>Line1</p><p>Line2</p>", body_type="html")
     assert clean_body(content) == "Line1\nLine2"
 
 
+def test_clean_lines_keeps_angle_brackets_in_plain_bodies():
+    body = "単価: <60万円>\nA<B and C>D  &amp;"
+    plain = EmailContent(source_path="x", body=body)
+    assert clean_lines(plain) == ["単価: <60万円>", "A<B and C>D &amp;"]
+    assert clean_body(plain) == "単価: <60万円>\nA<B and C>D &amp;"
+    assert clean_lines(EmailContent(source_path="x", body=body, body_type="html")) == ["単価:", "A D &"]
+
+
 def test_clean_body_keeps_newlines_from_text():
     raw = "a line\n  another\tline\n\nlast"
     assert clean_body(raw) == "a line\nanother line\nlast"
+
+
+def _multi_pass_reference(text):
+    import html
+    import re
+
+    text = re.sub(r"(?is)<(script|style).*?>.*?</\1>", " ", text)
+    text = re.sub(r"(?is)<br\s*/?>", "\n", text)
+    text = re.sub(r"(?is)</(p|div|section|article|li|tr|td|th|h[1-6])>", "\n", text)
+    text = html.unescape(re.sub(r"<[^>]+>", " ", text)).replace("\r\n", "\n").replace("\r", "\n")
+    lines = [re.sub(r"[ \t\f\v]+", " ", line).strip() for line in text.split("\n")]
+    return "\n".join(line for line in lines if line)
+
+
+def test_streaming_cleaner_matches_multi_pass_output(monkeypatch):
+    import random
+
+    from app.services import cleaner
+
+    tokens = [
+        "<", ">", "<>", "<<", "<br>", "<BR />", "</p>", "</TD>", "<div class='x'>", "<script>", "</script>",
+        "<style>", "</STYLE>", "<scripts>", "&amp;", "&nbsp;", "&lt;", "&#10;", "&#13;", "&amp", "\r\n", "\n",
+        " ", "\t", "\xa0", "案件", "Java",
+    ]
+    rng = random.Random(7)
+    samples = ["".join(rng.choice(tokens) for _ in range(rng.randint(0, 30))) for _ in range(3000)]
+    samples.append("<a title='<b>'>x</a> <<重要>> a < b <br> c")
+
+    for streaming in (True, False):
+        monkeypatch.setattr(cleaner.Config, "CLEANER_STREAMING", streaming)
+        for sample in samples:
+            assert cleaner.strip_html(sample) == _multi_pass_reference(sample), sample
+
+
+def test_iter_html_lines_yields_incrementally():
+    from app.services.cleaner import iter_html_lines
+
+    lines = iter_html_lines("<p>first</p>" + "<td>x</td>" * 3 + "<p>last &amp; final")
+    assert next(lines) == "first"
+    assert list(lines) == ["x", "x", "x", "last & final"]
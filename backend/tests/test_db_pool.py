@@ -0,0 +1,156 @@
+from contextlib import asynccontextmanager
+
+import pytest
+
+from app.services import db_pool, pipeline_config
+from app.services.pipeline_config import PipelineConfigData, PipelineConfigRepository
+
+
+class FakeConnection:
+    def __init__(self, store):
+        self.store = store
+
+    async def execute(self, sql, *args):
+        self.store.statements.append(" ".join(sql.split()))
+        if sql.lstrip().startswith("INSERT"):
+            self.store.rows[args[0]] = args[1]
+        elif "pg_notify" in sql:
+            self.store.notifications.append(args)
+
+    @asynccontextmanager
+    async def transaction(self):
+        yield
+
+    async def fetchrow(self, sql, key):
+        self.store.statements.append(" ".join(sql.split()))
+        content = self.store.rows.get(key)
+        return {"content": content} if content is not None else None
+
+
+class FakePool:
+    def __init__(self):
+        self.statements = []
+        self.rows = {}
+        self.notifications = []
+        self.closed = False
+
+    async def acquire(self):
+        return FakeConnection(self)
+
+    async def release(self, conn):
+        return None
+
+    async def close(self):
+        self.closed = True
+
+    def get_size(self):
+        return 1
+
+    def get_idle_size(self):
+        return 1
+
+    def get_min_size(self):
+        return 1
+
+    def get_max_size(self):
+        return 10
+
+
+@pytest.fixture
+def fake_pools(monkeypatch):
+    created = []
+
+    async def fake_create_pool(dsn, config):
+        pool = FakePool()
+        created.append(pool)
+        return pool
+
+    monkeypatch.setattr(db_pool, "_create_pool", fake_create_pool)
+    monkeypatch.setattr(db_pool, "_POOLS", {})
+    monkeypatch.setattr(db_pool, "_STATS", db_pool.PoolStats())
+    monkeypatch.setattr(pipeline_config, "_SCHEMA_READY", set())
+    return created
+
+
+@pytest.mark.anyio("asyncio")
+async def test_repository_reuses_one_pool_and_creates_schema_once(fake_pools):
+    repository = PipelineConfigRepository()
+    payload = PipelineConfigData.from_dict({"steps": ["cleaner"]})
+
+    await repository.save(payload)
+    for _ in range(3):
+        loaded = await PipelineConfigRepository().load()
+
+    assert loaded.steps == ["cleaner"]
+    assert len(fake_pools) == 1
+    statements = fake_pools[0].statements
+    assert sum(s.startswith("CREATE TABLE") for s in statements) == 1
+    assert len(set(s for s in statements if s.startswith("SELECT content"))) == 1
+    assert fake_pools[0].notifications == [("pipeline_config_changed", payload.fingerprint())]
+
+    stats = db_pool.pool_stats()
+    assert stats["pool_creations"] == 1
+    assert stats["acquires"] == 5
+    assert stats["pools"][0]["max_size"] == 10
+
+    await db_pool.close_pools()
+    assert fake_pools[0].closed
+    assert db_pool.pool_stats()["pools"] == []
+
+
+@pytest.mark.anyio("asyncio")
+async def test_failed_pool_creation_is_retried(monkeypatch):
+    attempts = []
+
+    async def flaky_create_pool(dsn, config):
+        attempts.append(dsn)
+        if len(attempts) == 1:
+            raise OSError("connection refused")
+        return FakePool()
+
+    monkeypatch.setattr(db_pool, "_create_pool", flaky_create_pool)
+    monkeypatch.setattr(db_pool, "_POOLS", {})
+    monkeypatch.setattr(db_pool, "_STATS", db_pool.PoolStats())
+
+    with pytest.raises(OSError):
+        await db_pool.get_pool("postgresql://u@h/db")
+    assert isinstance(await db_pool.get_pool("postgresql://u@h/db"), FakePool)
+    assert len(attempts) == 2
+    assert db_pool.pool_stats()["pool_creations"] == 2
+
+
+def test_pool_stats_redact_passwords():
+    assert db_pool._redact("postgresql://app:secret@db:5432/erex") == "postgresql://app@db:5432/erex"
+    assert db_pool._redact("postgresql://app@db:5432/erex") == "postgresql://app@db:5432/erex"
+
+
+def test_sync_index_rule_load_uses_one_off_connections(fake_pools, monkeypatch):
+    from types import SimpleNamespace
+
+    from app.services.index_rules import IndexRuleService
+    from app.utils.config import Config
+
+    opened, closed = [], []
+
+    class RuleConnection:
+        async def fetchval(self, sql, *args):
+            return None
+
+        async def fetch(self, sql):
+            return [{"name": "heading", "pattern": "^■", "description": "", "enabled": True}]
+
+        async def close(self):
+            closed.append(self)
+
+    async def connect(dsn):
+        opened.append(dsn)
+        return RuleConnection()
+
+    monkeypatch.setattr(db_pool, "_asyncpg", lambda: SimpleNamespace(connect=connect))
+    config = type("DbRules", (Config,), {"INDEX_RULE_SOURCE": "db", "INDEX_RULES_INLINE": None})
+
+    rules = IndexRuleService(config).list_rules_sync()
+
+    assert [rule.name for rule in rules] == ["heading"]
+    assert len(opened) == len(closed) == 2  # version check + load
+    assert fake_pools == [] and db_pool._POOLS == {}
@@ -1,7 +1,8 @@
 from email.message import EmailMessage
 from pathlib import Path
 
-from app.services.email_parser import parse_directory, parse_email_file
+from app.services.cleaner import clean_body
+from app.services.email_parser import parse_directory, parse_email_bytes, parse_email_file
 
 
 def _write_eml(tmp_path: Path, name: str, *, html: bool = False) -> Path:
@@ -39,7 +40,9 @@ def test_parse_email_file_eml_html(tmp_path: Path):
 
     assert len(results) == 1
     item = results[0]
-    assert item.body.strip() == "Hello"
+    assert item.body_type == "html"
+    assert item.body.strip() == "<b>Hello</b>"
+    assert clean_body(item) == "Hello"
 
 
 def test_parse_directory_includes_eml(tmp_path: Path):
@@ -49,3 +52,295 @@ def test_parse_directory_includes_eml(tmp_path: Path):
     names = [Path(r.source_path).name for r in results]
 
     assert "sample.EML" in names
+
+
+def test_parse_email_bytes_eml(tmp_path: Path):
+    eml_path = _write_eml(tmp_path, "memory.eml")
+    item = parse_email_bytes(eml_path.read_bytes())
+
+    assert item.parser == "eml"
+    assert item.source_path == "<memory>"
+    assert item.subject == "Test Subject"
+    assert item.body.strip() == "Hello plain"
+
+
+def _eml_variants():
+    plain = EmailMessage()
+    plain["Subject"] = "=?utf-8?b?5qGI5Lu2?="
+    plain.set_content("案件: Python\n単価: 60万", charset="utf-8", cte="base64")
+
+    alternative = EmailMessage()
+    alternative["Subject"] = "alt"
+    alternative.set_content("plain part")
+    alternative.add_alternative("<p>html part</p>", subtype="html")
+
+    html_only = EmailMessage()
+    html_only["Subject"] = "html"
+    html_only.set_content("<div>only html</div>", subtype="html")
+    html_only.add_attachment(b"\x00" * 2048, maintype="application", subtype="pdf", filename="a.pdf")
+
+    mixed = EmailMessage()
+    mixed["Subject"] = "mixed"
+    mixed.set_content("本文です", cte="quoted-printable")
+    mixed.add_alternative("<b>本文</b>", subtype="html")
+    mixed.add_attachment(b"\x01" * 4096, maintype="application", subtype="octet-stream", filename="b.bin")
+
+    return {
+        "plain": plain.as_bytes(),
+        "alternative": alternative.as_bytes(),
+        "html_only": html_only.as_bytes(),
+        "mixed": mixed.as_bytes(),
+        "mixed_crlf": mixed.as_bytes(policy=mixed.policy.clone(linesep="\r\n")),
+    }
+
+
+def test_eml_fast_path_matches_full_parser(tmp_path: Path):
+    from app.services.email_parser import _parse_eml_full, _parse_eml_mmap
+
+    for name, data in _eml_variants().items():
+        target = tmp_path / f"{name}.eml"
+        target.write_bytes(data)
+
+        fast = _parse_eml_mmap(target)
+        full = _parse_eml_full(target)
+
+        assert fast == full, name
+        assert fast.body.strip(), name
+
+
+_FAKE_READPST = """#!{python}
+import sys, time
+from email.message import EmailMessage
+from pathlib import Path
+
+args = sys.argv[1:]
+out = Path(args[args.index("-o") + 1])
+if "fail" in args[-1]:
+    sys.stderr.write("cannot open pst")
+    sys.exit(1)
+for folder, count in (("Inbox", 3), ("Sent Items", 1)):
+    (out / folder).mkdir(parents=True, exist_ok=True)
+    for n in range(1, count + 1):
+        msg = EmailMessage()
+        msg["Subject"] = f"{{folder}} {{n}}"
+        msg.set_content(f"body {{folder}} {{n}}")
+        (out / folder / f"{{n}}.eml").write_bytes(msg.as_bytes())
+        time.sleep(0.02)
+"""
+
+
+def _install_fake_readpst(tmp_path: Path, monkeypatch):
+    import os
+    import sys
+
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    script = bin_dir / "readpst"
+    script.write_text(_FAKE_READPST.format(python=sys.executable))
+    script.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ.get('PATH', '')}")
+
+
+def test_readpst_streaming_parses_per_message_files_in_folder_order(tmp_path: Path, monkeypatch):
+    from app.services.email_parser import _parse_pst_via_readpst
+
+    _install_fake_readpst(tmp_path, monkeypatch)
+    pst = tmp_path / "archive.pst"
+    pst.write_bytes(b"pst")
+
+    results = _parse_pst_via_readpst(pst)
+
+    assert [r.subject for r in results] == ["Inbox 1", "Inbox 2", "Inbox 3", "Sent Items 1"]
+    assert all(r.parser == "readpst" and r.source_path == str(pst) for r in results)
+    assert results[1].body == "body Inbox 2"
+
+
+def test_readpst_parallel_jobs_collect_once_after_exit(tmp_path: Path, monkeypatch):
+    from app.services import email_parser
+
+    _install_fake_readpst(tmp_path, monkeypatch)
+    monkeypatch.setattr(email_parser.Config, "READPST_JOBS", 2)
+    scans = []
+    ready = email_parser._ready_readpst_files
+
+    def _recording(out_dir, finished, sequential):
+        scans.append(finished)
+        return ready(out_dir, finished, sequential)
+
+    monkeypatch.setattr(email_parser, "_ready_readpst_files", _recording)
+    pst = tmp_path / "archive.pst"
+    pst.write_bytes(b"pst")
+
+    results = email_parser._parse_pst_via_readpst(pst)
+
+    assert [r.subject for r in results] == ["Inbox 1", "Inbox 2", "Inbox 3", "Sent Items 1"]
+    assert scans == [True]
+
+
+def test_readpst_streaming_reports_failure(tmp_path: Path, monkeypatch):
+    from app.services.email_parser import _parse_pst_via_readpst
+
+    _install_fake_readpst(tmp_path, monkeypatch)
+    pst = tmp_path / "fail.pst"
+    pst.write_bytes(b"pst")
+
+    results = _parse_pst_via_readpst(pst)
+
+    assert len(results) == 1
+    assert "cannot open pst" in results[0].error
+
+
+_FAKE_PYPFF = '''
+import json
+
+
+class _Item:
+    def __init__(self, data):
+        self._data = data
+
+    def get_subject(self):
+        return self._data["subject"]
+
+    def get_plain_text_body(self):
+        return self._data["body"]
+
+
+class _Folder:
+    def __init__(self, data):
+        self._data = data
+
+    def get_name(self):
+        return self._data["name"]
+
+    def get_number_of_sub_messages(self):
+        return len(self._data["messages"])
+
+    def get_sub_message(self, i):
+        return _Item(self._data["messages"][i])
+
+    def get_number_of_sub_folders(self):
+        return len(self._data["folders"])
+
+    def get_sub_folder(self, i):
+        return _Folder(self._data["folders"][i])
+
+
+class file:
+    def open(self, path):
+        with open(path) as fp:
+            self._root = json.load(fp)
+
+    def get_root_folder(self):
+        return _Folder(self._root)
+
+    def close(self):
+        pass
+'''
+
+
+def _fake_pst_tree():
+    def folder(name, count, folders=()):
+        return {
+            "name": name,
+            "messages": [{"subject": f"{name} {i}", "body": f"body {name} {i}"} for i in range(count)],
+            "folders": list(folders),
+        }
+
+    return folder("Root", 1, [folder("Inbox", 7, [folder("Projects", 3)]), folder("Sent", 5)])
+
+
+def test_parallel_pst_extraction_matches_sequential_order(tmp_path: Path, monkeypatch):
+    import json
+    import sys
+
+    from app.services import email_parser
+
+    (tmp_path / "pypff.py").write_text(_FAKE_PYPFF)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.delitem(sys.modules, "pypff", raising=False)
+    pst = tmp_path / "archive.pst"
+    pst.write_text(json.dumps(_fake_pst_tree()))
+
+    sequential = email_parser._parse_pst(pst)
+
+    def no_fallback(*args, **kwargs):
+        raise AssertionError("parallel extraction fell back to the sequential walk")
+
+    monkeypatch.setattr(email_parser, "_collect_pst_folder", no_fallback)
+    monkeypatch.setattr(email_parser.Config, "PST_PARALLEL_WORKERS", 2)
+    monkeypatch.setattr(email_parser.Config, "PST_PARALLEL_CHUNK", 2)
+    progress = []
+    parallel = email_parser.parse_email_file(pst, progress=lambda done, total: progress.append((done, total)))
+
+    assert len(sequential) == 16
+    assert [(m.source_path, m.subject, m.body) for m in parallel] == [
+        (m.source_path, m.subject, m.body) for m in sequential
+    ]
+    assert progress[-1] == (16, 16)
+    assert [done for done, _ in progress] == sorted(done for done, _ in progress)
+
+
+def test_parallel_pst_extraction_reports_undecodable_messages(tmp_path: Path, monkeypatch):
+    import json
+    import sys
+
+    from app.services import email_parser
+
+    (tmp_path / "pypff.py").write_text(_FAKE_PYPFF)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.delitem(sys.modules, "pypff", raising=False)
+    tree = _fake_pst_tree()
+    del tree["folders"][1]["messages"][3]["subject"]  # Sent[3] cannot be decoded
+    pst = tmp_path / "corrupt.pst"
+    pst.write_text(json.dumps(tree))
+    warnings = []
+
+    class _Logger:
+        def warning(self, message, *args):
+            warnings.append(message % args)
+
+        def info(self, *args):
+            pass
+
+    monkeypatch.setattr(email_parser, "logger", _Logger())
+    monkeypatch.setattr(email_parser, "_WORKER_PST_HANDLES", {})
+    messages, failures = email_parser._extract_pst_range(str(pst), (1,), "Sent", 2, 5)
+    assert [m.subject for m in messages] == ["Sent 2", "Sent 4"]
+    assert failures == 1
+    assert "Sent[3]" in warnings[0]
+
+    monkeypatch.setattr(email_parser.Config, "PST_PARALLEL_WORKERS", 2)
+    monkeypatch.setattr(email_parser.Config, "PST_PARALLEL_CHUNK", 2)
+    parallel = email_parser.parse_email_file(pst)
+
+    assert len(parallel) == 15
+    assert "1 of 16 messages could not be decoded" in warnings[-1]
+
+
+def test_body_budgets_skip_oversized_parts_and_truncate(tmp_path: Path, monkeypatch):
+    from app.services import email_parser
+
+    msg = EmailMessage()
+    msg["Subject"] = "Newsletter"
+    msg.set_content("x" * 5000)
+    msg.add_alternative("<p>" + "short html " * 20 + "</p>", subtype="html")
+    target = tmp_path / "big.eml"
+    target.write_bytes(msg.as_bytes())
+
+    monkeypatch.setattr(email_parser.Config, "BODY_MAX_PART_BYTES", 1000)
+    monkeypatch.setattr(email_parser.Config, "BODY_MAX_CHARS", 50)
+    email_parser._BODY_LIMITS.reset()
+
+    for fast in (True, False):
+        monkeypatch.setattr(email_parser.Config, "EML_FAST_PARSE", fast)
+        (item,) = parse_email_file(target)
+        assert item.skipped_parts == 1
+        assert item.body_truncated
+        assert item.body_type == "html"
+        assert item.body.startswith("<p>short html")
+        assert len(item.body) <= 50
+
+    stats = email_parser.body_limit_stats()
+    assert stats["messages"] == 2
+    assert stats["truncated_messages"] == 2
+    assert stats["skipped_parts"] == 2
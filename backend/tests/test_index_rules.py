@@ -73,3 +73,72 @@ async def test_index_rule_service_uses_file_source(tmp_path: Path):
 def test_database_store_validates_table_name():
     with pytest.raises(ValueError):
         DatabaseIndexRuleStore(dsn="postgresql://user@localhost/db", table_name="invalid-name")
+
+
+class _CountingStore:
+    def __init__(self):
+        self.loads = 0
+        self.token = 1
+
+    async def load_rules(self):
+        self.loads += 1
+        return [IndexRule(name=f"rule-{self.token}", pattern="p")]
+
+    async def version(self):
+        return self.token
+
+
+class _TtlConfig:
+    INDEX_RULE_CACHE_TTL = 60
+
+
+@pytest.mark.anyio("asyncio")
+async def test_index_rule_service_serves_rules_from_memory_within_ttl():
+    store = _CountingStore()
+    service = IndexRuleService(config=_TtlConfig, store=store)
+
+    for _ in range(5):
+        rules = await service.list_rules()
+
+    assert [rule.name for rule in rules] == ["rule-1"]
+    assert store.loads == 1
+    assert service.cache_stats()["hits"] == 4
+
+
+@pytest.mark.anyio("asyncio")
+async def test_index_rule_service_reloads_only_when_version_changes():
+    class NoTtl(_TtlConfig):
+        INDEX_RULE_CACHE_TTL = 0
+
+    store = _CountingStore()
+    service = IndexRuleService(config=NoTtl, store=store)
+
+    await service.list_rules()
+    await service.list_rules()
+    assert store.loads == 1
+
+    store.token = 2
+    rules = await service.list_rules()
+    assert store.loads == 2
+    assert [rule.name for rule in rules] == ["rule-2"]
+
+
+@pytest.mark.anyio("asyncio")
+async def test_index_rule_service_detects_file_changes_and_inline_switch(tmp_path: Path):
+    rule_file = tmp_path / "index_rules.json"
+    rule_file.write_text(json.dumps({"rules": [{"name": "a", "pattern": "x"}]}))
+
+    class FileConfig:
+        INDEX_RULE_SOURCE = "file"
+        INDEX_RULES_PATH = str(rule_file)
+        INDEX_RULE_TABLE = "index_rules"
+        INDEX_RULE_CACHE_TTL = 0
+
+    service = IndexRuleService(config=FileConfig)
+    assert [r.name for r in await service.list_rules()] == ["a"]
+
+    rule_file.write_text(json.dumps({"rules": [{"name": "bb", "pattern": "y"}]}))
+    assert [r.name for r in await service.list_rules()] == ["bb"]
+
+    FileConfig.INDEX_RULES_INLINE = {"rules": [{"name": "inline", "pattern": "z"}]}
+    assert [r.name for r in await service.list_rules()] == ["inline"]
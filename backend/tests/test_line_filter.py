@@ -52,3 +52,135 @@ def test_force_delete_overrides_job_keywords():
     lines = ["案件紹介 株式会社example@example.com", "案件情報: A"]
 
     assert line_filter.filter_lines(lines) == ["案件情報: A"]
+
+
+def test_filter_body_keeps_original_line_indices():
+    from app.services.preprocess import BodyLines
+
+    line_filter = LineFilter()
+    body = BodyLines(["お世話になっております", "案件名: テスト案件です", "-----", "必須スキル: Python"])
+
+    filtered = line_filter.filter_body(body)
+
+    assert filtered.lines == ["案件名: テスト案件です", "必須スキル: Python"]
+    assert filtered.indices == [1, 3]
+    assert filtered.filtered is True
+
+
+def test_compiled_program_matches_rule_by_rule_reference():
+    import random
+
+    from app.utils.config import Config
+
+    line_filter = LineFilter()
+    alphabet = list("abcKSſ@.-_ 　\t=＝―*#0123456789:/") + [
+        *Config.LINE_FILTER_JOB_KEYWORDS,
+        *Config.LINE_FILTER_SIGNATURE_KEYWORDS,
+        *Config.LINE_FILTER_SIGNATURE_COMPANY_PREFIX,
+        "お世話になっております",
+        "配信停止",
+        "https://",
+        "03-1234-5678",
+    ]
+    rng = random.Random(0)
+    for _ in range(5000):
+        line = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 6)))
+        assert line_filter._keep_line(line) == line_filter._keep_line_reference(line), line
+
+
+def test_merge_helpers_fall_back_on_unsafe_patterns_and_minimize_keywords():
+    from app.services.preprocess.line_filter import literal_trie_pattern, merge_patterns
+
+    assert len(merge_patterns([r"(a)\1", "b"])) == 2
+    assert len(merge_patterns([r"(?P<x>a)", r"(?P<x>b)"])) == 2
+    assert len(merge_patterns(["a", "b"])) == 1
+    pattern = literal_trie_pattern(["募集", "募集中", "案件"])
+    assert pattern is not None and "中" not in pattern
+
+
+def _cached_config(**overrides):
+    from app.utils.config import Config
+
+    return type("CachedConfig", (Config,), {"LINE_FILTER_CACHE_SIZE": 3, **overrides})
+
+
+def test_verdict_cache_serves_repeated_lines_without_reevaluating(monkeypatch):
+    from app.services.preprocess import verdict_cache
+
+    monkeypatch.setattr(verdict_cache, "_CACHE", None)
+    line_filter = LineFilter(config=_cached_config())
+    calls = []
+    decide = line_filter._keep_line
+    monkeypatch.setattr(line_filter, "_keep_line", lambda line: calls.append(line) or decide(line))
+    lines = ["お世話になっております", "案件名: A", "お世話になっております"]
+
+    assert line_filter.keep_indices(lines) == [1]
+    assert line_filter.keep_indices(lines) == [1]
+
+    assert calls == ["お世話になっております", "案件名: A"]
+    stats = verdict_cache.line_verdict_cache_stats()["stats"]
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (4, 2, 2)
+
+    line_filter.keep_indices(["a1", "b2", "c3"])
+    assert verdict_cache.line_verdict_cache_stats()["stats"]["evictions"] == 2
+
+
+def test_verdict_cache_keeps_a_partition_per_rule_set(monkeypatch):
+    from app.services.preprocess import verdict_cache
+
+    monkeypatch.setattr(verdict_cache, "_CACHE", None)
+    line = "お世話になっております"
+    strict = LineFilter(config=_cached_config())
+    relaxed = LineFilter(config=_cached_config(LINE_FILTER_GREETING_PATTERNS=[]))
+
+    assert strict.keep_indices([line]) == []
+    assert relaxed.keep_indices([line]) == [0]
+    assert strict.keep_indices([line]) == []
+
+    stats = verdict_cache.line_verdict_cache_stats()["stats"]
+    assert (stats["partitions"], stats["hits"], stats["misses"], stats["invalidations"]) == (2, 1, 2, 0)
+
+
+def test_verdict_cache_does_not_leak_between_concurrent_rule_sets(monkeypatch):
+    from app.services.preprocess import verdict_cache
+
+    monkeypatch.setattr(verdict_cache, "_CACHE", None)
+    lines = ["お世話になっております"]
+    strict = LineFilter(config=_cached_config())
+    relaxed = LineFilter(config=_cached_config(LINE_FILTER_GREETING_PATTERNS=[]))
+    decide = strict._keep_line
+    interleaved = []
+
+    def decide_while_other_config_runs(line):
+        # Another run with different rules fills the cache while this one is mid-lookup.
+        if not interleaved:
+            interleaved.append(relaxed.keep_indices(lines))
+        return decide(line)
+
+    monkeypatch.setattr(strict, "_keep_line", decide_while_other_config_runs)
+
+    assert strict.keep_indices(lines) == []
+    assert interleaved == [[0]]
+    assert relaxed.keep_indices(lines) == [0]
+    assert strict.keep_indices(lines) == []
+
+
+def test_filter_batch_evaluates_each_distinct_line_once(monkeypatch):
+    from app.services.preprocess import BodyLines
+
+    line_filter = LineFilter(config=_cached_config(LINE_FILTER_CACHE_SIZE=0))
+    calls = []
+    decide = line_filter._keep_line
+    monkeypatch.setattr(line_filter, "_keep_line", lambda line: calls.append(line) or decide(line))
+    bodies = [
+        BodyLines(["お世話になっております", "案件名: A", "-----"]),
+        BodyLines(["お世話になっております", "必須スキル: Python"]),
+        BodyLines([]),
+    ]
+
+    kept = line_filter.filter_batch(bodies)
+
+    assert kept == [[1], [1], []]
+    assert sorted(calls) == sorted(set(calls)) and len(calls) == 4
+    assert kept == [line_filter.keep_indices(body.lines) for body in bodies]
+    assert [b.lines for b in line_filter.filter_bodies(bodies)] == [["案件名: A"], ["必須スキル: Python"], []]
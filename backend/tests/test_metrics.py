@@ -0,0 +1,72 @@
+import threading
+
+from app.services.email_parser import EmailContent
+from app.services.pipeline import Pipeline
+from app.services.pipeline_settings import PipelineSettings
+from app.utils import metrics
+from app.utils.config import Config
+from app.utils.metrics import MetricsRegistry, collect_run, count, timed
+
+STEPS = ("cleaner", "line_filter", "splitter", "extractor", "classifier", "aggregator")
+
+
+def test_run_registry_collects_only_inside_block(monkeypatch):
+    monkeypatch.setattr(metrics, "PROCESS_METRICS", MetricsRegistry())
+    with collect_run() as run:
+        with timed("clean"):
+            pass
+        count("blocks", 3)
+    with timed("clean"):
+        pass
+
+    assert run.snapshot()["stages"]["clean"]["calls"] == 1
+    assert run.snapshot()["counters"] == {"blocks": 3}
+    assert metrics.PROCESS_METRICS.snapshot()["stages"]["clean"]["calls"] == 2
+
+
+def test_disabled_metrics_record_nothing(monkeypatch):
+    monkeypatch.setattr(metrics, "PROCESS_METRICS", MetricsRegistry())
+    monkeypatch.setattr(Config, "METRICS_ENABLED", False)
+    with collect_run() as run:
+        with timed("clean"):
+            pass
+        count("blocks")
+
+    assert run is None
+    assert timed("clean") is timed("split")
+    assert metrics.PROCESS_METRICS.snapshot() == {"stages": {}, "counters": {}}
+
+
+def test_pipeline_stages_report_into_the_run(monkeypatch):
+    monkeypatch.setattr(metrics, "PROCESS_METRICS", MetricsRegistry())
+    pipeline = Pipeline(PipelineSettings.from_config(Config, PIPELINE_STEPS=STEPS))
+    messages = [EmailContent(source_path="a.eml", body=f"案件 {n}\n必須スキル: Java") for n in range(3)]
+
+    with collect_run() as run:
+        # A hand-started thread does not inherit the run unless given the context.
+        thread = threading.Thread(target=lambda: timed("outside").__enter__().__exit__())
+        thread.start()
+        thread.join()
+        pipeline.process_messages(messages)
+
+    stages = run.snapshot()["stages"]
+    assert {"clean", "line_filter", "split", "extract", "classify", "aggregate"} <= set(stages)
+    assert stages["clean"]["calls"] == 3
+    assert "outside" not in stages
+    assert run.snapshot()["counters"]["blocks"] == 3
+
+
+def test_prometheus_text_format():
+    registry = MetricsRegistry()
+    registry.observe("parse", 0.25)
+    registry.observe("parse", 0.5)
+    registry.incr("messages_parsed", 7)
+
+    text = registry.prometheus()
+
+    assert "# TYPE pipeline_stage_seconds_total counter" in text
+    assert 'pipeline_stage_calls_total{stage="parse"} 2' in text
+    assert 'pipeline_stage_seconds_total{stage="parse"} 0.750000' in text
+    assert 'pipeline_stage_seconds_max{stage="parse"} 0.500000' in text
+    assert 'pipeline_events_total{name="messages_parsed"} 7' in text
+    assert text.endswith("\n")
@@ -0,0 +1,139 @@
+import json
+import os
+
+import pytest
+
+from app.services import pipeline_config
+from app.services.pipeline_config import PipelineConfigData, PipelineConfigService
+from app.utils.config import Config
+
+
+class FakeRepository:
+    def __init__(self, data=None, fail=False):
+        self.data = data
+        self.fail = fail
+        self.loads = 0
+
+    async def load(self):
+        self.loads += 1
+        if self.fail:
+            raise OSError("database unavailable")
+        return self.data
+
+    async def save(self, payload):
+        self.data = payload
+        return payload
+
+
+@pytest.fixture
+def config_class(monkeypatch, tmp_path):
+    monkeypatch.setattr(pipeline_config, "_SNAPSHOTS", {})
+    paths = {}
+    for name in ("line_filter", "semantic_templates", "keywords_tech", "index_rules", "classifier_foreigner"):
+        path = tmp_path / f"{name}.json"
+        path.write_text("{}")
+        paths[name] = str(path)
+    return type(
+        "SnapshotConfig",
+        (Config,),
+        {
+            "CONFIG_SNAPSHOT_MAX_AGE": 0,
+            "LINE_FILTER_CONFIG_PATH": paths["line_filter"],
+            "SEMANTIC_TEMPLATES_PATH": paths["semantic_templates"],
+            "KEYWORDS_TECH_PATH": paths["keywords_tech"],
+            "INDEX_RULES_PATH": paths["index_rules"],
+            "CLASSIFIER_FOREIGNER_PATH": paths["classifier_foreigner"],
+        },
+    )
+
+
+@pytest.mark.anyio("asyncio")
+async def test_load_config_is_served_from_snapshot_until_invalidated(config_class):
+    repository = FakeRepository(PipelineConfigData.from_dict({"steps": ["cleaner"]}))
+    service = PipelineConfigService(config=config_class, repository=repository)
+
+    first, source = await service.load_config()
+    again, _ = await PipelineConfigService(config=config_class, repository=repository).load_config()
+
+    assert source == "db" and again is first
+    assert repository.loads == 1
+    cache = pipeline_config.get_snapshot_cache(config_class)
+    assert cache.current.settings.PIPELINE_STEPS == ("cleaner",)
+
+    cache.invalidate(first.fingerprint())  # our own NOTIFY echo
+    await service.load_config()
+    assert repository.loads == 1
+
+    repository.data = PipelineConfigData.from_dict({"steps": ["cleaner", "splitter"]})
+    cache.invalidate("other-process")
+    updated, _ = await service.load_config()
+    assert repository.loads == 2
+    assert updated.steps == ["cleaner", "splitter"]
+    assert cache.version == 2
+
+
+@pytest.mark.anyio("asyncio")
+async def test_notify_during_load_is_not_lost(config_class):
+    import asyncio
+
+    old = PipelineConfigData.from_dict({"steps": ["cleaner"]})
+    new = PipelineConfigData.from_dict({"steps": ["cleaner", "splitter"]})
+    cache = pipeline_config.get_snapshot_cache(config_class)
+    cache.listening = True  # max age does not apply while a listener is connected
+    loading, release = asyncio.Event(), asyncio.Event()
+
+    class SlowRepository(FakeRepository):
+        async def load(self):
+            data = self.data
+            loading.set()
+            await release.wait()
+            self.loads += 1
+            return data
+
+    repository = SlowRepository(old)
+    service = PipelineConfigService(config=config_class, repository=repository)
+    first_load = asyncio.create_task(service.load_config())
+    await loading.wait()
+    repository.data = new
+    cache.invalidate(new.fingerprint())  # another process committed while we were reading
+    release.set()
+
+    assert (await first_load)[0] is old
+    assert (await service.load_config())[0] is new
+    assert repository.loads == 2
+    assert (await service.load_config())[0] is new
+    assert repository.loads == 2
+
+
+@pytest.mark.anyio("asyncio")
+async def test_put_replaces_snapshot_without_reload(config_class):
+    repository = FakeRepository(PipelineConfigData.from_dict({"steps": ["cleaner"]}))
+    service = PipelineConfigService(config=config_class, repository=repository)
+    await service.load_config()
+
+    await service.save_config(PipelineConfigData.from_dict({"steps": ["splitter"]}))
+    data, source = await service.load_config()
+
+    assert (data.steps, source) == (["splitter"], "db")
+    assert repository.loads == 1
+    assert service.build_summary()["config_version"] == 2
+
+
+@pytest.mark.anyio("asyncio")
+async def test_file_snapshot_refreshes_on_mtime_change(config_class):
+    service = PipelineConfigService(config=config_class, repository=FakeRepository(fail=True))
+
+    data, source = await service.load_config()
+    assert source == "file" and data.line_filter == {}
+    assert (await service.load_config())[0] is data
+
+    path = config_class.LINE_FILTER_CONFIG_PATH
+    with open(path, "w") as fp:
+        json.dump({"job_keywords": ["案件"]}, fp)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    data, _ = await service.load_config()
+    assert data.line_filter == {"job_keywords": ["案件"]}
+    assert (await service.snapshot()).settings.LINE_FILTER_JOB_KEYWORDS == ("案件",)
+    assert config_class.LINE_FILTER_JOB_KEYWORDS != ["案件"]
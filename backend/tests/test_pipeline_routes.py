@@ -0,0 +1,293 @@
+from email.message import EmailMessage
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.pipeline_config import PipelineConfigData, get_pipeline_config_service
+from app.utils.config import Config
+
+STEPS = ["cleaner", "line_filter", "splitter", "extractor", "classifier", "aggregator"]
+
+
+class StubConfigService:
+    async def load_config(self):
+        # Runs build their settings from this payload, so it carries the keyword dictionary.
+        return PipelineConfigData.from_dict({"steps": STEPS, "keywords_tech": Config._KEYWORDS_TECH}), "file"
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(Config, "PIPELINE_STEPS", tuple(STEPS))
+    app.dependency_overrides[get_pipeline_config_service] = StubConfigService
+    with TestClient(app) as test_client:
+        yield test_client
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def data_dir(monkeypatch, tmp_path):
+    from app.routes import pipeline as pipeline_routes
+    from app.services import results_store
+
+    target = tmp_path / "data"
+    target.mkdir()
+    monkeypatch.setattr(pipeline_routes, "DATA_DIR", target)
+    monkeypatch.setattr(Config, "RESULT_STORE", "sqlite")
+    monkeypatch.setattr(Config, "RESULT_STORE_SQLITE_PATH", str(tmp_path / "results.sqlite3"))
+    monkeypatch.setattr(results_store, "_STORES", {})
+    monkeypatch.setattr(Config, "UPLOAD_STAGING_DIR", str(tmp_path / "staging"))
+    return target
+
+
+def _eml_bytes(subject: str, body: str) -> bytes:
+    msg = EmailMessage()
+    msg["Subject"] = subject
+    msg.set_content(body)
+    return msg.as_bytes()
+
+
+def test_analyze_accepts_json_body(client):
+    response = client.post("/pipeline/analyze", json={"subject": "募集", "body": "必須スキル: Python\n外国籍可"})
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["result"]["subject"] == "募集"
+    assert data["result"]["semantic"] is None
+    assert data["result"]["aggregation"]["block_count"] == 1
+    assert data["elapsed_ms"] >= 0
+
+
+def test_analyze_accepts_raw_eml(client):
+    msg = EmailMessage()
+    msg["Subject"] = "Raw EML"
+    msg["From"] = "sender@example.com"
+    msg.set_content("スキル: Java")
+
+    response = client.post(
+        "/pipeline/analyze",
+        content=msg.as_bytes(),
+        headers={"content-type": "message/rfc822"},
+    )
+
+    assert response.status_code == 200
+    keywords = response.json()["result"]["aggregation"]["keyword_summary"]
+    assert any(item["keyword"] == "Java" for items in keywords.values() for item in items)
+
+
+def test_analyze_rejects_unknown_charset(client):
+    response = client.post(
+        "/pipeline/analyze", content="スキル: Go".encode(), headers={"content-type": "text/plain; charset=foo"}
+    )
+    quoted = client.post(
+        "/pipeline/analyze", content="スキル: Go".encode("shift_jis"), headers={"content-type": 'text/plain; charset="shift_jis"'}
+    )
+
+    assert response.status_code == 400
+    assert "charset" in response.json()["detail"]
+    assert quoted.status_code == 200
+
+
+def test_analyze_rejects_empty_body(client):
+    response = client.post("/pipeline/analyze", content=b"", headers={"content-type": "text/plain"})
+
+    assert response.status_code == 400
+
+
+def _count_route_parses(monkeypatch):
+    from app.routes import pipeline as pipeline_routes
+
+    parsed = []
+    original_parse = pipeline_routes.parse_email_file
+
+    def counting_parse(path):
+        parsed.append(path.name)
+        return original_parse(path)
+
+    monkeypatch.setattr(pipeline_routes, "parse_email_file", counting_parse)
+    return parsed
+
+
+def test_run_reuses_stored_results_for_unchanged_files(client, monkeypatch, data_dir):
+    parsed = _count_route_parses(monkeypatch)
+
+    (data_dir / "first.eml").write_bytes(_eml_bytes("First", "スキル: Python"))
+    first = client.post("/pipeline/run").json()
+    (data_dir / "second.eml").write_bytes(_eml_bytes("Second", "スキル: Python"))
+    second = client.post("/pipeline/run").json()
+
+    assert parsed == ["first.eml", "second.eml"]
+    assert first["summary"]["message_count"] == 1
+    assert second["summary"]["message_count"] == 2
+    assert second["summary"]["block_count"] == 2
+    assert {item["subject"] for item in second["results"]} == {"First", "Second"}
+    assert all("blocks" not in item for item in second["results"])
+
+
+def test_stored_results_are_not_reused_after_env_setting_changes(client, monkeypatch, data_dir):
+    from collections import OrderedDict
+
+    from app.services import pipeline_settings
+
+    parsed = _count_route_parses(monkeypatch)
+    (data_dir / "first.eml").write_bytes(_eml_bytes("First", "スキル: Python"))
+    client.post("/pipeline/run")
+
+    # A redeploy with a different env-level setting; the stored config payload is unchanged.
+    monkeypatch.setattr(Config, "BODY_MAX_CHARS", 1000)
+    monkeypatch.setattr(pipeline_settings, "_BY_FINGERPRINT", OrderedDict())
+    client.post("/pipeline/run")
+
+    assert parsed == ["first.eml", "first.eml"]
+
+
+def test_upload_with_eager_ingestion_skips_parsing_at_run(client, monkeypatch, data_dir):
+    parsed = _count_route_parses(monkeypatch)
+
+    response = client.post(
+        "/pipeline/upload?ingest=prepare",
+        files={"files": ("eager.eml", _eml_bytes("Eager", "スキル: Go"), "message/rfc822")},
+    )
+    run = client.post("/pipeline/run").json()
+
+    assert response.status_code == 200
+    assert parsed == []
+    assert run["summary"]["message_count"] == 1
+    assert run["results"][0]["subject"] == "Eager"
+
+
+def test_upload_rejects_unknown_ingest_mode(client, data_dir):
+    response = client.post(
+        "/pipeline/upload?ingest=bogus",
+        files={"files": ("x.eml", b"", "message/rfc822")},
+    )
+
+    assert response.status_code == 400
+
+
+def test_eager_ingestion_needs_a_result_store(client, monkeypatch, data_dir):
+    from app.routes import pipeline as pipeline_routes
+
+    scheduled = []
+    monkeypatch.setattr(pipeline_routes, "schedule_ingestion", lambda *args: scheduled.append(args))
+    monkeypatch.setattr(Config, "RESULT_STORE", "off")
+    upload = {"files": ("x.eml", _eml_bytes("Off", "スキル: Go"), "message/rfc822")}
+
+    assert client.post("/pipeline/upload?ingest=embed", files=upload).status_code == 400
+
+    monkeypatch.setattr(Config, "UPLOAD_EAGER_INGEST", "embed")
+    assert client.post("/pipeline/upload", files=upload).status_code == 200
+    assert scheduled == []
+
+
+def test_chunked_upload_protocol(client, data_dir):
+    payload = _eml_bytes("Chunked", "スキル: Rust")
+    half = len(payload) // 2
+
+    init = client.post("/pipeline/uploads", json={"filename": "chunked.eml", "size": len(payload)}).json()
+    upload_id = init["upload_id"]
+    client.put(f"/pipeline/uploads/{upload_id}?offset=0", content=payload[:half])
+    status = client.get(f"/pipeline/uploads/{upload_id}").json()
+    client.put(f"/pipeline/uploads/{upload_id}?offset={half}", content=payload[half:])
+    done = client.post(f"/pipeline/uploads/{upload_id}/complete").json()
+
+    assert status["next_offset"] == half
+    assert status["complete"] is False
+    assert done["filename"] == "chunked.eml"
+    assert done["size"] == len(payload)
+    assert (data_dir / "chunked.eml").read_bytes() == payload
+
+    again = client.post(
+        "/pipeline/uploads", json={"filename": "copy.eml", "size": len(payload), "sha256": done["sha256"]}
+    ).json()
+    assert again["deduplicated"] is True
+    assert again["filename"] == "chunked.eml"
+    assert client.get("/pipeline/uploads/" + "0" * 32).status_code == 404
+
+
+def test_chunked_upload_deduplicates_against_plain_uploads(client, data_dir):
+    import hashlib
+
+    payload = _eml_bytes("Plain", "スキル: Go")
+    client.post("/pipeline/upload", files={"files": ("plain.eml", payload, "message/rfc822")})
+
+    init = client.post(
+        "/pipeline/uploads",
+        json={"filename": "copy.eml", "size": len(payload), "sha256": hashlib.sha256(payload).hexdigest()},
+    ).json()
+    assert init["deduplicated"] is True
+    assert init["filename"] == "plain.eml"
+
+
+def test_staged_run_reports_stage_metrics(client, monkeypatch, data_dir):
+    from collections import OrderedDict
+
+    from app.services import pipeline_settings
+
+    monkeypatch.setattr(Config, "PIPELINE_STAGED", True)
+    monkeypatch.setattr(pipeline_settings, "_BY_FINGERPRINT", OrderedDict())
+    parsed = _count_route_parses(monkeypatch)
+    (data_dir / "staged.eml").write_bytes(_eml_bytes("Staged", "スキル: Python"))
+
+    run = client.post("/pipeline/run").json()
+
+    assert parsed == ["staged.eml"]
+    assert run["summary"]["message_count"] == 1
+    assert run["results"][0]["subject"] == "Staged"
+    assert set(run["stages"]["stages"]) == {"parse", "clean", "embed", "aggregate"}
+    assert run["stages"]["stages"]["aggregate"]["items"] == 1
+
+
+def test_run_reports_timings_and_metrics_endpoint(client, data_dir):
+    (data_dir / "timed.eml").write_bytes(_eml_bytes("Timed", "スキル: Python"))
+
+    run = client.post("/pipeline/run").json()
+    scrape = client.get("/metrics")
+
+    assert run["timings"]["stages"]["parse"]["calls"] == 1
+    assert run["timings"]["counters"]["messages_parsed"] == 1
+    assert scrape.status_code == 200
+    assert scrape.headers["content-type"].startswith("text/plain")
+    assert 'pipeline_stage_calls_total{stage="parse"}' in scrape.text
+
+
+def test_profiling_is_off_unless_enabled(client, data_dir):
+    response = client.post("/pipeline/run?profile=true")
+
+    assert response.status_code == 403
+    assert client.post("/pipeline/run").json()["profile"] is None
+
+
+def test_profiled_run_stores_artefact_and_returns_hot_functions(client, monkeypatch, tmp_path, data_dir):
+    import pstats
+
+    monkeypatch.setattr(Config, "PIPELINE_PROFILING", "request")
+    monkeypatch.setattr(Config, "PIPELINE_PROFILE_DIR", str(tmp_path / "profiles"))
+    (data_dir / "profiled.eml").write_bytes(_eml_bytes("Profiled", "スキル: Python"))
+
+    profile = client.post("/pipeline/run?profile=true&profile_top=5").json()["profile"]
+    download = client.get(f"/pipeline/profiles/{profile['id']}")
+
+    assert len(profile["top"]) == 5
+    assert {"function", "ncalls", "tottime_ms", "cumtime_ms"} <= set(profile["top"][0])
+    assert pstats.Stats(profile["path"]).total_calls == profile["total_calls"]
+    assert download.status_code == 200 and download.content
+    assert client.get("/pipeline/profiles/..%2Fsecrets").status_code == 404
+
+
+def test_always_profiling_skips_overlapping_runs_and_prunes_old_artefacts(client, monkeypatch, tmp_path, data_dir):
+    from app.utils import profiling
+
+    profiles = tmp_path / "profiles"
+    monkeypatch.setattr(Config, "PIPELINE_PROFILING", "always")
+    monkeypatch.setattr(Config, "PIPELINE_PROFILE_DIR", str(profiles))
+    monkeypatch.setattr(Config, "PIPELINE_PROFILE_KEEP", 2)
+
+    ids = [client.post("/pipeline/run").json()["profile"]["id"] for _ in range(3)]
+    assert sorted(path.stem for path in profiles.glob("*.prof")) == sorted(ids[1:])
+
+    with profiling.RunProfiler():  # another run is being profiled
+        overlapping = client.post("/pipeline/run")
+        explicit = client.post("/pipeline/run?profile=true")
+    assert overlapping.status_code == 200 and overlapping.json()["profile"] is None
+    assert explicit.status_code == 409
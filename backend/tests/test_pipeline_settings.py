@@ -0,0 +1,114 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.services.pipeline import Pipeline, get_cached_pipeline, get_pipeline
+from app.services.pipeline_config import PipelineConfigData
+from app.services.pipeline_settings import PipelineSettings, settings_for
+from app.services.preprocess.line_filter import LineFilter
+from app.utils.config import Config
+
+
+def _data(**overrides):
+    payload = {"steps": ["cleaner", "line_filter"], "line_filter": {"job_keywords": ["案件"]}}
+    payload.update(overrides)
+    return PipelineConfigData.from_dict(payload)
+
+
+def test_settings_are_frozen_and_leave_config_untouched():
+    settings = settings_for(_data())
+
+    assert settings.PIPELINE_STEPS == ("cleaner", "line_filter")
+    assert settings.LINE_FILTER_JOB_KEYWORDS == ("案件",)
+    with pytest.raises(AttributeError):
+        settings.PIPELINE_STEPS = ("splitter",)
+    with pytest.raises(TypeError):
+        settings._LINE_FILTER_SETTINGS["job_keywords"] = []
+    assert Config.PIPELINE_STEPS != settings.PIPELINE_STEPS
+
+
+def test_settings_hash_follows_content():
+    first = PipelineSettings.from_data(_data())
+    same = PipelineSettings.from_data(_data())
+    other = PipelineSettings.from_data(_data(steps=["cleaner"]))
+
+    assert first == same and hash(first) == hash(same)
+    assert first.fingerprint != other.fingerprint
+    assert settings_for(_data()) is settings_for(_data())
+    assert get_cached_pipeline(first) is get_cached_pipeline(same)
+
+
+def test_pipeline_and_filters_from_different_settings_run_side_by_side():
+    keep_job = settings_for(_data(line_filter={"job_keywords": ["案件"]}))
+    drop_job = settings_for(_data(line_filter={"force_delete_patterns": ["^案件"]}))
+    assert Pipeline(keep_job).steps == ["cleaner", "line_filter"]
+
+    lines = ["案件: 決済基盤", "勤務地: 東京"] * 50
+    filters = [LineFilter(keep_job), LineFilter(drop_job)] * 8
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(lambda f: f.filter_lines(lines), filters))
+
+    assert results[0] == lines
+    assert results[1] == ["勤務地: 東京"] * 50
+    assert results == [results[0], results[1]] * 8
+
+
+@pytest.mark.anyio("asyncio")
+async def test_get_pipeline_resolves_markers_on_the_loop_and_builds_off_it(tmp_path, monkeypatch):
+    import json
+    import threading
+
+    from app.services import splitter
+
+    rules = tmp_path / "index_rules.json"
+    rules.write_text(json.dumps({"rules": [{"name": "heading", "pattern": "(?=JOB:)"}]}))
+    settings = PipelineSettings.from_config(
+        Config,
+        PIPELINE_STEPS=("cleaner", "splitter"),
+        INDEX_RULE_SOURCE="file",
+        INDEX_RULES_INLINE=None,
+        INDEX_RULES_PATH=str(rules),
+        SPLITTER_INDEX_RULES=("heading",),
+    )
+    monkeypatch.setattr(splitter, "load_index_rule_markers", lambda config: pytest.fail("sync index-rule load"))
+    built_on_loop_thread = []
+    init = Pipeline.__init__
+
+    def recording_init(self, *args, **kwargs):
+        built_on_loop_thread.append(threading.current_thread() is threading.main_thread())
+        init(self, *args, **kwargs)
+
+    monkeypatch.setattr(Pipeline, "__init__", recording_init)
+
+    pipeline = await get_pipeline(settings)
+
+    assert built_on_loop_thread == [False]
+    assert "(?=JOB:)" in pipeline.splitter.marker_sources
+    assert await get_pipeline(settings) is pipeline
+
+
+@pytest.mark.anyio("asyncio")
+async def test_get_pipeline_rebuilds_when_index_rules_change(tmp_path):
+    import json
+    import os
+
+    rules = tmp_path / "index_rules.json"
+    rules.write_text(json.dumps({"rules": [{"name": "heading", "pattern": "(?=JOB:)"}]}))
+    settings = PipelineSettings.from_config(
+        Config,
+        PIPELINE_STEPS=("cleaner", "splitter"),
+        INDEX_RULE_SOURCE="file",
+        INDEX_RULES_INLINE=None,
+        INDEX_RULES_PATH=str(rules),
+        INDEX_RULE_CACHE_TTL=0,
+        SPLITTER_INDEX_RULES=("heading",),
+    )
+    before = await get_pipeline(settings)
+
+    rules.write_text(json.dumps({"rules": [{"name": "heading", "pattern": "(?=POSITION:)"}]}))
+    os.utime(rules, (1, 1))
+    after = await get_pipeline(settings)
+
+    assert "(?=POSITION:)" in after.splitter.marker_sources
+    assert after.result_key != before.result_key
+    assert get_cached_pipeline(settings) is after
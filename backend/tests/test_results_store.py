@@ -0,0 +1,105 @@
+from pathlib import Path
+
+import pytest
+
+from app.services.pipeline import PipelineResult
+from app.services.results_store import SqliteResultStore, hash_file, serialize_pipeline_result, stored_blocks
+from app.services.splitter import SplitBlock
+
+
+def test_hash_file_changes_with_content(tmp_path: Path):
+    target = tmp_path / "a.eml"
+    target.write_bytes(b"one")
+    first = hash_file(target)
+    target.write_bytes(b"two")
+
+    assert hash_file(target) != first
+
+
+@pytest.mark.anyio("asyncio")
+async def test_sqlite_store_round_trip_keyed_by_file_and_config(tmp_path: Path):
+    store = SqliteResultStore(str(tmp_path / "results.sqlite3"))
+    result = PipelineResult(
+        source_path="a.eml",
+        subject="件名",
+        semantic=None,
+        aggregation={"block_count": 1, "keyword_summary": {}, "class_summary": {}},
+        blocks=[SplitBlock(text="Python", start_line=0, end_line=0)],
+    )
+    items = [serialize_pipeline_result(result)]
+
+    await store.save("file-hash", "config-a", "a.eml", items)
+
+    assert await store.load("file-hash", "config-a") == items
+    assert await store.load("file-hash", "config-b") is None
+    assert stored_blocks(items[0]) == result.blocks
+
+
+@pytest.mark.anyio("asyncio")
+async def test_database_store_uses_the_shared_pool_and_creates_the_table_once(monkeypatch):
+    import json
+    from contextlib import asynccontextmanager
+
+    from app.services import results_store
+
+    rows, statements, acquired = {}, [], []
+
+    class _Conn:
+        async def execute(self, sql, *args):
+            statements.append(sql.split()[0])
+            if args:
+                rows[args[:2]] = args[3]
+
+        async def fetchval(self, sql, *args):
+            return rows.get(args)
+
+    @asynccontextmanager
+    async def _acquire(dsn, config):
+        acquired.append(dsn)
+        yield _Conn()
+
+    monkeypatch.setattr(results_store, "acquire", _acquire)
+    monkeypatch.setattr(results_store, "_SCHEMA_READY", set())
+    store = results_store.DatabaseResultStore()
+
+    await store.save("file-hash", "config-a", "a.eml", [{"subject": "件名"}])
+    assert await store.load("file-hash", "config-a") == [{"subject": "件名"}]
+    assert await store.load("file-hash", "config-b") is None
+
+    assert len(acquired) == 3
+    assert statements == ["CREATE", "INSERT"]
+    assert json.loads(rows[("file-hash", "config-a")]) == [{"subject": "件名"}]
+
+
+@pytest.mark.anyio("asyncio")
+async def test_fallback_store_only_falls_back_on_connection_errors_and_retries(tmp_path: Path):
+    from app.services import results_store
+
+    class _Primary:
+        error = ConnectionRefusedError("db down")
+        loads = 0
+
+        async def load(self, file_hash, config_hash):
+            self.loads += 1
+            if self.error:
+                raise self.error
+            return [{"from": "db"}]
+
+    primary = _Primary()
+    fallback = SqliteResultStore(str(tmp_path / "results.sqlite3"))
+    await fallback.save("f", "c", "a.eml", [{"from": "sqlite"}])
+    store = results_store.FallbackResultStore(primary, fallback, retry_seconds=30)
+
+    assert await store.load("f", "c") == [{"from": "sqlite"}]
+    assert await store.load("f", "c") == [{"from": "sqlite"}]
+    assert primary.loads == 1  # backing off
+
+    primary.error = None
+    store._retry_at = 0.0  # backoff elapsed
+    assert await store.load("f", "c") == [{"from": "db"}]
+
+    primary.error = ValueError("bad query")
+    with pytest.raises(ValueError):
+        await store.load("f", "c")
+    primary.error = None
+    assert await store.load("f", "c") == [{"from": "db"}]
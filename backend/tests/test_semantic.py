@@ -124,3 +124,32 @@ def test_best_contiguous_cluster_is_chosen():
     assert result.text == "hitA one"
     assert result.start_line == 0
     assert result.end_line == 0
+
+
+def test_prefiltered_body_lines_are_not_filtered_again():
+    from app.services.preprocess import BodyLines, LineFilter
+
+    class CountingFilter(LineFilter):
+        calls = 0
+
+        def keep_indices(self, lines):
+            CountingFilter.calls += 1
+            return super().keep_indices(lines)
+
+    line_filter = CountingFilter()
+    extractor = SemanticExtractor(
+        model=FakeModel(),
+        global_templates=["GLOBAL"],
+        global_threshold=0.5,
+        context_radius=0,
+        field_templates={},
+        line_filter=line_filter,
+    )
+    body = line_filter.filter_body(BodyLines(["お世話になっております", "intro line", "hit line here"]))
+    assert CountingFilter.calls == 1
+
+    result = extractor.extract(body)
+
+    assert CountingFilter.calls == 1
+    assert result.text == "hit line here"
+    assert extractor.extract("お世話になっております\nintro line\nhit line here").line_scores == result.line_scores
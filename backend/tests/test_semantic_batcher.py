@@ -0,0 +1,112 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from app.services.semantic import SemanticExtractor
+from app.services.semantic_batcher import EmbeddingBatcher
+
+
+class CountingModel:
+    def __init__(self):
+        self.calls = []
+        self.batch_sizes = []
+
+    def encode(self, sentences, **kwargs):
+        self.calls.append(list(sentences))
+        self.batch_sizes.append(kwargs.get("batch_size"))
+        return [np.array([float(len(s)), 0.0]) for s in sentences]
+
+
+class TemplateModel:
+    def encode(self, sentences, **kwargs):
+        return [np.array([1.0, 0.0]) if "hit" in s or "GLOBAL" in s else np.array([0.0, 0.0]) for s in sentences]
+
+
+@pytest.mark.anyio("asyncio")
+async def test_concurrent_requests_share_one_encode():
+    model = CountingModel()
+    batcher = EmbeddingBatcher(model, max_wait_ms=20, max_batch_tokens=10_000)
+
+    first, second = await asyncio.gather(batcher.encode(["a", "bb"]), batcher.encode(["ccc"]))
+
+    assert len(model.calls) == 1
+    assert model.calls[0] == ["a", "bb", "ccc"]
+    assert first[:, 0].tolist() == [1.0, 2.0]
+    assert second[:, 0].tolist() == [3.0]
+
+    stats = batcher.stats()
+    assert stats["batches"] == 1
+    assert stats["requests"] == 2
+    assert stats["batch_requests_histogram"] == {"le_2": 1}
+    assert stats["batch_sentences_histogram"] == {"le_4": 1}
+    assert stats["queue_depth"] == 0
+    assert stats["max_queue_depth"] == 2
+
+
+@pytest.mark.anyio("asyncio")
+async def test_batch_size_comes_from_the_submitting_run():
+    from app.services.pipeline_settings import PipelineSettings
+    from app.utils.config import Config
+
+    model = CountingModel()
+    batcher = EmbeddingBatcher(model, max_wait_ms=20, max_batch_tokens=10_000)
+    settings = PipelineSettings.from_config(Config, SEMANTIC_BATCH_SIZE=Config.SEMANTIC_BATCH_SIZE + 7)
+    extractor = SemanticExtractor(
+        model=model, global_templates=[], context_radius=0, field_templates={}, batcher=batcher, config=settings
+    )
+
+    await extractor.extract_batch_async(["first line\nsecond line"])
+    await asyncio.gather(batcher.encode(["a"], batch_size=16), batcher.encode(["b"], batch_size=4))
+
+    assert model.batch_sizes[0] == Config.SEMANTIC_BATCH_SIZE + 7
+    assert model.calls[-1] == ["a", "b"]
+    assert model.batch_sizes[-1] == 4  # a coalesced batch honours the smallest request
+
+
+@pytest.mark.anyio("asyncio")
+async def test_token_budget_flushes_without_waiting():
+    model = CountingModel()
+    batcher = EmbeddingBatcher(model, max_wait_ms=10_000, max_batch_tokens=3)
+
+    result = await asyncio.wait_for(batcher.encode(["abcd"]), timeout=1)
+
+    assert result.shape == (1, 2)
+    assert len(model.calls) == 1
+
+
+@pytest.mark.anyio("asyncio")
+async def test_extract_batch_async_matches_sync():
+    model = TemplateModel()
+    batcher = EmbeddingBatcher(model, max_wait_ms=1, max_batch_tokens=10_000)
+    extractor = SemanticExtractor(
+        model=model,
+        global_templates=["GLOBAL"],
+        global_threshold=0.5,
+        context_radius=0,
+        field_templates={},
+        batcher=batcher,
+    )
+    bodies = ["intro\nhit line", "no match here"]
+
+    async_results = await extractor.extract_batch_async(bodies)
+    sync_results = extractor.extract_batch(bodies)
+
+    assert [r.matched for r in async_results] == [r.matched for r in sync_results]
+    assert async_results[0].text == sync_results[0].text == "hit line"
+
+
+def test_batcher_is_usable_from_several_event_loops():
+    model = CountingModel()
+    batcher = EmbeddingBatcher(model, max_wait_ms=0, max_batch_tokens=10_000)
+
+    async def overlapping_batches():
+        # Each request flushes at once, so the second batch waits on the encode lock.
+        return await asyncio.gather(batcher.encode(["a"]), batcher.encode(["bb"]))
+
+    for _ in range(2):
+        first, second = asyncio.run(overlapping_batches())
+        assert (first[0, 0], second[0, 0]) == (1.0, 2.0)
+
+    assert batcher.stats()["batches"] == 4
+    assert all(not queue.tasks for queue in batcher._queues.values())
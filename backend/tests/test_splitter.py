@@ -48,3 +48,50 @@ def test_splitter_requires_marker_alone():
     blocks = splitter.split(body)
 
     assert len(blocks) == 1  # no standalone marker
+
+
+def test_splitter_accepts_body_lines():
+    from app.services.preprocess import BodyLines
+
+    lines = ["head"] * 6 + ["案件名 A", "a line", "案件 B", "b line"] + ["foot"] * 6
+    splitter = Splitter()
+
+    assert splitter.split(BodyLines(lines)) == splitter.split("\n".join(lines))
+
+
+def test_splitter_uses_section_heading_index_rule():
+    lines = ["head"] * 6 + ["【案件1】決済基盤", "a line", "■案件 2", "b line", "【募集】C", "c line"] + ["foot"] * 6
+    splitter = Splitter()
+
+    blocks = splitter.split("\n".join(lines))
+
+    assert [block.start_line for block in blocks] == [6, 8, 10]
+
+
+def test_marker_set_is_compiled_once_per_pattern_set(tmp_path):
+    import json
+
+    from app.services.splitter import compile_marker_set
+    from app.utils.config import Config
+
+    rules = tmp_path / "index_rules.json"
+    rules.write_text(json.dumps({"rules": [{"name": "heading", "pattern": "(?i)(?=job:)"}]}))
+    overrides = {
+        "INDEX_RULE_CACHE_TTL": 0,
+        "INDEX_RULE_SOURCE": "file",
+        "INDEX_RULES_INLINE": None,
+        "INDEX_RULES_PATH": str(rules),
+        "SPLITTER_INDEX_RULES": ["heading"],
+    }
+    config = type("SplitConfig", (Config,), overrides)
+
+    first, second = Splitter(config), Splitter(config)
+    assert first.marker_patterns is second.marker_patterns
+    assert len(first.marker_patterns) == 1
+    assert first._is_marker("JOB: backend", 6, 20)
+
+    rules.write_text(json.dumps({"rules": [{"name": "heading", "pattern": "(?=role:)"}]}))
+    changed = Splitter(config)
+    assert changed.marker_patterns is not first.marker_patterns
+    assert not changed._is_marker("JOB: backend", 6, 20)
+    assert compile_marker_set.cache_info().hits >= 1
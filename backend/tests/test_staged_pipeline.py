@@ -0,0 +1,67 @@
+import time
+
+import pytest
+
+from app.services.email_parser import EmailContent
+from app.services.pipeline import Pipeline
+from app.services.pipeline_settings import PipelineSettings
+from app.services.staged_pipeline import StagedPipeline
+from app.utils.config import Config
+
+STEPS = ("cleaner", "line_filter", "splitter", "extractor", "classifier", "aggregator")
+
+
+def _settings(**overrides):
+    return PipelineSettings.from_config(Config, PIPELINE_STEPS=STEPS, **overrides)
+
+
+def _mailbox(files=5, per_file=4):
+    return {
+        f"box{f}.eml": [
+            EmailContent(source_path=f"box{f}.eml", subject=f"{f}-{n}", body=f"案件 {f}-{n}\n必須スキル: Java, Python")
+            for n in range(per_file + f % 2)
+        ]
+        for f in range(files)
+    }
+
+
+def test_staged_run_matches_batch_pipeline_in_order():
+    mailbox = _mailbox()
+    pipeline = Pipeline(_settings(PIPELINE_STAGE_QUEUE_SIZE=2, SEMANTIC_BATCH_SIZE=3))
+
+    run = StagedPipeline(pipeline, parse=lambda path: mailbox[path]).run(list(mailbox))
+
+    expected = [pipeline.process_messages(messages) for messages in mailbox.values()]
+    assert [[r.subject for r in results] for results in run.results] == [[r.subject for r in e] for e in expected]
+    assert [[r.aggregation for r in results] for results in run.results] == [[r.aggregation for r in e] for e in expected]
+    assert run.stages["parse"]["items"] == len(mailbox)
+    assert run.stages["aggregate"]["items"] == sum(len(m) for m in mailbox.values())
+    assert all(0 <= stage["utilization"] <= 1 for stage in run.stages.values())
+    assert run.metrics()["bottleneck"] in run.stages
+
+
+def test_bounded_queues_back_pressure_a_slow_stage():
+    mailbox = _mailbox(files=2, per_file=10)
+    pipeline = Pipeline(_settings(PIPELINE_STAGE_QUEUE_SIZE=1, PIPELINE_AGGREGATE_WORKERS=1))
+    runner = StagedPipeline(pipeline, parse=lambda path: mailbox[path])
+    original = runner._aggregate
+
+    def slow_aggregate(item):
+        time.sleep(0.005)
+        return original(item)
+
+    runner._aggregate = slow_aggregate
+    run = runner.run(list(mailbox))
+
+    assert run.bottleneck == "aggregate"
+    assert run.stages["aggregate"]["input_queue_peak"] <= 1
+    assert run.stages["embed"]["blocked_ms"] > 0
+
+
+def test_stage_errors_propagate():
+    def broken_parse(path):
+        raise ValueError(f"cannot parse {path}")
+
+    runner = StagedPipeline(Pipeline(_settings()), parse=broken_parse)
+    with pytest.raises(ValueError):
+        runner.run(["a.eml", "b.eml"])